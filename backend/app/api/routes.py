@@ -1,19 +1,40 @@
 """API Routes for Strategy Brain."""
 
+import asyncio
 import json
-from typing import Literal
-
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from functools import lru_cache
+from typing import Annotated, Any, Callable, Iterable, Literal, TypeVar
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    File,
+    Form,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 
 from app.models.schemas import (
+    AnalysisDepth,
     BriefInput,
     BarrierResult,
     WhoAnalysis,
     WhatAnalysis,
     BigIdea,
     CopyOutput,
+    CompleteMode,
     StrategyResult,
+    Section,
     Hosoda3DResult,
     AdPlanResult,
     EvaluationInput,
@@ -29,24 +50,155 @@ from app.models.schemas import (
     StrategySynthesisResult,
 )
 from app.brain.orchestrator import StrategyOrchestrator
-from app.brain.evaluation import PlanEvaluator
-from app.brain.desk_research import DeskResearcher
-from app.brain.social_listening import SocialListeningAnalyzer
-from app.brain.interview_analysis import InterviewAnalyzer
-from app.brain.strategy_synthesis import StrategySynthesizer
+from app.brain.depth import get_depth_profile
+from app.brain.batch import iter_csv_briefs, run_batch
+from app.brain.prompt_registry import get_prompt_registry
+from app.services.admission import AdmissionRejected, Ticket, get_admission
 from app.services.file_processor import file_processor
-from app.services.llm import get_llm_service
+from app.services.idempotency import IdempotencyConflict, get_idempotency_store
+from app.services.jobs import AnalysisRun, get_run_registry
+from app.services.llm import LLMProvider, LLMSelection, get_llm_service, llm_selection
+from app.services.latency import latency_stats
+from app.services.metrics import metrics
+from app.services.results import get_result_store
+from app.services.serialization import RawJSONResponse, dumps, msgpack_available, packb, unpackb
+from app.services.step_cache import get_step_cache
+from app.services.uploads import SpooledUpload, UploadTooLarge, close_uploads, spool_uploads
+from app.services.strategies import (
+    etag_matches,
+    fields_etag,
+    get_strategy_store,
+    listing_etag,
+    negotiate_encoding,
+    render_body,
+)
+from app.config import get_settings
+
+async def _llm_selection(
+    provider: LLMProvider | None = Header(default=None, alias="X-LLM-Provider"),
+    model: str | None = Header(default=None, alias="X-LLM-Model"),
+) -> LLMSelection | None:
+    """リクエスト単位のプロバイダー・モデル（設定は書き換えず、このリクエストのコンテキストにだけ設定する）。"""
+    if provider is None and not model:
+        return None
+    try:
+        selection = get_llm_service().select(provider, model)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    llm_selection.set(selection)
+    return selection
+
+
+router = APIRouter(dependencies=[Depends(_llm_selection)])
 
-router = APIRouter()
+ModelT = TypeVar("ModelT", bound=BaseModel)
 
 
+@lru_cache
 def get_orchestrator() -> StrategyOrchestrator:
-    """Get orchestrator instance."""
-    return StrategyOrchestrator()
+    """Get cached orchestrator instance (built at startup by the app lifespan)."""
+    return StrategyOrchestrator(
+        result_store=get_result_store(),
+        step_cache=get_step_cache(),
+        strategy_store=get_strategy_store(),
+    )
+
+
+def _stored(result_id: str | None, kind: str) -> Any:
+    """ID で参照された上流の結果を取り出す（ID なしなら None）。"""
+    if result_id is None:
+        return None
+    result = get_result_store().get(result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Result '{result_id}' not found or expired")
+    if result.kind != kind:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Result '{result_id}' is a '{result.kind}' result, expected '{kind}'",
+        )
+    return result.value
+
+
+def _remember(response: Response, kind: str, value: ModelT) -> ModelT:
+    """結果を保管庫に保持し、ID を X-Result-Id ヘッダーで返す。"""
+    response.headers["X-Result-Id"] = get_result_store().put(kind, value)
+    return value
+
+
+def _admit(pool: str, estimate: float | None = None) -> Ticket:
+    """受け付け制御（混雑時は 429 + Retry-After）。実行枠は返した Ticket を await して得る。"""
+    try:
+        return get_admission().pool(pool).enter(estimate)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def _step_admission():
+    """単発ステップのエンドポイント用の依存関係（応答を返すまで実行枠を保持する）。"""
+    async with _admit("step"):
+        yield
+
+
+async def _spool_uploads(files: list[UploadFile]) -> list[SpooledUpload]:
+    """添付ファイルのサイズ・件数の上限を確かめる（上限超過は 413）。"""
+    try:
+        return await spool_uploads(files)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def _llm_key() -> str:
+    """Idempotency のフィンガープリントに含める、リクエストのプロバイダー・モデル。"""
+    selection = llm_selection.get()
+    return json.dumps(None if selection is None else [selection.provider, selection.model])
+
+
+def _idempotent_run(
+    key: str, fingerprint: str, start: Callable[[], AnalysisRun]
+) -> tuple[AnalysisRun, bool]:
+    """Idempotency-Key に対応する実行中・完了済みの Run に合流するか、新しい Run を開始する。
 
+    失敗した Run や破棄済みの Run には合流せず、やり直す。
+    戻り値は (Run, 既存の Run に合流したか)。
+    """
+    store = get_idempotency_store()
+    try:
+        run_id = store.lookup(key, fingerprint)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    run = get_run_registry().get(run_id) if run_id else None
+    if run is not None and run.status != "failed":
+        metrics.increment("idempotency.replays")
+        return run, True
+
+    run = start()
+    store.remember(key, fingerprint, run.id)
+    return run, False
+
+
+def _idempotency_headers(run: AnalysisRun, replayed: bool) -> dict[str, str]:
+    return {"X-Run-Id": run.id, "Idempotent-Replayed": "true" if replayed else "false"}
 
-@router.post("/analyze", response_model=StrategyResult)
-async def analyze_full(brief: BriefInput) -> StrategyResult:
+
+async def _await_run_result(run: AnalysisRun, replayed: bool) -> RawJSONResponse:
+    """Run の完了を待ち、エンコード済みの StrategyResult をそのまま返す（検証・再エンコードしない）。"""
+    await run.wait()
+    if run.status == "failed" or run.result is None:
+        raise HTTPException(status_code=500, detail=run.error or "Run failed")
+    return RawJSONResponse(run.result, headers=_idempotency_headers(run, replayed))
+
+
+@router.post("/analyze", response_model=StrategyResult, response_model_exclude_unset=True)
+async def analyze_full(
+    brief: BriefInput,
+    sections: list[Section] | None = Query(default=None),
+    depth: AnalysisDepth | None = Query(default=None),
+    budget_seconds: float | None = Query(default=None, gt=0),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+) -> StrategyResult:
     """
     Run complete strategy analysis.
 
@@ -56,13 +208,56 @@ async def analyze_full(brief: BriefInput) -> StrategyResult:
     3. WHAT Analysis
     4. BIG IDEA Generation
     5. Copywriting (10 variations)
+
+    Pass `sections` (repeatable query parameter, e.g. `?sections=who&sections=big_idea`)
+    to compute only those outputs and their dependencies. Skipped sections are
+    absent from the response and listed in `skipped`.
+
+    `depth` (`quick` / `standard` / `deep`, default `DEFAULT_DEPTH`) scales item
+    counts and token budgets; `quick` also skips desk research, interview
+    analysis and the 3D model unless they are requested via `sections`.
+
+    `budget_seconds` sets a time budget for the whole run. The remaining budget
+    is applied as a timeout to every LLM call, and when the estimated remaining
+    time exceeds it the pipeline degrades step by step (optional stages skipped,
+    lighter depth, ad planning skipped, faster model). Applied degradations are
+    listed in `degradations`; a step that still runs out of time is reported in
+    `errors` with the results completed so far.
+
+    With an `Idempotency-Key` header, a repeated request with the same key and
+    body attaches to the in-flight or completed run instead of starting a new one.
+
+    Full analyses share a limited number of concurrent slots with
+    `/analyze/with-files` and `/analyze/stream`. When the predicted wait for a
+    slot is too long, the request is rejected with 429 and a `Retry-After` header.
     """
-    try:
-        orchestrator = get_orchestrator()
-        result = await orchestrator.run_full_analysis(brief)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if idempotency_key:
+        fingerprint = get_idempotency_store().fingerprint(
+            "analyze", brief.model_dump_json(), json.dumps([sections, depth, budget_seconds]), _llm_key()
+        )
+        run, replayed = _idempotent_run(
+            idempotency_key,
+            fingerprint,
+            lambda: get_run_registry().start(
+                brief,
+                get_orchestrator(),
+                admission=_admit("pipeline", get_orchestrator().estimate_duration(brief, sections, depth)),
+                sections=sections,
+                depth=depth,
+                preview=False,
+                items=False,
+                budget_seconds=budget_seconds,
+                llm=llm_selection.get(),
+            ),
+        )
+        return await _await_run_result(run, replayed)
+
+    orchestrator = get_orchestrator()
+    async with _admit("pipeline", orchestrator.estimate_duration(brief, sections, depth)):
+        try:
+            return await orchestrator.run_full_analysis(brief, sections, depth, budget_seconds)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/analyze/with-files", response_model=StrategyResult)
@@ -75,21 +270,36 @@ async def analyze_with_files(
     competitors: str = Form(""),
     additional_info: str = Form(""),
     files: list[UploadFile] = File(default=[]),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
 ) -> StrategyResult:
     """
     Run complete strategy analysis with file attachments.
 
     Accepts file uploads (PDF, Word, Excel, TXT, etc.) that will be
     analyzed and incorporated into the strategy planning process.
+
+    With an `Idempotency-Key` header, a repeated request with the same key,
+    form fields and file contents attaches to the existing run; the files are
+    not re-extracted or re-summarized.
     """
-    try:
+    fields = {
+        "product_name": product_name,
+        "product_description": product_description,
+        "target_market": target_market,
+        "current_situation": current_situation,
+        "objectives": objectives,
+        "competitors": competitors,
+    }
+    uploads = await _spool_uploads(files)
+
+    async def build_brief() -> BriefInput:
         # Process uploaded files
-        files_data = []
-        for file in files:
-            if file.filename:
-                content = await file.read()
-                file_data = await file_processor.process_file(file.filename, content)
-                files_data.append(file_data)
+        try:
+            files_data = await file_processor.process_files(
+                (upload.filename, upload.source(), upload.sha256) for upload in uploads
+            )
+        finally:
+            close_uploads(uploads)
 
         # If files were uploaded, analyze them and add to additional_info
         file_summary = ""
@@ -103,37 +313,64 @@ async def analyze_with_files(
             combined_additional += f"\n\n## 添付ファイル分析結果\n{file_summary}"
 
         # Create brief with file analysis included
-        brief = BriefInput(
-            product_name=product_name,
-            product_description=product_description,
-            target_market=target_market,
-            current_situation=current_situation,
-            objectives=objectives,
-            competitors=competitors,
-            additional_info=combined_additional,
+        return BriefInput(**fields, additional_info=combined_additional)
+
+    if idempotency_key:
+        fingerprint = get_idempotency_store().fingerprint(
+            "analyze/with-files",
+            json.dumps([fields, additional_info], ensure_ascii=False),
+            _llm_key(),
+            *(part for upload in uploads for part in (upload.filename, upload.sha256)),
         )
+        try:
+            run, replayed = _idempotent_run(
+                idempotency_key,
+                fingerprint,
+                lambda: get_run_registry().start(
+                    None,
+                    get_orchestrator(),
+                    prepare=build_brief,
+                    admission=_admit("pipeline"),
+                    preview=False,
+                    items=False,
+                    llm=llm_selection.get(),
+                ),
+            )
+        except BaseException:
+            close_uploads(uploads)
+            raise
+        if replayed:
+            # 既存の Run に合流した場合、スプールは使わない
+            close_uploads(uploads)
+        return await _await_run_result(run, replayed)
 
-        orchestrator = get_orchestrator()
-        result = await orchestrator.run_full_analysis(brief)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@router.post("/files/analyze")
+    try:
+        async with _admit("pipeline"):
+            try:
+                brief = await build_brief()
+                orchestrator = get_orchestrator()
+                return await orchestrator.run_full_analysis(brief)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        close_uploads(uploads)
+
+
+@router.post("/files/analyze", dependencies=[Depends(_step_admission)])
 async def analyze_files(files: list[UploadFile] = File(...)) -> dict:
     """
     Analyze uploaded files and extract key information.
 
     Returns extracted text and a summary of the contents.
     """
+    uploads = await _spool_uploads(files)
     try:
-        files_data = []
-        for file in files:
-            if file.filename:
-                content = await file.read()
-                file_data = await file_processor.process_file(file.filename, content)
-                files_data.append(file_data)
+        try:
+            files_data = await file_processor.process_files(
+                (upload.filename, upload.source(), upload.sha256) for upload in uploads
+            )
+        finally:
+            close_uploads(uploads)
 
         # Generate summary
         llm_service = get_llm_service()
@@ -155,71 +392,548 @@ async def analyze_files(files: list[UploadFile] = File(...)) -> dict:
 
 
 @router.post("/analyze/stream")
-async def analyze_full_stream(brief: BriefInput):
+async def analyze_full_stream(
+    brief: BriefInput,
+    request: Request,
+    sections: list[Section] | None = Query(default=None),
+    depth: AnalysisDepth | None = Query(default=None),
+    preview: bool = True,
+    items: bool = True,
+    complete: CompleteMode = "full",
+    budget_seconds: float | None = Query(default=None, gt=0),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
+):
     """
     Run complete strategy analysis with Server-Sent Events streaming.
 
-    Returns progress updates as each step completes.
+    Returns progress updates as each step completes. `sections`, `depth` and
+    `budget_seconds` behave as in `/analyze`; each degradation is streamed as a
+    `degraded` event.
+
+    Unless `preview=false`, a one-call strategy sketch (WHO / WHAT / BIG IDEA /
+    headline copies) is generated alongside the pipeline and streamed as a
+    `preview` event as soon as it is ready, long before the full results.
+
+    Unless `items=false`, barriers, copy variations and ad plans are also pushed
+    one by one as `item` events (`section`, `index`, `data`) while the model is
+    still writing the rest of the step's output. The step's own `complete`
+    event remains the authoritative result.
+
+    With `complete=ref` the final `complete` event omits the step results that
+    were already streamed: its `data` holds the rest of the `StrategyResult`
+    (brief, errors, usage, ...) and `refs` maps each result field to the event
+    that carried it (e.g. `{"big_idea": "bigidea"}`).
+
+    The run is tied to this connection: if the client disconnects, in-flight
+    LLM calls are cancelled. Use `POST /jobs` for runs that must survive a
+    dropped connection.
+
+    With an `Idempotency-Key` header the run is detached from the connection
+    instead: a repeated request with the same key and body re-attaches to it,
+    replaying buffered events after `Last-Event-ID` (or from the start).
+
+    Admission is shared with `/analyze`: the request is rejected with 429 and
+    `Retry-After` when the predicted wait is too long; otherwise, while waiting
+    for a slot, a `queued` event reports the predicted wait.
     """
+    estimate = get_orchestrator().estimate_duration(brief, sections, depth)
+    if idempotency_key:
+        fingerprint = get_idempotency_store().fingerprint(
+            "analyze/stream", brief.model_dump_json(), json.dumps([sections, depth, preview, items, complete, budget_seconds]),
+            _llm_key(),
+        )
+        run, replayed = _idempotent_run(
+            idempotency_key,
+            fingerprint,
+            lambda: get_run_registry().start(
+                brief,
+                get_orchestrator(),
+                admission=_admit("pipeline", estimate),
+                sections=sections,
+                depth=depth,
+                preview=preview,
+                items=items,
+                complete=complete,
+                budget_seconds=budget_seconds,
+                llm=llm_selection.get(),
+            ),
+        )
+        cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+        async def replay_generator():
+            async for event in run.subscribe(cursor):
+                yield event.to_sse()
+
+        return EventSourceResponse(
+            replay_generator(), ping=15, headers=_idempotency_headers(run, replayed)
+        )
+
+    ticket = _admit("pipeline", estimate)
 
     async def event_generator():
+        if not ticket.granted:
+            queued = {"step": "queued", "message": "順番待ち中...", "wait_seconds": round(ticket.wait_seconds, 1)}
+            yield {"event": "queued", "data": dumps(queued)}
+            await ticket.wait()
+        orchestrator = get_orchestrator()
+        updates = orchestrator.run_full_analysis_streaming(
+            brief, sections, depth, preview, budget_seconds, items, complete
+        )
         try:
-            orchestrator = get_orchestrator()
-            async for update in orchestrator.run_full_analysis_streaming(brief):
-                yield {
-                    "event": update.get("step", "update"),
-                    "data": json.dumps(update, ensure_ascii=False),
-                }
+            async for update in updates:
+                if await request.is_disconnected():
+                    metrics.increment("analyze_stream.client_disconnects")
+                    return
+                yield {"event": update.get("step", "update"), "data": dumps(update)}
+        except asyncio.CancelledError:
+            # sse-starlette はクライアント切断時にストリームをキャンセルする
+            metrics.increment("analyze_stream.client_disconnects")
+            raise
         except Exception as e:
             yield {
                 "event": "error",
                 "data": json.dumps({"error": str(e)}, ensure_ascii=False),
             }
+        finally:
+            # 実行中のタスクのキャンセルはオーケストレーター側の finally が行う
+            await updates.aclose()
+            ticket.release()
+
+    # ストリームが始まらずに終わった場合も実行枠を返す
+    return EventSourceResponse(event_generator(), background=BackgroundTask(ticket.release))
+
+
+class AnalyzeSocketStart(BaseModel):
+    """WebSocket の最初のメッセージ（分析の開始）。"""
+
+    type: Literal["start"] = "start"
+    brief: BriefInput
+    sections: list[Section] | None = None
+    depth: AnalysisDepth | None = None
+    preview: bool = True
+    items: bool = True
+    complete: CompleteMode = "full"
+    budget_seconds: float | None = Field(default=None, gt=0)
+    credit: int | None = Field(
+        default=None, ge=1, description="送ってよいイベント数の初期値（省略時はフロー制御なし）"
+    )
+    provider: LLMProvider | None = None
+    model: str | None = None
+
+
+class AnalyzeSocketAck(BaseModel):
+    """フロー制御のメッセージ（送ってよいイベント数を credit 件増やす）。"""
+
+    type: Literal["ack"]
+    credit: int = 1
+
+    @field_validator("credit")
+    @classmethod
+    def _at_least_one(cls, value: int) -> int:
+        # 0 以下では送信が止まったままになるため 1 に切り上げる
+        return max(value, 1)
+
+
+class AnalyzeSocketCancel(BaseModel):
+    """実行のキャンセル。"""
 
-    return EventSourceResponse(event_generator())
+    type: Literal["cancel"]
 
 
-@router.post("/barriers", response_model=BarrierResult)
-async def analyze_barriers(brief: BriefInput) -> BarrierResult:
+# 開始後のクライアントのメッセージ（それ以外は不正なメッセージとして実行を止める）
+_SocketControl = TypeAdapter(
+    Annotated[AnalyzeSocketAck | AnalyzeSocketCancel, Field(discriminator="type")]
+)
+
+
+class _Credit:
+    """クライアントが与えたクレジットの分だけイベントを送る（None なら制限しない）。"""
+
+    def __init__(self, initial: int | None):
+        self.remaining = initial
+        self._granted = asyncio.Event()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining is not None and self.remaining <= 0
+
+    def grant(self, amount: int) -> None:
+        if self.remaining is not None and amount > 0:
+            self.remaining += amount
+            self._granted.set()
+
+    async def take(self) -> None:
+        while self.exhausted:
+            self._granted.clear()
+            await self._granted.wait()
+        if self.remaining is not None:
+            self.remaining -= 1
+
+
+async def _receive_message(websocket: WebSocket) -> dict:
+    """クライアントのメッセージ（テキストは JSON、バイナリは MessagePack）。"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        data = unpackb(message["bytes"]) if msgpack_available() else json.loads(message["bytes"])
+    else:
+        data = json.loads(message.get("text") or "null")
+    if not isinstance(data, dict):
+        raise ValueError("Message must be an object")
+    return data
+
+
+@router.websocket("/analyze/ws")
+async def analyze_full_socket(
+    websocket: WebSocket, encoding: Literal["json", "msgpack"] = "json"
+) -> None:
+    """
+    Run complete strategy analysis over a WebSocket.
+
+    Carries the same events as `/analyze/stream`, one per frame. With
+    `?encoding=msgpack` frames are binary MessagePack instead of JSON text
+    (falls back to JSON when msgpack is not installed; the `ready` message
+    reports the encoding in use).
+
+    Client messages (JSON text, or MessagePack binary):
+    - `{"type": "start", "brief": {...}, ...}` — first message; also accepts
+      `sections`, `depth`, `preview`, `items`, `complete`, `budget_seconds`,
+      `provider`, `model` and `credit`
+    - `{"type": "ack", "credit": n}` — flow control: with an initial `credit`,
+      the server sends at most that many events and waits for acks to send
+      more (keepalives are dropped while out of credit)
+    - `{"type": "cancel"}` — cancels the run (in-flight LLM calls included);
+      the server replies with a `cancelled` event and closes the socket
+
+    Any other message (unknown `type`, non-integer `credit`, non-object frame)
+    cancels the run; the server replies with an `error` event and closes the
+    socket with code 1008. A `credit` below 1 counts as 1.
+
+    Admission is shared with `/analyze`; a rejected request gets an `error`
+    event with `retry_after` and the socket is closed with code 1013.
+    """
+    await websocket.accept()
+    if encoding == "msgpack" and not msgpack_available():
+        encoding = "json"
+
+    async def send(update: dict) -> None:
+        if encoding == "msgpack":
+            await websocket.send_bytes(packb(update))
+        else:
+            await websocket.send_text(dumps(update))
+
+    try:
+        start = AnalyzeSocketStart.model_validate(await _receive_message(websocket))
+        if start.provider or start.model:
+            llm_selection.set(get_llm_service().select(start.provider, start.model))
+    except WebSocketDisconnect:
+        return
+    except (ValidationError, ValueError) as e:
+        await send({"step": "error", "error": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    orchestrator = get_orchestrator()
+    try:
+        ticket = get_admission().pool("pipeline").enter(
+            orchestrator.estimate_duration(start.brief, start.sections, start.depth)
+        )
+    except AdmissionRejected as e:
+        await send({"step": "error", "error": str(e), "retry_after": e.retry_after})
+        await websocket.close(code=1013)
+        return
+
+    credit = _Credit(start.credit)
+    cancelled = False
+    # 不正なメッセージを受け取った場合の理由（error イベントで返して接続を閉じる）
+    protocol_error: str | None = None
+
+    async def pump() -> None:
+        await send({"step": "ready", "encoding": encoding})
+        if not ticket.granted:
+            await send({"step": "queued", "message": "順番待ち中...", "wait_seconds": round(ticket.wait_seconds, 1)})
+        async with ticket:
+            updates = orchestrator.run_full_analysis_streaming(
+                start.brief,
+                start.sections,
+                start.depth,
+                start.preview,
+                start.budget_seconds,
+                start.items,
+                start.complete,
+            )
+            try:
+                async for update in updates:
+                    if update.get("step") == "keepalive" and credit.exhausted:
+                        continue
+                    await credit.take()
+                    await send(update)
+            finally:
+                # 実行中のタスクのキャンセルはオーケストレーター側の finally が行う
+                await updates.aclose()
+
+    pump_task = asyncio.create_task(pump())
+
+    async def control() -> None:
+        nonlocal cancelled, protocol_error
+        try:
+            while True:
+                message = _SocketControl.validate_python(await _receive_message(websocket))
+                if isinstance(message, AnalyzeSocketAck):
+                    credit.grant(message.credit)
+                else:
+                    cancelled = True
+                    pump_task.cancel()
+                    return
+        except WebSocketDisconnect:
+            # 実行中の切断なら実行を止める
+            if not pump_task.done():
+                metrics.increment("analyze_ws.client_disconnects")
+                pump_task.cancel()
+        except (ValidationError, ValueError) as e:
+            metrics.increment("analyze_ws.protocol_errors")
+            protocol_error = str(e)
+            pump_task.cancel()
+
+    control_task = asyncio.create_task(control())
+    try:
+        await asyncio.wait({pump_task})
+        if protocol_error is not None:
+            await send({"step": "error", "error": f"Invalid message: {protocol_error}"})
+            await websocket.close(code=1008)
+            return
+        if cancelled:
+            metrics.increment("analyze_ws.cancelled")
+            await send({"step": "cancelled", "message": "分析をキャンセルしました"})
+        elif not pump_task.cancelled() and (error := pump_task.exception()) is not None:
+            await send({"step": "error", "error": str(error)})
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        # 既に切断されている
+        pass
+    finally:
+        control_task.cancel()
+        pump_task.cancel()
+        ticket.release()
+
+
+def _batch_response(
+    briefs: Iterable[BriefInput | Exception],
+    sections: list[Section] | None,
+    depth: AnalysisDepth | None,
+    estimate: float | None = None,
+) -> StreamingResponse:
+    settings = get_settings()
+    # 各バッチは BATCH_CONCURRENCY 件のパイプラインを並列に回すため、同時に実行するバッチ数を
+    # 専用のプールで制限する（混雑時は 429 + Retry-After）
+    ticket = _admit("batch", estimate)
+
+    async def lines():
+        async with ticket:
+            async for item in run_batch(
+                get_orchestrator(),
+                briefs,
+                concurrency=settings.batch_concurrency,
+                llm_concurrency=settings.batch_llm_concurrency,
+                sections=sections,
+                depth=depth,
+            ):
+                metrics.increment(f"batch.{item.status}")
+                yield item.to_ndjson()
+
+    # ストリームが始まらずに終わった場合も実行枠を返す
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", background=BackgroundTask(ticket.release)
+    )
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    briefs: list[BriefInput],
+    sections: list[Section] | None = Query(default=None),
+    depth: AnalysisDepth | None = Query(default=None),
+) -> StreamingResponse:
+    """
+    Run complete strategy analysis for several briefs.
+
+    Briefs run under a shared, bounded concurrency pool (`BATCH_CONCURRENCY`
+    briefs at a time, `BATCH_LLM_CONCURRENCY` LLM calls shared across them).
+    Each result is streamed back as one NDJSON line as soon as it completes:
+    `{"index", "product_name", "status", "result" | "error"}`. Lines arrive
+    in completion order; use `index` to match them to the input. `status` is
+    `complete`, `partial` (a required step failed; see `result.errors`) or
+    `failed`.
+
+    Concurrent batches are limited by the `batch` admission pool; when it is
+    saturated the request is rejected with 429 and `Retry-After`.
+    """
+    orchestrator = get_orchestrator()
+    estimate = sum(orchestrator.estimate_duration(brief, sections, depth) for brief in briefs)
+    return _batch_response(
+        briefs, sections, depth, estimate / max(get_settings().batch_concurrency, 1)
+    )
+
+
+@router.post("/analyze/batch/csv")
+async def analyze_batch_csv(
+    file: UploadFile = File(...),
+    sections: list[Section] | None = Query(default=None),
+    depth: AnalysisDepth | None = Query(default=None),
+) -> StreamingResponse:
+    """
+    Batch analysis from an uploaded CSV of briefs.
+
+    The header row names `BriefInput` fields (`product_name` is required).
+    Rows are read lazily as the pool frees up, so memory stays bounded however
+    large the file is. Invalid rows produce a `failed` line and do not stop
+    the batch. Output is the same NDJSON stream as `/analyze/batch`, under
+    the same `batch` admission pool.
+    """
+    return _batch_response(iter_csv_briefs(file.file), sections, depth)
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    brief: BriefInput,
+    sections: list[Section] | None = Query(default=None),
+    depth: AnalysisDepth | None = Query(default=None),
+) -> dict:
+    """
+    Start a complete strategy analysis as a background job.
+
+    The run is executed by an in-process worker pool, independent of this
+    HTTP connection. Poll `GET /jobs/{run_id}` or subscribe to
+    `GET /jobs/{run_id}/events` for progress.
+
+    Jobs share the full-analysis admission pool with `/analyze`: when it is
+    saturated the job is refused with 429 and `Retry-After`.
+    """
+    registry = get_run_registry()
+    orchestrator = get_orchestrator()
+    ticket = _admit("pipeline", orchestrator.estimate_duration(brief, sections, depth))
+    # ワーカーはこのリクエストのコンテキストの外で動くため、プロバイダー・モデルは明示的に渡す
+    run = registry.submit(
+        brief, orchestrator, admission=ticket, sections=sections, depth=depth, llm=llm_selection.get()
+    )
+    return {
+        "run_id": run.id,
+        "status": run.status,
+        "queue_position": registry.queue_position(run),
+        "estimated_wait_seconds": round(registry.estimated_wait(run), 1),
+        "estimated_seconds": round(run.estimated_seconds, 1),
+        "status_url": f"/api/jobs/{run.id}",
+        "events_url": f"/api/jobs/{run.id}/events",
+    }
+
+
+@router.get("/jobs/{run_id}", response_class=RawJSONResponse)
+async def get_job(run_id: str) -> RawJSONResponse:
+    """Return job status and the step results completed so far."""
+    registry = get_run_registry()
+    run = registry.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return RawJSONResponse({
+        **run.snapshot(),
+        "queue_position": registry.queue_position(run),
+        "estimated_wait_seconds": round(registry.estimated_wait(run), 1),
+    })
+
+
+@router.get("/jobs/{run_id}/events")
+async def stream_job_events(
+    run_id: str,
+    last_event_id: int = 0,
+    last_event_id_header: str | None = Header(default=None, alias="Last-Event-ID"),
+):
+    """
+    Reconnectable Server-Sent Events stream for a background job.
+
+    Events carry ids; on reconnect the browser's `Last-Event-ID` header (or the
+    `last_event_id` query parameter) replays everything after that id from the
+    run's event buffer.
+    """
+    run = get_run_registry().get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+
+    async def event_generator():
+        async for event in run.subscribe(last_event_id):
+            yield event.to_sse()
+
+    return EventSourceResponse(event_generator(), ping=15)
+
+
+@router.post("/barriers", response_model=BarrierResult, dependencies=[Depends(_step_admission)])
+async def analyze_barriers(
+    brief: BriefInput, response: Response, depth: AnalysisDepth | None = Query(default=None)
+) -> BarrierResult:
     """
     Run barrier analysis only (STEP 1-4).
 
+    The result id is returned in the `X-Result-Id` header (pass it to `/who` and
+    `/what` as `barriers_id`).
+
     Returns:
-    - Barrier list (30 items)
+    - Barrier list (30 items at `deep`, fewer at `quick` / `standard`)
     - Causal relationships
     - ABC classification
     - Mermaid diagram
     """
     try:
         orchestrator = get_orchestrator()
-        return await orchestrator.analyze_barriers(brief)
+        result = await orchestrator.analyze_barriers(brief, get_depth_profile(depth))
+        return _remember(response, "barriers", result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/who", response_model=WhoAnalysis)
-async def analyze_who(brief: BriefInput) -> WhoAnalysis:
+@router.post("/who", response_model=WhoAnalysis, dependencies=[Depends(_step_admission)])
+async def analyze_who(
+    brief: BriefInput,
+    response: Response,
+    depth: AnalysisDepth | None = Query(default=None),
+    barriers_id: str | None = Query(default=None),
+) -> WhoAnalysis:
     """
     Run WHO analysis only.
 
+    `barriers_id` (from `/barriers`) grounds the analysis in a stored barrier
+    result. The result id is returned in the `X-Result-Id` header.
+
     Returns:
     - Core target analysis
     - Target segmentation
     - Consumer insights
     - Unmet needs
     """
+    barriers = _stored(barriers_id, "barriers")
     try:
         orchestrator = get_orchestrator()
-        return await orchestrator.analyze_who(brief)
+        result = await orchestrator.analyze_who(brief, barriers, depth=get_depth_profile(depth))
+        return _remember(response, "who", result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/what", response_model=WhatAnalysis)
-async def analyze_what(brief: BriefInput) -> WhatAnalysis:
+@router.post("/what", response_model=WhatAnalysis, dependencies=[Depends(_step_admission)])
+async def analyze_what(
+    brief: BriefInput,
+    response: Response,
+    depth: AnalysisDepth | None = Query(default=None),
+    barriers_id: str | None = Query(default=None),
+) -> WhatAnalysis:
     """
     Run WHAT analysis only.
 
+    `barriers_id` (from `/barriers`) grounds the analysis in a stored barrier
+    result. The result id is returned in the `X-Result-Id` header.
+
     Returns:
     - Market analysis
     - Brand diagnosis
@@ -227,9 +941,11 @@ async def analyze_what(brief: BriefInput) -> WhatAnalysis:
     - Value proposition
     - Differentiation factors
     """
+    barriers = _stored(barriers_id, "barriers")
     try:
         orchestrator = get_orchestrator()
-        return await orchestrator.analyze_what(brief)
+        result = await orchestrator.analyze_what(brief, barriers, depth=get_depth_profile(depth))
+        return _remember(response, "what", result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -239,14 +955,22 @@ class BigIdeaRequest(BriefInput):
 
     who: WhoAnalysis | None = None
     what: WhatAnalysis | None = None
+    who_id: str | None = Field(default=None, description="保持済みの WHO 分析の結果 ID（who の代わり）")
+    what_id: str | None = Field(default=None, description="保持済みの WHAT 分析の結果 ID（what の代わり）")
 
 
-@router.post("/bigidea", response_model=BigIdea)
-async def generate_big_idea(request: BigIdeaRequest) -> BigIdea:
+@router.post("/bigidea", response_model=BigIdea, dependencies=[Depends(_step_admission)])
+async def generate_big_idea(
+    request: BigIdeaRequest, response: Response, depth: AnalysisDepth | None = Query(default=None)
+) -> BigIdea:
     """
     Generate BIG IDEA.
 
-    If WHO and WHAT analyses are not provided, they will be run first.
+    WHO / WHAT can be passed inline or by result id (`who_id` / `what_id`, from
+    the `X-Result-Id` header of `/who` and `/what` or `result_ids` of `/analyze`).
+    If they are not provided, they will be run first (or reused from the step
+    cache when the same brief was analyzed recently). The BIG IDEA's own result
+    id is returned in the `X-Result-Id` header.
 
     Returns:
     - BIG IDEA
@@ -254,24 +978,23 @@ async def generate_big_idea(request: BigIdeaRequest) -> BigIdea:
     - 5-criteria evaluation
     - Alternative ideas
     """
+    who = request.who or _stored(request.who_id, "who")
+    what = request.what or _stored(request.what_id, "what")
     try:
         orchestrator = get_orchestrator()
+        profile = get_depth_profile(depth)
 
         # Run WHO and WHAT if not provided
-        brief = BriefInput(**request.model_dump(exclude={"who", "what"}))
-
-        if request.who and request.what:
-            who = request.who
-            what = request.what
-        else:
-            import asyncio
+        brief = BriefInput(**request.model_dump(include=set(BriefInput.model_fields)))
 
+        if not (who and what):
             who, what = await asyncio.gather(
-                orchestrator.analyze_who(brief),
-                orchestrator.analyze_what(brief),
+                orchestrator.analyze_who(brief, depth=profile),
+                orchestrator.analyze_what(brief, depth=profile),
             )
 
-        return await orchestrator.generate_big_idea(who, what)
+        big_idea = await orchestrator.generate_big_idea(who, what, profile, brief=brief)
+        return _remember(response, "big_idea", big_idea)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -282,43 +1005,49 @@ class CopyRequest(BriefInput):
     who: WhoAnalysis | None = None
     what: WhatAnalysis | None = None
     big_idea: BigIdea | None = None
+    who_id: str | None = Field(default=None, description="保持済みの WHO 分析の結果 ID（who の代わり）")
+    what_id: str | None = Field(default=None, description="保持済みの WHAT 分析の結果 ID（what の代わり）")
+    big_idea_id: str | None = Field(default=None, description="保持済みの BIG IDEA の結果 ID（big_idea の代わり）")
 
 
-@router.post("/copy", response_model=CopyOutput)
-async def generate_copy(request: CopyRequest) -> CopyOutput:
+@router.post("/copy", response_model=CopyOutput, dependencies=[Depends(_step_admission)])
+async def generate_copy(
+    request: CopyRequest, response: Response, depth: AnalysisDepth | None = Query(default=None)
+) -> CopyOutput:
     """
     Generate copy variations.
 
-    If required analyses are not provided, they will be run first.
+    Upstream results can be passed inline or by result id (`who_id`, `what_id`,
+    `big_idea_id`). If required analyses are not provided, they will be run
+    first, or reused from the step cache when the same brief was analyzed
+    recently. The result id is returned in the `X-Result-Id` header.
 
     Returns:
     - Strategic brief
     - 10 copy variations
     - Recommended variation with reason
     """
+    who = request.who or _stored(request.who_id, "who")
+    what = request.what or _stored(request.what_id, "what")
+    big_idea = request.big_idea or _stored(request.big_idea_id, "big_idea")
     try:
         orchestrator = get_orchestrator()
 
-        brief = BriefInput(**request.model_dump(exclude={"who", "what", "big_idea"}))
+        profile = get_depth_profile(depth)
+        brief = BriefInput(**request.model_dump(include=set(BriefInput.model_fields)))
 
         # Run analyses if not provided
-        if request.who and request.what:
-            who = request.who
-            what = request.what
-        else:
-            import asyncio
-
+        if not (who and what):
             who, what = await asyncio.gather(
-                orchestrator.analyze_who(brief),
-                orchestrator.analyze_what(brief),
+                orchestrator.analyze_who(brief, depth=profile),
+                orchestrator.analyze_what(brief, depth=profile),
             )
 
-        if request.big_idea:
-            big_idea = request.big_idea
-        else:
-            big_idea = await orchestrator.generate_big_idea(who, what)
+        if not big_idea:
+            big_idea = await orchestrator.generate_big_idea(who, what, profile, brief=brief)
 
-        return await orchestrator.generate_copy(big_idea, who, what)
+        copy = await orchestrator.generate_copy(big_idea, who, what, profile)
+        return _remember(response, "copywriting", copy)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -329,62 +1058,212 @@ class AdPlanRequest(BriefInput):
     who: WhoAnalysis | None = None
     what: WhatAnalysis | None = None
     big_idea: BigIdea | None = None
+    who_id: str | None = Field(default=None, description="保持済みの WHO 分析の結果 ID（who の代わり）")
+    what_id: str | None = Field(default=None, description="保持済みの WHAT 分析の結果 ID（what の代わり）")
+    big_idea_id: str | None = Field(default=None, description="保持済みの BIG IDEA の結果 ID（big_idea の代わり）")
 
 
-@router.post("/ad-planning", response_model=AdPlanResult)
-async def generate_ad_planning(request: AdPlanRequest) -> AdPlanResult:
+@router.post("/ad-planning", response_model=AdPlanResult, dependencies=[Depends(_step_admission)])
+async def generate_ad_planning(
+    request: AdPlanRequest, response: Response, depth: AnalysisDepth | None = Query(default=None)
+) -> AdPlanResult:
     """
     Generate 6 advertising plans using different ideation methods.
 
+    Upstream results can be passed inline or by result id (`who_id`, `what_id`,
+    `big_idea_id`), as in `/copy`. The result id is returned in the
+    `X-Result-Id` header.
+
     Returns:
     - Brand concept
     - New perspectives (5+)
     - 6 ad plans (OOH copies, SNS posts, experiential tactics)
     - Recommended plan
     """
+    who = request.who or _stored(request.who_id, "who")
+    what = request.what or _stored(request.what_id, "what")
+    big_idea = request.big_idea or _stored(request.big_idea_id, "big_idea")
     try:
         orchestrator = get_orchestrator()
 
-        brief = BriefInput(**request.model_dump(exclude={"who", "what", "big_idea"}))
-
-        import asyncio
+        profile = get_depth_profile(depth)
+        brief = BriefInput(**request.model_dump(include=set(BriefInput.model_fields)))
 
-        if request.who and request.what:
-            who = request.who
-            what = request.what
-        else:
+        if not (who and what):
             who, what = await asyncio.gather(
-                orchestrator.analyze_who(brief),
-                orchestrator.analyze_what(brief),
+                orchestrator.analyze_who(brief, depth=profile),
+                orchestrator.analyze_what(brief, depth=profile),
             )
 
-        if request.big_idea:
-            big_idea = request.big_idea
-        else:
-            big_idea = await orchestrator.generate_big_idea(who, what)
+        if not big_idea:
+            big_idea = await orchestrator.generate_big_idea(who, what, profile, brief=brief)
 
-        return await orchestrator.generate_ad_planning(brief, who, what, big_idea)
+        ad_planning = await orchestrator.generate_ad_planning(brief, who, what, big_idea, profile)
+        return _remember(response, "ad_planning", ad_planning)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/results/{result_id}")
+async def get_result(result_id: str) -> dict:
+    """Return a stored step result (`kind` and `data`) by its result id."""
+    snapshot = get_result_store().snapshot(result_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return snapshot
+
+
+# ── 保存済みの StrategyResult ──────────────────────────────────────
+
+# 保存済みの結果は変わらないが、削除されうるため毎回 ETag で再検証させる
+_STRATEGY_CACHE_CONTROL = "private, no-cache"
+
+
+@router.get("/strategies")
+async def list_strategies(
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=200),
+    before: float | None = Query(default=None, description="この created_at より前の結果（ページング）"),
+    product_name: str | None = Query(default=None, description="製品名の部分一致"),
+) -> Response:
+    """
+    List stored strategy results, newest first (metadata only, no bodies).
+
+    Pass the previous page's `next_before` as `before` to page back. The
+    response carries an `ETag`; polling with `If-None-Match` returns 304
+    until a result is stored or deleted.
+    """
+    store = get_strategy_store()
+    etag = listing_etag(store.version(), limit, before, product_name)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": _STRATEGY_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    items = store.recent(limit, before, product_name)
+    return RawJSONResponse(
+        {
+            "items": [meta.to_dict() for meta in items],
+            "next_before": items[-1].created_at if len(items) == limit else None,
+        },
+        headers=headers,
+    )
+
+
+@router.get("/strategies/{strategy_id}")
+async def get_strategy(
+    strategy_id: str,
+    request: Request,
+    fields: list[str] | None = Query(
+        default=None, description="返す StrategyResult のトップレベルのフィールド（複数指定可）"
+    ),
+) -> Response:
+    """
+    Return a stored `StrategyResult` by the `strategy_id` of its run.
+
+    `fields` limits the response to those top-level fields. Responses carry an
+    `ETag` (`If-None-Match` → 304 without reading the body) and are
+    gzip-encoded straight from storage when the client accepts gzip
+    (brotli when only `br` is accepted and brotli is installed).
+    """
+    unknown = sorted(set(fields or ()) - set(StrategyResult.model_fields))
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    store = get_strategy_store()
+    meta = store.meta(strategy_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Strategy result not found")
+    etag = fields_etag(meta.etag, fields)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": _STRATEGY_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.increment("strategy_store.not_modified")
+        return Response(status_code=304, headers=headers)
+
+    blob = store.blob(strategy_id)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Strategy result not found")
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if fields or encoding != "gzip":
+        # 展開・切り出し・再圧縮はイベントループの外で行う
+        blob = await asyncio.to_thread(render_body, blob, fields, encoding, store.compress_level)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=blob, media_type="application/json", headers=headers)
+
+
+@router.delete("/strategies/{strategy_id}")
+async def delete_strategy(strategy_id: str) -> dict:
+    """Delete a stored strategy result."""
+    if not get_strategy_store().delete(strategy_id):
+        raise HTTPException(status_code=404, detail="Strategy result not found")
+    return {"deleted": strategy_id}
+
+
+@router.post("/cache/invalidate")
+async def invalidate_step_cache(
+    brief: BriefInput | None = None, step: Section | None = Query(default=None)
+) -> dict:
+    """
+    Drop cached WHO / WHAT / BIG IDEA results.
+
+    With a brief in the body only that brief's entries are dropped (briefs are
+    compared after whitespace / width normalization); `step` limits it to one
+    step. Without either, the whole step cache is cleared.
+    """
+    return {"invalidated": get_step_cache().invalidate(brief, step)}
+
+
+@router.get("/metrics")
+async def get_metrics() -> dict:
+    """Process-local operational counters."""
+    return metrics.snapshot()
+
+
+@router.get("/admission")
+async def get_admission_status() -> dict:
+    """Return the admission pools: slots in use, queue length and predicted wait."""
+    return get_admission().snapshot()
+
+
+@router.get("/metrics/latency")
+async def get_latency_metrics() -> dict:
+    """Rolling per-step latency statistics used for ETA estimates."""
+    return latency_stats.snapshot()
+
+
+@router.get("/prompts")
+async def get_prompt_versions() -> dict:
+    """Content versions of the loaded prompt templates."""
+    return get_prompt_registry().versions()
+
+
 @router.get("/providers")
 async def get_providers() -> dict:
-    """Get available LLM providers and current setting."""
-    from app.config import get_settings
+    """
+    Get available LLM providers, the default, and the provider/model in effect
+    for this request.
 
+    Every endpoint accepts `X-LLM-Provider` and `X-LLM-Model` headers to pick
+    the provider and model per request; `allowed_models` lists the models
+    accepted in `X-LLM-Model`.
+    """
     settings = get_settings()
+    llm = get_llm_service()
+    provider, model = llm.model_identity()
     return {
         "available": ["openai", "anthropic"],
-        "current": settings.llm_provider,
+        "default": settings.llm_provider,
+        "current": provider,
+        "model": model,
         "models": {
             "openai": settings.openai_model,
             "anthropic": settings.anthropic_model,
         },
+        "allowed_models": {name: llm.allowed_models(name) for name in ("openai", "anthropic")},
+        "headers": ["X-LLM-Provider", "X-LLM-Model"],
     }
 
 
-@router.post("/evaluate", response_model=EvaluationResult)
+@router.post("/evaluate", response_model=EvaluationResult, dependencies=[Depends(_step_admission)])
 async def evaluate_plan(input: EvaluationInput) -> EvaluationResult:
     """
     Vol.5: 企画を5軸でスコアリング評価する。
@@ -397,14 +1276,12 @@ async def evaluate_plan(input: EvaluationInput) -> EvaluationResult:
     5. 創造的飛躍 (Creative Inspiration)
     """
     try:
-        llm_service = get_llm_service()
-        evaluator = PlanEvaluator(llm_service)
-        return await evaluator.evaluate(input)
+        return await get_orchestrator().plan_evaluator.evaluate(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/desk-research", response_model=DeskResearchResult)
+@router.post("/desk-research", response_model=DeskResearchResult, dependencies=[Depends(_step_admission)])
 async def desk_research(input: DeskResearchInput) -> DeskResearchResult:
     """
     Vol.6: AIデスクリサーチ — 俯瞰マップ（+ オプションで深掘り）。
@@ -412,14 +1289,12 @@ async def desk_research(input: DeskResearchInput) -> DeskResearchResult:
     deep_dive_focus が入力された場合、第2段階の深掘りも実行する。
     """
     try:
-        llm_service = get_llm_service()
-        researcher = DeskResearcher(llm_service)
-        return await researcher.research(input)
+        return await get_orchestrator().desk_researcher.research(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/desk-research/deep-dive", response_model=DeskResearchStage2)
+@router.post("/desk-research/deep-dive", response_model=DeskResearchStage2, dependencies=[Depends(_step_admission)])
 async def desk_research_deep_dive(input: DeskResearchInput) -> DeskResearchStage2:
     """
     Vol.6: デスクリサーチ第2段階のみ実行（深掘り）。
@@ -427,14 +1302,12 @@ async def desk_research_deep_dive(input: DeskResearchInput) -> DeskResearchStage
     deep_dive_focus に深掘り対象を指定すること。
     """
     try:
-        llm_service = get_llm_service()
-        researcher = DeskResearcher(llm_service)
-        return await researcher.research_stage2(input)
+        return await get_orchestrator().desk_researcher.research_stage2(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/social-listening", response_model=SocialListeningResult)
+@router.post("/social-listening", response_model=SocialListeningResult, dependencies=[Depends(_step_admission)])
 async def social_listening(input: SocialListeningInput) -> SocialListeningResult:
     """
     Vol.7: ソーシャルリスニング分析。
@@ -443,14 +1316,12 @@ async def social_listening(input: SocialListeningInput) -> SocialListeningResult
     sns_data が空の場合はカテゴリの一般的な傾向から推測する。
     """
     try:
-        llm_service = get_llm_service()
-        analyzer = SocialListeningAnalyzer(llm_service)
-        return await analyzer.analyze(input)
+        return await get_orchestrator().social_listening_analyzer.analyze(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/interview-analysis", response_model=InterviewAnalysisResult)
+@router.post("/interview-analysis", response_model=InterviewAnalysisResult, dependencies=[Depends(_step_admission)])
 async def interview_analysis(input: InterviewAnalysisInput) -> InterviewAnalysisResult:
     """
     Vol.8: インタビュー分析 — 文字起こしを構造化分析する。
@@ -458,14 +1329,12 @@ async def interview_analysis(input: InterviewAnalysisInput) -> InterviewAnalysis
     インタビュー発話録をAIで構造化し、インサイトを抽出する。
     """
     try:
-        llm_service = get_llm_service()
-        analyzer = InterviewAnalyzer(llm_service)
-        return await analyzer.analyze(input)
+        return await get_orchestrator().interview_analyzer.analyze(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/strategy-synthesis", response_model=StrategySynthesisResult)
+@router.post("/strategy-synthesis", response_model=StrategySynthesisResult, dependencies=[Depends(_step_admission)])
 async def strategy_synthesis(input: StrategySynthesisInput) -> StrategySynthesisResult:
     """
     WHY/WHO/WHAT/HOW 戦略合成。
@@ -474,25 +1343,19 @@ async def strategy_synthesis(input: StrategySynthesisInput) -> StrategySynthesis
     入力として、WHY → WHO → WHAT → HOW の4層からなる戦略フレームに統合する。
     """
     try:
-        llm_service = get_llm_service()
-        synthesizer = StrategySynthesizer(llm_service)
-        return await synthesizer.synthesize(input)
+        return await get_orchestrator().strategy_synthesizer.synthesize(input)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/provider")
+@router.post("/provider", deprecated=True)
 async def set_provider(provider: Literal["openai", "anthropic"]) -> dict:
     """
-    Set the LLM provider for subsequent requests.
+    Deprecated: the provider is no longer switched process-wide.
 
-    Note: This only affects the current session.
-    For persistent changes, modify the .env file.
+    Changing the shared setting only affected the worker process that handled
+    the request. Send `X-LLM-Provider` (and optionally `X-LLM-Model`) with each
+    request instead; this endpoint only validates the provider and returns the
+    headers to send. The default is `LLM_PROVIDER`.
     """
-    from app.config import get_settings
-
-    settings = get_settings()
-    # Note: This is a simplified implementation
-    # In production, you'd want proper state management
-    settings.llm_provider = provider
-    return {"status": "ok", "provider": provider}
+    return {"status": "ok", "provider": provider, "headers": {"X-LLM-Provider": provider}}
@@ -1,6 +1,6 @@
 """広告企画6案生成モジュール."""
 
-from pathlib import Path
+from typing import Callable
 
 from app.models.schemas import (
     BriefInput,
@@ -15,6 +15,9 @@ from app.models.schemas import (
     Vol5Evaluation,
 )
 from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class AdPlanGenerator:
@@ -22,10 +25,10 @@ class AdPlanGenerator:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "ad_planning.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("ad_planning")
 
     def _build_user_prompt(
         self,
@@ -33,7 +36,22 @@ class AdPlanGenerator:
         who: WhoAnalysis,
         what: WhatAnalysis,
         big_idea: BigIdea,
+        depth: DepthProfile,
+        pack: ContextPack | None = None,
     ) -> str:
+        desc = brief.product_description or "（商品名から推測してください）"
+        instruction = "上記の情報を踏まえて、6つの発想法それぞれを用いた広告企画を1案ずつ生成してください。" + depth.directive(
+            f"6つの発想法のうち最も有効な{depth.ad_plan_count}つを選び、{depth.ad_plan_count}案のみ生成すること。"
+            f"OOHコピーは各{depth.ooh_copy_count}本、新しい視点は3項目。"
+            + ("" if depth.integrated_campaign else "integrated_campaign と vol5_evaluation は出力しないこと。")
+        )
+        if pack and pack.strategy_block:
+            # 案件情報と WHO/WHAT 分析サマリーは共有プレフィックス側にある
+            return f"""## BIG IDEA
+{big_idea.idea}
+
+{instruction}"""
+
         # Extract key insights
         primary_segment = next(
             (s for s in who.segments if s.priority == "primary"),
@@ -43,8 +61,6 @@ class AdPlanGenerator:
         key_insight = who.insights[0].insight if who.insights else "未指定"
         key_tension = who.insights[0].tension if who.insights else "未指定"
 
-        desc = brief.product_description or "（商品名から推測してください）"
-
         return f"""## 案件情報
 
 **製品・サービス名**: {brief.product_name}
@@ -73,7 +89,64 @@ class AdPlanGenerator:
 ## 差別化要素
 {', '.join(what.differentiation[:3])}
 
-上記の情報を踏まえて、6つの発想法それぞれを用いた広告企画を1案ずつ生成してください。"""
+{instruction}"""
+
+    @staticmethod
+    def _parse_plan(plan_data: dict) -> AdPlan:
+        """LLM の出力1案分を AdPlan に変換する。"""
+        ooh_copies = [
+            OOHCopy(
+                text=c.get("copy", ""),
+                rationale=c.get("rationale", ""),
+            )
+            for c in plan_data.get("ooh_copies", [])
+        ]
+        sns_posts = [
+            SNSPost(
+                format=p.get("format", ""),
+                content=p.get("content", ""),
+            )
+            for p in plan_data.get("sns_posts", [])
+        ]
+        # Parse integrated campaign
+        ic_data = plan_data.get("integrated_campaign", {})
+        integrated_campaign = None
+        if ic_data:
+            integrated_campaign = IntegratedCampaign(
+                video_concept=ic_data.get("video_concept", ""),
+                kol_strategy=ic_data.get("kol_strategy", ""),
+                ooh_placement=ic_data.get("ooh_placement", ""),
+                ugc_campaign=ic_data.get("ugc_campaign", ""),
+                banner_format=ic_data.get("banner_format", ""),
+            )
+
+        # Parse Vol.5 evaluation
+        v5_data = plan_data.get("vol5_evaluation", {})
+        vol5_evaluation = None
+        if v5_data:
+            vol5_evaluation = Vol5Evaluation(
+                goal_alignment=v5_data.get("goal_alignment", 0),
+                feasibility=v5_data.get("feasibility", 0),
+                competitive_advantage=v5_data.get("competitive_advantage", 0),
+                logical_soundness=v5_data.get("logical_soundness", 0),
+                creative_inspiration=v5_data.get("creative_inspiration", 0),
+                total=v5_data.get("total", 0),
+                verdict=v5_data.get("verdict", ""),
+            )
+
+        return AdPlan(
+            plan_name=plan_data.get("plan_name", ""),
+            method=plan_data.get("method", ""),
+            core_message=plan_data.get("core_message", ""),
+            mechanism=plan_data.get("mechanism", ""),
+            ooh_copies=ooh_copies,
+            sns_posts=sns_posts,
+            experiential_tactic=plan_data.get("experiential_tactic", ""),
+            success_criteria=plan_data.get("success_criteria", ""),
+            kpi_examples=plan_data.get("kpi_examples", []),
+            integrated_campaign=integrated_campaign,
+            vol5_evaluation=vol5_evaluation,
+        )
 
     async def generate(
         self,
@@ -81,76 +154,29 @@ class AdPlanGenerator:
         who: WhoAnalysis,
         what: WhatAnalysis,
         big_idea: BigIdea,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[AdPlan], None] | None = None,
     ) -> AdPlanResult:
-        """広告企画6案を生成する."""
+        """広告企画6案を生成する（件数は分析深度に従う）.
+
+        on_item を指定すると、企画が1案生成されるたびに呼ぶ。
+        """
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(brief, who, what, big_idea)
+        user_prompt = self._build_user_prompt(brief, who, what, big_idea, depth, pack)
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.85,
-            max_tokens=8192,
+            max_tokens=depth.max_tokens(8192),
+            context_blocks=pack.prefix_blocks() if pack else (),
+            item_key="plans",
+            on_item=(lambda item: on_item(self._parse_plan(item))) if on_item else None,
         )
 
-        # Parse plans
-        plans = []
-        for plan_data in result.get("plans", []):
-            ooh_copies = [
-                OOHCopy(
-                    text=c.get("copy", ""),
-                    rationale=c.get("rationale", ""),
-                )
-                for c in plan_data.get("ooh_copies", [])
-            ]
-            sns_posts = [
-                SNSPost(
-                    format=p.get("format", ""),
-                    content=p.get("content", ""),
-                )
-                for p in plan_data.get("sns_posts", [])
-            ]
-            # Parse integrated campaign
-            ic_data = plan_data.get("integrated_campaign", {})
-            integrated_campaign = None
-            if ic_data:
-                integrated_campaign = IntegratedCampaign(
-                    video_concept=ic_data.get("video_concept", ""),
-                    kol_strategy=ic_data.get("kol_strategy", ""),
-                    ooh_placement=ic_data.get("ooh_placement", ""),
-                    ugc_campaign=ic_data.get("ugc_campaign", ""),
-                    banner_format=ic_data.get("banner_format", ""),
-                )
-
-            # Parse Vol.5 evaluation
-            v5_data = plan_data.get("vol5_evaluation", {})
-            vol5_evaluation = None
-            if v5_data:
-                vol5_evaluation = Vol5Evaluation(
-                    goal_alignment=v5_data.get("goal_alignment", 0),
-                    feasibility=v5_data.get("feasibility", 0),
-                    competitive_advantage=v5_data.get("competitive_advantage", 0),
-                    logical_soundness=v5_data.get("logical_soundness", 0),
-                    creative_inspiration=v5_data.get("creative_inspiration", 0),
-                    total=v5_data.get("total", 0),
-                    verdict=v5_data.get("verdict", ""),
-                )
-
-            plans.append(
-                AdPlan(
-                    plan_name=plan_data.get("plan_name", ""),
-                    method=plan_data.get("method", ""),
-                    core_message=plan_data.get("core_message", ""),
-                    mechanism=plan_data.get("mechanism", ""),
-                    ooh_copies=ooh_copies,
-                    sns_posts=sns_posts,
-                    experiential_tactic=plan_data.get("experiential_tactic", ""),
-                    success_criteria=plan_data.get("success_criteria", ""),
-                    kpi_examples=plan_data.get("kpi_examples", []),
-                    integrated_campaign=integrated_campaign,
-                    vol5_evaluation=vol5_evaluation,
-                )
-            )
+        plans = [self._parse_plan(plan_data) for plan_data in result.get("plans", [])]
 
         return AdPlanResult(
             brand_concept=result.get("brand_concept", ""),
@@ -0,0 +1,165 @@
+"""Batch analysis — 複数ブリーフの一括実行.
+
+- 同時に実行するブリーフ数は concurrency 件まで（スライディングウィンドウ）。
+  入力はイテレーターから必要な分だけ読み進めるため、ブリーフ数が多くても
+  メモリに載るのはウィンドウ内のブリーフと結果だけになる
+- LLM 呼び出しはバッチ全体で llm_concurrency 枠を共有する。待ち行列は FIFO なので、
+  先に始まったブリーフが枠を独占せず、各ブリーフの呼び出しが交互に進む
+- 結果は完了した順に BatchItem として流す（入力順ではない。index で対応付ける）
+- 必須ステップが失敗した分析は例外にならず部分的な結果を返すため、status は
+  "partial"（StrategyResult.errors に必須ステップがある）として失敗と同様に扱う
+"""
+
+import asyncio
+import contextvars
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass
+from typing import IO, AsyncIterator, Container, Iterable, Iterator, Literal
+
+from pydantic import ValidationError
+
+from app.models.schemas import AnalysisDepth, BriefInput, Section, StrategyResult
+from app.services.llm import llm_call_slots
+from .orchestrator import StrategyOrchestrator
+
+
+@dataclass
+class BatchItem:
+    """1ブリーフ分の結果（失敗時は error のみ。必須ステップの失敗は result.errors に入る）。"""
+
+    index: int
+    product_name: str
+    result: StrategyResult | None = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def status(self) -> Literal["complete", "partial", "failed"]:
+        if self.error is not None:
+            return "failed"
+        if self.result is not None and any(error.required for error in self.result.errors):
+            return "partial"
+        return "complete"
+
+    def to_dict(self) -> dict:
+        line: dict = {
+            "index": self.index,
+            "product_name": self.product_name,
+            "status": self.status,
+            "elapsed_seconds": round(self.elapsed, 2),
+        }
+        if self.result is not None:
+            line["result"] = self.result.model_dump(exclude_unset=True)
+        if self.error is not None:
+            line["error"] = self.error
+        return line
+
+    def to_ndjson(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False) + "\n"
+
+
+def iter_jsonl_briefs(lines: Iterable[str]) -> Iterator[BriefInput | ValueError]:
+    """JSONL（1行1ブリーフ）からブリーフを読む。空行は読み飛ばす（index には数えない）。
+
+    不正な行は例外を送出せず ValueError として返す。
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield BriefInput.model_validate_json(line)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(loc) for loc in error["loc"])
+            yield ValueError(f"{line_no}行目が不正です（{field}: {error['msg']}）")
+
+
+def iter_csv_briefs(stream: IO[bytes]) -> Iterator[BriefInput | ValueError]:
+    """CSV（1行目は BriefInput のフィールド名）から1行ずつブリーフを読む。
+
+    不正な行は例外を送出せず ValueError として返し、バッチ全体は止めない。
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            fields = {
+                key.strip(): (value or "").strip()
+                for key, value in row.items()
+                if key and key.strip() in BriefInput.model_fields
+            }
+            if not fields.get("product_name"):
+                yield ValueError(f"CSV {line_no}行目が不正です（product_name が空です）")
+                continue
+            try:
+                yield BriefInput(**fields)
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(loc) for loc in error["loc"])
+                yield ValueError(f"CSV {line_no}行目が不正です（{field}: {error['msg']}）")
+    finally:
+        # 呼び出し側が閉じる元のストリームは閉じない
+        text.detach()
+
+
+async def run_batch(
+    orchestrator: StrategyOrchestrator,
+    briefs: Iterable[BriefInput | Exception],
+    concurrency: int = 4,
+    llm_concurrency: int = 8,
+    sections: Iterable[Section] | None = None,
+    depth: AnalysisDepth | None = None,
+    skip: Container[int] = (),
+) -> AsyncIterator[BatchItem]:
+    """ブリーフを上限付きの並列度で分析し、完了した順に結果を流す。
+
+    skip に含まれる index のブリーフは実行しない（中断後の再開用。index は入力上の位置のまま）。
+    途中で閉じられた場合（クライアント切断など）は実行中の分析をキャンセルする。
+    """
+    # LLM 呼び出し枠はこのバッチのタスクにだけ設定する（呼び出し元のコンテキストは汚さない）
+    context = contextvars.copy_context()
+    context.run(llm_call_slots.set, asyncio.Semaphore(llm_concurrency))
+    sections = list(sections) if sections else None
+
+    async def analyze(index: int, brief: BriefInput) -> BatchItem:
+        started = time.monotonic()
+        try:
+            result = await orchestrator.run_full_analysis(brief, sections, depth)
+        except Exception as e:
+            return BatchItem(
+                index,
+                brief.product_name,
+                error=str(e) or type(e).__name__,
+                elapsed=time.monotonic() - started,
+            )
+        return BatchItem(index, brief.product_name, result=result, elapsed=time.monotonic() - started)
+
+    source = enumerate(briefs)
+    running: set[asyncio.Task[BatchItem]] = set()
+    exhausted = False
+    try:
+        while True:
+            # ウィンドウが空くまで入力を読み進める
+            while not exhausted and len(running) < concurrency:
+                try:
+                    index, brief = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if index in skip:
+                    continue
+                if isinstance(brief, Exception):
+                    yield BatchItem(index, "", error=str(brief))
+                    continue
+                running.add(asyncio.create_task(analyze(index, brief), context=context))
+
+            if not running:
+                return
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in running:
+            task.cancel()
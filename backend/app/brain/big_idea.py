@@ -1,9 +1,10 @@
 """BIG IDEA Generation - ビッグアイデア生成."""
 
-from pathlib import Path
-
 from app.models.schemas import WhoAnalysis, WhatAnalysis, BigIdea
 from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class BigIdeaGenerator:
@@ -11,14 +12,20 @@ class BigIdeaGenerator:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "bigidea.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("bigidea")
 
-    def _build_user_prompt(self, who: WhoAnalysis, what: WhatAnalysis) -> str:
+    def _build_user_prompt(
+        self, who: WhoAnalysis, what: WhatAnalysis, pack: ContextPack | None = None
+    ) -> str:
         """Build user prompt from WHO and WHAT analysis."""
+        if pack and pack.strategy_block:
+            # WHO/WHAT の要点は共有プレフィックス側にある
+            return "上記のWHO/WHAT分析サマリーに基づいて、最も強力なBIG IDEAを生成してください。"
+
         # Extract key insights from WHO
         insights_text = "\n".join(
             f"- {i.insight} (テンション: {i.tension})"
@@ -57,16 +64,24 @@ class BigIdeaGenerator:
 
 上記のWHO/WHAT分析に基づいて、最も強力なBIG IDEAを生成してください。"""
 
-    async def generate(self, who: WhoAnalysis, what: WhatAnalysis) -> BigIdea:
+    async def generate(
+        self,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> BigIdea:
         """Generate BIG IDEA based on WHO and WHAT analysis."""
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(who, what)
+        user_prompt = self._build_user_prompt(who, what, pack) + depth.directive()
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.8,  # Slightly higher for creativity
-            max_tokens=6144,
+            max_tokens=depth.max_tokens(6144),
+            context_blocks=pack.prefix_blocks() if pack else (),
         )
 
         try:
@@ -0,0 +1,205 @@
+"""Context pack — 1回の実行で各ステップが共有する、圧縮済みのコンテキスト.
+
+パイプラインの各ステップはブリーフと上流の結果をそれぞれ自前でプロンプトに
+書き出していたため、背景情報（添付ファイルの要約・デスクリサーチ・インタビューの追記）や
+WHO/WHAT の要約が、ステップごとに少しずつ違う形で何度も送られていた。
+
+ContextPack は実行ごとに一度だけ組み立て、以降のステップは同じブロックを参照する。
+
+- base_block: ブリーフの基本項目 + 背景情報（重複行を除き CONTEXT_PACK_MAX_CHARS で切り詰める）
+- findings: デスクリサーチ・インタビュー分析の要点
+- strategy_block: WHO/WHAT の要点
+
+prefix_blocks() はこれらを常に同じ順序・同じバイト列で返し、LLMService はそれを
+system プロンプトより前に置く。実行内の全ステップでプロンプトの先頭が一致するため、
+プロバイダーのプレフィックスキャッシュが効く（ブロックの境界がキャッシュのブレークポイント）。
+ステップ固有の指示・データはその後ろに続ける。
+"""
+
+import re
+from dataclasses import dataclass, replace
+
+from app.models.schemas import (
+    BriefInput,
+    DeskResearchResult,
+    InterviewAnalysisResult,
+    WhatAnalysis,
+    WhoAnalysis,
+)
+
+# 背景情報の既定の文字数上限
+DEFAULT_MAX_CHARS = 4000
+
+# strategy_block に載せる各リストの件数
+_TOP_N = 3
+
+# 1項目あたりの文字数上限（LLM の出力が異常に長い場合の保険）
+_ITEM_CHARS = 300
+
+_WHITESPACE = re.compile(r"\s+")
+
+# 共有プレフィックスにある項目を、ステップ固有のプロンプト側で指すときの表記
+SHARED_CONTEXT_REF = "（冒頭のブリーフ情報を参照）"
+
+
+def _clip(text: str, limit: int = _ITEM_CHARS) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def compact_text(text: str, max_chars: int, seen: set[str] | None = None) -> str:
+    """重複行・空行の連続を除き、max_chars で切り詰める。
+
+    seen に含まれる行（空白を正規化して比較）も重複とみなして除く。
+    """
+    seen = set() if seen is None else set(seen)
+    lines: list[str] = []
+    blank = False
+    for line in text.splitlines():
+        key = _WHITESPACE.sub(" ", line).strip()
+        if not key:
+            if lines and not blank:
+                lines.append("")
+            blank = True
+            continue
+        # 見出しなどの短い行は繰り返しても意味が変わるため除かない
+        if len(key) > 20 and key in seen:
+            continue
+        seen.add(key)
+        lines.append(line.rstrip())
+        blank = False
+    compacted = "\n".join(lines).strip()
+    if len(compacted) > max_chars:
+        compacted = compacted[:max_chars].rstrip() + "\n…（以下省略）"
+    return compacted
+
+
+def render_full_block(brief_block: str, additional_info: str) -> str:
+    """ブリーフの基本項目 + その他の情報。"""
+    return f"{brief_block}\n**その他の情報**:\n{additional_info or 'なし'}\n"
+
+
+def render_brief_block(brief: BriefInput) -> str:
+    """ブリーフの基本項目（背景情報を除く）。"""
+    return f"""## ブリーフ情報
+
+**製品・サービス名**: {brief.product_name}
+
+**製品・サービス概要**:
+{brief.product_description}
+
+**ターゲット市場**:
+{brief.target_market or "未指定"}
+
+**現状・課題**:
+{brief.current_situation or "未指定"}
+
+**達成目標**:
+{brief.objectives or "未指定"}
+
+**競合情報**:
+{brief.competitors or "未指定"}
+"""
+
+
+@dataclass(frozen=True)
+class ContextPack:
+    """1回の実行で共有するコンテキスト（不変。上流の結果が出るたびに作り直す）。"""
+
+    brief: BriefInput
+    brief_block: str
+    background: str
+    base_block: str
+    findings: str = ""
+    strategy_block: str = ""
+
+    @classmethod
+    def from_brief(cls, brief: BriefInput, max_chars: int = DEFAULT_MAX_CHARS) -> "ContextPack":
+        # ブリーフの基本項目と同じ行は背景情報から除く
+        fields = (
+            brief.product_name,
+            brief.product_description,
+            brief.target_market,
+            brief.current_situation,
+            brief.objectives,
+            brief.competitors,
+        )
+        seen = {
+            _WHITESPACE.sub(" ", line).strip()
+            for field in fields if field
+            for line in field.splitlines()
+        }
+        brief_block = render_brief_block(brief)
+        background = compact_text(brief.additional_info or "", max_chars, seen)
+        return cls(
+            brief=brief,
+            brief_block=brief_block,
+            background=background,
+            base_block=render_full_block(brief_block, background),
+        )
+
+    def prefix_blocks(self) -> tuple[str, ...]:
+        """プロンプトの先頭に置く共有ブロック（後段ほど後ろに足されるだけで、前のブロックは変わらない）。"""
+        return tuple(block for block in (self.base_block, self.findings, self.strategy_block) if block)
+
+    def with_findings(
+        self,
+        desk_research: DeskResearchResult | None = None,
+        interview_analysis: InterviewAnalysisResult | None = None,
+    ) -> "ContextPack":
+        """デスクリサーチ・インタビュー分析の要点を加える。"""
+        parts = []
+        if desk_research and desk_research.stage1:
+            s1 = desk_research.stage1
+            parts.append(
+                "## デスクリサーチ結果\n"
+                f"市場構造: {_clip(s1.market_structure, 800)}\n"
+                f"主要プレイヤー: {'; '.join(p.player_name for p in s1.player_communications[:_TOP_N])}\n"
+                f"語られていない盲点: {'; '.join(bs.title for bs in s1.blind_spots[:_TOP_N])}"
+            )
+        if interview_analysis:
+            insights = "\n".join(f"- {_clip(i.insight_text)}" for i in interview_analysis.insights[:_TOP_N])
+            directions = "\n".join(f"- {_clip(d)}" for d in interview_analysis.strategic_directions[:_TOP_N])
+            parts.append(f"## インタビュー分析インサイト\n{insights}\n戦略示唆:\n{directions}")
+        if not parts:
+            return self
+        return replace(self, findings="\n\n".join(parts))
+
+    def with_strategy(self, who: WhoAnalysis | None, what: WhatAnalysis | None) -> "ContextPack":
+        """WHO/WHAT の要点（BIG IDEA・コピー・広告企画が共有する）を加える。"""
+        sections = []
+        if who:
+            core = "\n".join(
+                f"- {key}: {_clip(str(value))}" for key, value in who.core_target.items() if value
+            )
+            primary = next(
+                (s for s in who.segments if s.priority == "primary"),
+                who.segments[0] if who.segments else None,
+            )
+            insights = "\n".join(
+                f"- {_clip(i.insight)}（葛藤: {_clip(i.tension)}）" for i in who.insights[:_TOP_N]
+            )
+            needs = "\n".join(f"- {_clip(n)}" for n in who.unmet_needs[:_TOP_N])
+            sections.append(
+                "## WHO分析サマリー\n"
+                f"### コアターゲット\n{core or '未指定'}\n"
+                f"### 主要セグメント\n{_clip(primary.description) if primary else '未指定'}\n"
+                f"### 消費者インサイト\n{insights or '未指定'}\n"
+                f"### 未充足ニーズ\n{needs or '未指定'}"
+            )
+        if what:
+            vp = what.value_proposition
+            strengths = "\n".join(f"- {_clip(s)}" for s in what.brand_diagnosis.strengths[:_TOP_N])
+            differentiation = "\n".join(f"- {_clip(d)}" for d in what.differentiation[:_TOP_N])
+            sections.append(
+                "## WHAT分析サマリー\n"
+                f"### ブランドの強み\n{strengths or '未指定'}\n"
+                "### 提供価値\n"
+                f"- 機能的価値: {_clip(vp.functional_value)}\n"
+                f"- 情緒的価値: {_clip(vp.emotional_value)}\n"
+                f"- 社会的価値: {_clip(vp.social_value)}\n"
+                f"- コア・バリュー・プロポジション: {_clip(vp.core_proposition)}\n"
+                f"### 戦略的差別化要素\n{differentiation or '未指定'}\n"
+                f"### ポジショニング機会\n{_clip(what.market_analysis.positioning_opportunity)}"
+            )
+        return replace(self, strategy_block="\n\n".join(sections))
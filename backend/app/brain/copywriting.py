@@ -1,9 +1,12 @@
 """Copywriting - コピーライティング."""
 
-from pathlib import Path
+from typing import Callable
 
-from app.models.schemas import WhoAnalysis, WhatAnalysis, BigIdea, CopyOutput
+from app.models.schemas import WhoAnalysis, WhatAnalysis, BigIdea, CopyOutput, CopyVariation
 from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class CopyWriter:
@@ -11,16 +14,35 @@ class CopyWriter:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "copy.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("copy")
 
     def _build_user_prompt(
-        self, big_idea: BigIdea, who: WhoAnalysis, what: WhatAnalysis
+        self,
+        big_idea: BigIdea,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        depth: DepthProfile,
+        pack: ContextPack | None = None,
     ) -> str:
         """Build user prompt from BIG IDEA and analyses."""
+        instruction = f"""上記のBIG IDEAに基づいて、{depth.copy_count}本のコピー案を生成してください。
+各案は異なるアングルやテクニックを使用し、多様性を持たせてください。""" + depth.directive(
+            f"コピー案は{depth.copy_count}本。4つのレバーから偏りなく選ぶこと。"
+        )
+        if pack and pack.strategy_block:
+            # ターゲット・インサイト・提供価値は共有プレフィックスの WHO/WHAT 分析サマリーにある
+            return f"""## BIG IDEA
+{big_idea.idea}
+
+### BIG IDEAの根拠
+{big_idea.rationale}
+
+{instruction}"""
+
         # Extract primary target
         primary_segment = next(
             (s for s in who.segments if s.priority == "primary"),
@@ -51,21 +73,33 @@ class CopyWriter:
 ## コア・バリュー・プロポジション
 {what.value_proposition.core_proposition}
 
-上記のBIG IDEAに基づいて、10本のコピー案を生成してください。
-各案は異なるアングルやテクニックを使用し、多様性を持たせてください。"""
+{instruction}"""
 
     async def write(
-        self, big_idea: BigIdea, who: WhoAnalysis, what: WhatAnalysis
+        self,
+        big_idea: BigIdea,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[CopyVariation], None] | None = None,
     ) -> CopyOutput:
-        """Generate copy variations based on BIG IDEA."""
+        """Generate copy variations based on BIG IDEA.
+
+        on_item を指定すると、コピー案が1本生成されるたびに呼ぶ。
+        """
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(big_idea, who, what)
+        user_prompt = self._build_user_prompt(big_idea, who, what, depth, pack)
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.9,  # Higher for creative diversity
-            max_tokens=8192,
+            max_tokens=depth.max_tokens(8192),
+            context_blocks=pack.prefix_blocks() if pack else (),
+            item_key="variations",
+            on_item=(lambda item: on_item(CopyVariation(**item))) if on_item else None,
         )
 
         try:
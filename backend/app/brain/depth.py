@@ -0,0 +1,107 @@
+"""Analysis depth profiles — quick / standard / deep.
+
+出力件数・max_tokens・任意ステージの実行有無をまとめて切り替える。
+deep は従来どおりの挙動（プロンプトも従来と同一）で、quick / standard では
+ユーザープロンプト末尾に件数の上書き指示を加え、max_tokens を縮める。
+"""
+
+from dataclasses import dataclass
+
+from app.config import get_settings
+from app.models.schemas import AnalysisDepth
+
+
+@dataclass(frozen=True)
+class DepthProfile:
+    """分析深度ごとの出力量とステージ構成."""
+
+    name: AnalysisDepth
+    barrier_count: int
+    causal_relation_count: int
+    abc_min_per_class: int
+    copy_count: int
+    ad_plan_count: int
+    ooh_copy_count: int
+    integrated_campaign: bool
+    token_scale: float
+    desk_research: bool
+    interview_analysis: bool
+    hosoda_3d: bool
+
+    @property
+    def is_deep(self) -> bool:
+        return self.name == "deep"
+
+    def max_tokens(self, base: int) -> int:
+        """アナライザー既定の max_tokens をこの深度用に縮める。"""
+        return max(1024, int(base * self.token_scale))
+
+    def includes(self, step: str) -> bool:
+        """任意ステージをこの深度で実行するか（本筋のステップは常に True）。"""
+        return getattr(self, step, True) is not False
+
+    def directive(self, counts: str = "") -> str:
+        """quick / standard 用の上書き指示。deep では空文字（従来のプロンプトのまま）。"""
+        if self.is_deep:
+            return ""
+        note = (
+            f"\n\n## 分析深度: {self.name}\n"
+            "システム指示にある件数よりも、この指示の件数を優先してください。"
+            "各項目は要点を絞って簡潔に記述してください。"
+        )
+        if counts:
+            note += f"\n{counts}"
+        return note
+
+
+DEPTH_PROFILES: dict[AnalysisDepth, DepthProfile] = {
+    "quick": DepthProfile(
+        name="quick",
+        barrier_count=10,
+        causal_relation_count=12,
+        abc_min_per_class=2,
+        copy_count=3,
+        ad_plan_count=2,
+        ooh_copy_count=2,
+        integrated_campaign=False,
+        token_scale=0.35,
+        desk_research=False,
+        interview_analysis=False,
+        hosoda_3d=False,
+    ),
+    "standard": DepthProfile(
+        name="standard",
+        barrier_count=20,
+        causal_relation_count=30,
+        abc_min_per_class=3,
+        copy_count=6,
+        ad_plan_count=3,
+        ooh_copy_count=3,
+        integrated_campaign=False,
+        token_scale=0.6,
+        desk_research=True,
+        interview_analysis=True,
+        hosoda_3d=True,
+    ),
+    "deep": DepthProfile(
+        name="deep",
+        barrier_count=30,
+        causal_relation_count=50,
+        abc_min_per_class=5,
+        copy_count=10,
+        ad_plan_count=6,
+        ooh_copy_count=5,
+        integrated_campaign=True,
+        token_scale=1.0,
+        desk_research=True,
+        interview_analysis=True,
+        hosoda_3d=True,
+    ),
+}
+
+
+def get_depth_profile(depth: AnalysisDepth | DepthProfile | None = None) -> DepthProfile:
+    """深度名（省略時は設定の既定値）からプロファイルを引く。"""
+    if isinstance(depth, DepthProfile):
+        return depth
+    return DEPTH_PROFILES[depth or get_settings().default_depth]
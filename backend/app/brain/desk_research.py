@@ -1,7 +1,5 @@
 """Vol.6 デスクリサーチ — 俯瞰マップ + 深掘り."""
 
-from pathlib import Path
-
 from app.models.schemas import (
     DeskResearchInput,
     DeskResearchResult,
@@ -14,6 +12,9 @@ from app.models.schemas import (
     DeskResearchDisruptionPoint,
 )
 from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class DeskResearcher:
@@ -21,8 +22,7 @@ class DeskResearcher:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.stage1_prompt_path = Path(__file__).parent / "prompts" / "desk_research.txt"
-        self.stage2_prompt_path = Path(__file__).parent / "prompts" / "desk_research_deep.txt"
+        self.prompts = get_prompt_registry()
 
     def _build_stage1_prompt(self, input: DeskResearchInput) -> str:
         prompt = f"""## 対象カテゴリ
@@ -47,16 +47,25 @@ class DeskResearcher:
         prompt += "\n上記の深掘り対象について、第2段階（深掘り）のデスクリサーチを行ってください。"
         return prompt
 
-    async def research_stage1(self, input: DeskResearchInput) -> DeskResearchStage1:
+    async def research_stage1(
+        self,
+        input: DeskResearchInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> DeskResearchStage1:
         """第1段階: 俯瞰マップを生成する."""
-        system_prompt = self.stage1_prompt_path.read_text(encoding="utf-8")
-        user_prompt = self._build_stage1_prompt(input)
+        depth = get_depth_profile(depth)
+        system_prompt = self.prompts.text("desk_research")
+        user_prompt = self._build_stage1_prompt(input) + depth.directive(
+            "盲点・論点はそれぞれ3つ、主要プレイヤーは3社まで。"
+        )
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.7,
-            max_tokens=8192,
+            max_tokens=depth.max_tokens(8192),
+            context_blocks=pack.prefix_blocks() if pack else (),
         )
 
         blind_spots = [
@@ -81,7 +90,7 @@ class DeskResearcher:
 
     async def research_stage2(self, input: DeskResearchInput, stage1: DeskResearchStage1 | None = None) -> DeskResearchStage2:
         """第2段階: 深掘り."""
-        system_prompt = self.stage2_prompt_path.read_text(encoding="utf-8")
+        system_prompt = self.prompts.text("desk_research_deep")
         stage1_summary = stage1.market_structure[:500] if stage1 else ""
         user_prompt = self._build_stage2_prompt(input, stage1_summary)
 
@@ -1,9 +1,8 @@
 """Vol.5 企画評価 — 5軸スコアリング."""
 
-from pathlib import Path
-
 from app.models.schemas import EvaluationInput, EvaluationResult, EvaluationAxisScore
 from app.services.llm import LLMService
+from .prompt_registry import get_prompt_registry
 
 
 class PlanEvaluator:
@@ -11,10 +10,10 @@ class PlanEvaluator:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "evaluation.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("evaluation")
 
     def _build_user_prompt(self, input: EvaluationInput) -> str:
         prompt = f"""## 企画内容
@@ -4,8 +4,6 @@
 オーケストレーター側で並列実行し、メインフローへの干渉はない。
 """
 
-from pathlib import Path
-
 from app.models.schemas import (
     BriefInput,
     Hosoda3DResult,
@@ -16,6 +14,9 @@ from app.models.schemas import (
     DesignIdea,
 )
 from app.services.llm import LLMService
+from .context_pack import SHARED_CONTEXT_REF, ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class Hosoda3DAnalyzer:
@@ -29,26 +30,35 @@ class Hosoda3DAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_template = self._load_prompt()
-
-    def _load_prompt(self) -> str:
-        prompt_path = Path(__file__).parent / "prompts" / "hosoda_3d.txt"
-        return prompt_path.read_text(encoding="utf-8")
-
-    def _build_prompt(self, brief: BriefInput) -> str:
-        """ブリーフ情報をテンプレートに埋め込む（JSON内の{} と衝突しないよう replace を使用）。"""
-        prompt = self.prompt_template
-        prompt = prompt.replace("{product_name}", brief.product_name)
-        prompt = prompt.replace("{product_description}", brief.product_description or "")
-        prompt = prompt.replace("{objectives}", brief.objectives or "未設定")
-        prompt = prompt.replace("{current_situation}", brief.current_situation or "未設定")
-        prompt = prompt.replace("{target_market}", brief.target_market or "未設定")
-        prompt = prompt.replace("{additional_info}", brief.additional_info or "なし")
-        return prompt
-
-    async def analyze(self, brief: BriefInput) -> Hosoda3DResult:
+        self.prompts = get_prompt_registry()
+
+    def _build_prompt(self, brief: BriefInput, pack: ContextPack | None = None) -> str:
+        """ブリーフ情報をテンプレートに埋め込む（JSON内の{} と衝突しないよう str.format は使わない）。"""
+        template = self.prompts.get("hosoda_3d")
+        if pack:
+            # ブリーフは共有プレフィックス側にあるため、製品名以外は参照にとどめる
+            return template.render(
+                product_name=brief.product_name,
+                **{name: SHARED_CONTEXT_REF for name in template.placeholders - {"product_name"}},
+            )
+        return template.render(
+            product_name=brief.product_name,
+            product_description=brief.product_description or "",
+            objectives=brief.objectives or "未設定",
+            current_situation=brief.current_situation or "未設定",
+            target_market=brief.target_market or "未設定",
+            additional_info=brief.additional_info or "なし",
+        )
+
+    async def analyze(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> Hosoda3DResult:
         """3Dモデルによる完全分析を実行（別視点分析 — 本筋フローに干渉しない）。"""
-        prompt = self._build_prompt(brief)
+        depth = get_depth_profile(depth)
+        prompt = self._build_prompt(brief, pack) + depth.directive()
 
         try:
             # generate_json() を使いJSON専用の指示を system に注入してパースまで行う
@@ -56,7 +66,8 @@ class Hosoda3DAnalyzer:
                 system_prompt=self.SYSTEM_PROMPT,
                 user_prompt=prompt,
                 temperature=0.7,
-                max_tokens=4096,
+                max_tokens=depth.max_tokens(4096),
+                context_blocks=pack.prefix_blocks() if pack else (),
             )
         except Exception:
             data = self._fallback_structure(brief)
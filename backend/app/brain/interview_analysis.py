@@ -1,7 +1,5 @@
 """Vol.8 定性調査 — インタビュー分析."""
 
-from pathlib import Path
-
 from app.models.schemas import (
     InterviewAnalysisInput,
     InterviewAnalysisResult,
@@ -10,6 +8,9 @@ from app.models.schemas import (
     InterviewInsight,
 )
 from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class InterviewAnalyzer:
@@ -17,7 +18,7 @@ class InterviewAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "interview_analysis.txt"
+        self.prompts = get_prompt_registry()
 
     def _build_user_prompt(self, input: InterviewAnalysisInput) -> str:
         prompt = f"""## 調査目的
@@ -36,16 +37,23 @@ class InterviewAnalyzer:
 """
         return prompt
 
-    async def analyze(self, input: InterviewAnalysisInput) -> InterviewAnalysisResult:
-        """インタビュー発話録を分析する."""
-        system_prompt = self.prompt_path.read_text(encoding="utf-8")
-        user_prompt = self._build_user_prompt(input)
+    async def analyze(
+        self,
+        input: InterviewAnalysisInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> InterviewAnalysisResult:
+        """インタビュー発話録を分析する（pack があれば共有プレフィックスを先頭に置く）."""
+        depth = get_depth_profile(depth)
+        system_prompt = self.prompts.text("interview_analysis")
+        user_prompt = self._build_user_prompt(input) + depth.directive()
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.6,
-            max_tokens=8192,
+            max_tokens=depth.max_tokens(8192),
+            context_blocks=pack.prefix_blocks() if pack else (),
         )
 
         key_statements = []
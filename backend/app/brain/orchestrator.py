@@ -12,13 +12,57 @@
             コピー / 広告企画 (並列)
 
 デスクリサーチ・インタビュー分析の結果はbrief.additional_infoに追記して後続ステップへ渡す。
+
+各ステージは asyncio.TaskGroup で並列実行する。ステップには必須/任意のポリシーがあり、
+必須ステップが失敗するとステージ内の残りのタスクを即座にキャンセルし、
+それまでに完了した結果とステップ別のエラーを含む StrategyResult を返す。
+任意ステップの失敗はエラーとして記録するのみで、パイプラインは継続する。
+
+sections を指定すると、要求された出力とその推移的な依存ステップだけを実行する
+（例: big_idea のみ → デスクリサーチ・障壁分析・WHO/WHAT・BIG IDEA。細田式3D・コピー・広告企画は呼ばない）。
+
+depth（quick / standard / deep）で各ステップの出力件数・max_tokens と、
+任意ステージ（デスクリサーチ・インタビュー分析・細田式3D）の実行有無を切り替える。
+深度で無効な任意ステージも、sections で明示的に要求された場合は実行する。
+
+ストリーミング版では、パイプラインと並行してブリーフのみから戦略スケッチ（preview）を
+1回のLLM呼び出しで生成し、最初の実質的な結果として流す。スケッチは各ステップの
+完了イベントで順次置き換えられる。
+
+ストリーミング版では、障壁・コピー案・広告企画の各要素を、LLM の応答から1件パースできるたびに
+item イベント（section・index・data）として流す。ステップの完了イベントが最終的な結果になる。
+
+running / keepalive イベントには、ステップ別の所要時間の移動統計（app.services.latency）
+から見積もった残り時間・完了予定時刻・進捗率を eta として付ける。
+
+budget_seconds（時間予算）を指定すると、締め切りまでの残り時間を各 LLM 呼び出しの
+タイムアウトとして伝播する。各ステージの開始前に残りステップの見積もりが予算を
+超えていれば、任意ステージの省略 → 分析深度の引き下げ → 広告企画の省略 →
+高速モデルへの切り替え、の順に縮退し、内容を StrategyResult.degradations に記録する。
+
+ブリーフと上流の結果は実行ごとに一度だけ ContextPack（app.brain.context_pack）に
+まとめ、各ステップはそれを共通のプロンプト先頭（プレフィックスキャッシュの対象）として渡す。
+入力トークン数とキャッシュから読んだ分は StrategyResult.usage に入る。
+
+ステップの結果・item・preview はそれぞれ一度だけ JSON にエンコードし（app.services.serialization）、
+ステップのイベントと complete イベントはその断片を埋め込む。complete="ref" の場合、
+complete イベントはステップの結果を繰り返さず、送信済みのイベント名を refs で示す。
+
+strategy_store を指定すると、完了（partial を含む）した StrategyResult を complete イベントの
+前に保存し、その ID を StrategyResult.strategy_id に入れる（GET /api/strategies/{id} で取り直せる）。
 """
 
 import asyncio
-from typing import AsyncGenerator
+import contextvars
+import itertools
+import logging
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Iterable, Literal, get_args
 
 from app.models.schemas import (
+    AnalysisDepth,
     BriefInput,
+    CompleteMode,
     BarrierResult,
     WhoAnalysis,
     WhatAnalysis,
@@ -26,13 +70,35 @@ from app.models.schemas import (
     CopyOutput,
     StrategyResult,
     Hosoda3DResult,
+    AdPlan,
     AdPlanResult,
+    BarrierItem,
+    CopyVariation,
     DeskResearchInput,
     DeskResearchResult,
     InterviewAnalysisInput,
     InterviewAnalysisResult,
+    Section,
+    LLMUsage,
+    StepError,
+    StrategyPreview,
+)
+from app.config import get_settings
+from app.services.llm import (
+    LLMSelection,
+    LLMService,
+    TokenUsage,
+    llm_deadline,
+    llm_model_tier,
+    llm_selection,
+    llm_usage,
 )
-from app.services.llm import LLMService
+from app.services.latency import LatencyContext, latency_stats, size_bucket
+from app.services.metrics import metrics
+from app.services.serialization import RawJSON
+from app.services.results import ResultStore
+from app.services.step_cache import StepCache, brief_key, fingerprint
+from app.services.strategies import StrategyStore
 from .step1_barriers import BarrierAnalyzer
 from .step2_causality import CausalityAnalyzer
 from .step3_classify import ABCClassifier
@@ -45,15 +111,327 @@ from .hosoda_3d import Hosoda3DAnalyzer
 from .ad_planning import AdPlanGenerator
 from .desk_research import DeskResearcher
 from .interview_analysis import InterviewAnalyzer
+from .preview import StrategyPreviewer
+from .evaluation import PlanEvaluator
+from .social_listening import SocialListeningAnalyzer
+from .strategy_synthesis import StrategySynthesizer
+from .context_pack import SHARED_CONTEXT_REF, ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
+
+logger = logging.getLogger(__name__)
+
+# ストリーミング時の keepalive 送信間隔（秒）
+KEEPALIVE_INTERVAL = 15
+
+StepPolicy = Literal["required", "optional"]
+
+# ステップ別の失敗ポリシー（キーは StrategyResult のフィールド名）
+STEP_POLICIES: dict[str, StepPolicy] = {
+    "desk_research": "optional",
+    "interview_analysis": "optional",
+    "hosoda_3d": "optional",
+    "barriers": "required",
+    "who": "required",
+    "what": "required",
+    "big_idea": "required",
+    "copywriting": "required",
+    "ad_planning": "optional",
+}
+
+# ステップ間の依存関係（brief を使うステップはリサーチで強化された brief に依存する）
+STEP_DEPENDENCIES: dict[str, tuple[str, ...]] = {
+    "desk_research": (),
+    "interview_analysis": (),
+    "hosoda_3d": ("desk_research", "interview_analysis"),
+    "barriers": ("desk_research", "interview_analysis"),
+    "who": ("barriers",),
+    "what": ("barriers",),
+    "big_idea": ("who", "what"),
+    "copywriting": ("big_idea", "who", "what"),
+    "ad_planning": ("big_idea", "who", "what"),
+}
+
+ALL_SECTIONS: tuple[str, ...] = get_args(Section)
+
+# 実行順のステージ構成（同じステージ内のステップは並列）。ETA の見積もりに使う
+PIPELINE_STAGES: tuple[tuple[str, ...], ...] = (
+    ("desk_research", "interview_analysis"),
+    ("hosoda_3d", "barriers"),
+    ("who", "what"),
+    ("big_idea",),
+    ("copywriting", "ad_planning"),
+)
+
+# 時間予算の縮退手順（この順に、予算に収まるまで適用する）
+DEGRADATION_ORDER: tuple[str, ...] = (
+    "hosoda_3d",
+    "interview_analysis",
+    "desk_research",
+    "depth",
+    "ad_planning",
+    "fast_model",
+)
+
+LIGHTER_DEPTH: dict[str, AnalysisDepth] = {"deep": "standard", "standard": "quick"}
+
+# 時間予算のうち、結果の組み立て・送信のために残しておく秒数
+BUDGET_MARGIN_SECONDS = 3.0
+
+STEP_LABELS: dict[str, str] = {
+    "hosoda_3d": "細田式3D",
+    "interview_analysis": "インタビュー分析",
+    "desk_research": "デスクリサーチ",
+    "ad_planning": "広告企画",
+}
+
+# 戦略スケッチ（preview）が先取りするセクション。いずれも計画外なら preview は生成しない
+PREVIEW_SECTIONS = {"who", "what", "big_idea", "copywriting"}
+
+# パイプライン内の WHO/WHAT のステップキャッシュの名前空間（単発の /who・/what と分ける）
+PIPELINE_SCOPE = "pipeline"
+
+
+def resolve_sections(sections: Iterable[str] | None) -> set[str]:
+    """要求されたセクションと、その推移的な依存ステップの集合を返す。"""
+    if not sections:
+        return set(ALL_SECTIONS)
+    planned: set[str] = set()
+    pending = list(sections)
+    while pending:
+        step = pending.pop()
+        if step not in planned:
+            planned.add(step)
+            pending.extend(STEP_DEPENDENCIES[step])
+    return planned
+
+
+# SSE イベント名（フロントエンド互換のため一部はフィールド名と異なる）
+STEP_EVENT_NAMES: dict[str, str] = {
+    "big_idea": "bigidea",
+    "copywriting": "copy",
+}
+
+
+class RequiredStepFailed(Exception):
+    """必須ステップが失敗し、パイプラインを継続できない。"""
+
+    def __init__(self, step: str):
+        super().__init__(f"必須ステップ '{step}' が失敗しました")
+        self.step = step
+
+
+class PipelineRun:
+    """1回のパイプライン実行の状態（完了済みの結果とステップ別エラー）。"""
+
+    def __init__(
+        self,
+        brief: BriefInput,
+        sections: Iterable[str] | None = None,
+        depth: AnalysisDepth | None = None,
+        preview: bool = False,
+        budget_seconds: float | None = None,
+        items: bool = False,
+        complete: CompleteMode = "full",
+        llm: LLMSelection | None = None,
+    ):
+        self.brief = brief
+        self.enriched_brief = brief
+        self.depth: DepthProfile = get_depth_profile(depth)
+        self.explicit = set(sections or ())
+        self.planned = {
+            step for step in resolve_sections(self.explicit)
+            if step in self.explicit or self.depth.includes(step)
+        }
+        self.preview = preview and bool(self.planned & PREVIEW_SECTIONS)
+        self.items = items
+        self.complete = complete
+        self.results: dict[str, Any] = {}
+        # ステップの結果のエンコード済み JSON（イベントと complete で共有する）
+        self.encoded: dict[str, RawJSON] = {}
+        self.errors: list[StepError] = []
+        # ステージの待機中にも割り込んで流すイベント（preview など）
+        self.side_events: asyncio.Queue[dict] = asyncio.Queue()
+
+        # ETA 用: 見積もり条件・ステップ別の見積もり秒数・開始時刻
+        self.latency: LatencyContext | None = None
+        self.estimates: dict[str, float] = {}
+        self.started_at = time.monotonic()
+        self.step_started: dict[str, float] = {}
+
+        # 時間予算: ステップのタスクはこのコンテキストで動かし、締め切りとモデル階層を伝える
+        self.budget_seconds = budget_seconds
+        self.deadline: float | None = None
+        self.context = contextvars.copy_context()
+        self.degradations: list[str] = []
+
+        # 結果の保管庫に保持したステップの結果の ID と、保存した StrategyResult の ID
+        self.result_ids: dict[str, str] = {}
+        self.strategy_id: str | None = None
+
+        # 各ステップが共有するコンテキスト（CONTEXT_PACK=false なら None）と、トークン使用量
+        self.pack: ContextPack | None = None
+        self.usage = TokenUsage()
+        self.context.run(llm_usage.set, self.usage)
+        # リクエスト単位のプロバイダー・モデル（None なら呼び出し元のコンテキストの指定のまま）
+        if llm is not None:
+            self.context.run(llm_selection.set, llm)
+
+    def start_clock(self) -> None:
+        """実行開始時刻を記録し、時間予算があれば締め切りを設定する。"""
+        self.started_at = time.monotonic()
+        if self.budget_seconds is not None:
+            self.deadline = self.started_at + max(self.budget_seconds - BUDGET_MARGIN_SECONDS, 1.0)
+            self.context.run(llm_deadline.set, self.deadline)
+
+    def remaining_budget(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def plan(self, steps: dict[str, Callable[[], Awaitable[Any]]]) -> dict[str, Callable[[], Awaitable[Any]]]:
+        """計画外のステップを除いたステージを返す。"""
+        return {name: factory for name, factory in steps.items() if name in self.planned}
+
+    def item_sink(self, step: str) -> Callable[[Any], None] | None:
+        """ステップの出力要素を item イベントとして side_events に積むコールバック（無効なら None）。"""
+        if not self.items:
+            return None
+        section = STEP_EVENT_NAMES.get(step, step)
+        counter = itertools.count()
+
+        def emit(item: Any) -> None:
+            self.side_events.put_nowait(
+                {"step": "item", "section": section, "index": next(counter), "data": RawJSON.of(item)}
+            )
+
+        return emit
+
+    def encoded_result(self, step: str) -> RawJSON:
+        """ステップの結果の JSON（初回だけエンコードする）。"""
+        encoded = self.encoded.get(step)
+        if encoded is None:
+            encoded = self.encoded[step] = RawJSON.of(self.results[step])
+        return encoded
+
+    def complete_event(self, message: str, status: str | None = None) -> dict:
+        """complete イベント。ステップの結果はエンコード済みの断片を埋め込むか、イベント名で参照する。"""
+        update: dict[str, Any] = {"step": "complete"}
+        if status is not None:
+            update["status"] = status
+        update["message"] = message
+        if self.complete == "ref":
+            update["data"] = self.summary_json()
+            update["refs"] = {name: STEP_EVENT_NAMES.get(name, name) for name in self.results}
+        else:
+            update["data"] = self.result_json()
+        return update
+
+    def summary_json(self) -> RawJSON:
+        """ステップの結果を除いた StrategyResult の JSON。"""
+        return RawJSON.of(self.to_result(include_steps=False), exclude_unset=True)
+
+    def result_json(self) -> RawJSON:
+        """StrategyResult 全体の JSON（ステップの結果はエンコード済みの断片を埋め込む）。"""
+        return RawJSON.merge(
+            self.summary_json(), {name: self.encoded_result(name) for name in self.results}
+        )
+
+    def error_for(self, step: str) -> StepError | None:
+        return next((e for e in self.errors if e.step == step), None)
+
+    def estimated_total(self) -> float:
+        """パイプライン全体の見積もり秒数（ステージ内は最長のステップ）。"""
+        return sum(
+            max((self.estimates.get(step, 0.0) for step in stage), default=0.0)
+            for stage in PIPELINE_STAGES
+        )
+
+    def progress(self) -> dict:
+        """残り時間・完了予定時刻・全体と実行中ステップの進捗率。"""
+        now = time.monotonic()
+        remaining, steps = self._remaining(now)
+        elapsed_total = now - self.started_at
+        total = elapsed_total + remaining
+        eta = {
+            "progress": round(elapsed_total / total, 2) if total else 1.0,
+            "eta_seconds": round(remaining, 1),
+            "estimated_completion": round(time.time() + remaining, 1),
+            "steps": steps,
+        }
+        if self.deadline is not None:
+            eta["budget_remaining_seconds"] = round(max(self.deadline - now, 0.0), 1)
+        return eta
+
+    def estimated_remaining(self) -> float:
+        return self._remaining(time.monotonic())[0]
+
+    def _remaining(self, now: float) -> tuple[float, dict[str, float]]:
+        """残りの見積もり秒数と、実行中ステップの進捗率。"""
+        remaining = 0.0
+        steps: dict[str, float] = {}
+        for stage in PIPELINE_STAGES:
+            stage_remaining = 0.0
+            for step in stage:
+                estimate = self.estimates.get(step)
+                if estimate is None or step in self.results or self.error_for(step):
+                    continue
+                started = self.step_started.get(step)
+                if started is None:
+                    stage_remaining = max(stage_remaining, estimate)
+                    continue
+                elapsed = now - started
+                steps[step] = round(min(elapsed / estimate, 0.99), 2) if estimate else 0.99
+                # 見積もりを超過したステップも、完了するまでは少し残りがあるとみなす
+                stage_remaining = max(stage_remaining, estimate - elapsed, estimate * 0.1)
+            remaining += stage_remaining
+        return remaining, steps
+
+    def with_eta(self, update: dict) -> dict:
+        update["eta"] = self.progress()
+        return update
+
+    def to_result(self, include_steps: bool = True) -> StrategyResult:
+        skipped = [name for name in ALL_SECTIONS if name not in self.planned]
+        return StrategyResult(
+            brief=self.brief,
+            depth=self.depth.name,
+            errors=self.errors,
+            skipped=skipped,
+            degradations=self.degradations,
+            usage=LLMUsage(
+                calls=self.usage.calls,
+                input_tokens=self.usage.input_tokens,
+                cached_input_tokens=self.usage.cached_input_tokens,
+                output_tokens=self.usage.output_tokens,
+                prefix_variants=len(self.usage.prefixes),
+            ),
+            **(self.results if include_steps else {}),
+            # 保管庫を使わない実行（CLI など）では応答に含めない
+            **({"result_ids": self.result_ids} if self.result_ids else {}),
+            **({"strategy_id": self.strategy_id} if self.strategy_id else {}),
+        )
 
 
 class StrategyOrchestrator:
     """Orchestrates the complete strategy planning process."""
 
-    def __init__(self, llm_service: LLMService | None = None):
+    def __init__(
+        self,
+        llm_service: LLMService | None = None,
+        result_store: ResultStore | None = None,
+        step_cache: StepCache | None = None,
+        strategy_store: StrategyStore | None = None,
+    ):
         from app.services import get_llm_service
 
         self.llm = llm_service or get_llm_service()
+        # 指定するとステップの結果を保持し、完了イベントと StrategyResult.result_ids に ID を付ける
+        self.result_store = result_store
+        # 指定すると WHO/WHAT/BIG IDEA をブリーフ単位でキャッシュし、ルート間・実行間で共有する
+        self.step_cache = step_cache
+        # 指定すると完了した StrategyResult を保存し、StrategyResult.strategy_id に ID を付ける
+        self.strategy_store = strategy_store
 
         self.hosoda_3d_analyzer = Hosoda3DAnalyzer(self.llm)
         self.barrier_analyzer = BarrierAnalyzer(self.llm)
@@ -67,6 +445,11 @@ class StrategyOrchestrator:
         self.ad_plan_generator = AdPlanGenerator(self.llm)
         self.desk_researcher = DeskResearcher(self.llm)
         self.interview_analyzer = InterviewAnalyzer(self.llm)
+        self.previewer = StrategyPreviewer(self.llm)
+        # 単体エンドポイント用（パイプラインでは使わない）
+        self.plan_evaluator = PlanEvaluator(self.llm)
+        self.social_listening_analyzer = SocialListeningAnalyzer(self.llm)
+        self.strategy_synthesizer = StrategySynthesizer(self.llm)
 
     # ── ヘルパー ──────────────────────────────────────────────────
 
@@ -104,10 +487,15 @@ class StrategyOrchestrator:
             return brief.model_copy(update={"additional_info": enriched})
         return brief
 
-    def _build_desk_research_input(self, brief: BriefInput) -> DeskResearchInput:
-        """briefinputからデスクリサーチ入力を構築する。"""
+    def _build_desk_research_input(
+        self, brief: BriefInput, pack: ContextPack | None = None
+    ) -> DeskResearchInput:
+        """briefinputからデスクリサーチ入力を構築する。
+
+        context pack があれば、ブリーフと背景情報は共有プレフィックスで渡すため context は空にする。
+        """
         category = f"{brief.product_name or ''} / {brief.product_description or ''}"
-        context = "\n".join(filter(None, [
+        context = "" if pack else "\n".join(filter(None, [
             brief.target_market,
             brief.current_situation,
             brief.competitors,
@@ -125,17 +513,188 @@ class StrategyOrchestrator:
         text = brief.additional_info or ""
         return len(text) > 200
 
+    def new_run(
+        self,
+        brief: BriefInput,
+        sections: Iterable[str] | None = None,
+        depth: AnalysisDepth | None = None,
+        preview: bool = False,
+        budget_seconds: float | None = None,
+        items: bool = False,
+        complete: CompleteMode = "full",
+        llm: LLMSelection | None = None,
+    ) -> PipelineRun:
+        """PipelineRun を作り、ステップ別の所要時間を見積もっておく。"""
+        run = PipelineRun(brief, sections, depth, preview, budget_seconds, items, complete, llm)
+        self._estimate(run)
+        return run
+
+    def _estimate(self, run: PipelineRun) -> None:
+        """現在の分析深度・モデル階層で、計画中のステップの所要時間を見積もり直す。"""
+        provider, model = run.context.run(self.llm.model_identity)
+        run.latency = LatencyContext(
+            provider=provider,
+            model=model,
+            depth=run.depth.name,
+            size=size_bucket(run.brief),
+            prior_scale=0.4 + 0.6 * run.depth.token_scale,
+        )
+        run.estimates = {
+            step: latency_stats.estimate(step, run.latency)
+            for step in run.planned
+            if step != "interview_analysis" or self._should_run_interview(run.brief)
+        }
+
+    def _fit_budget(self, run: PipelineRun) -> list[dict]:
+        """残りステップの見積もりが時間予算を超えていれば、DEGRADATION_ORDER の順に縮退する。
+
+        明示的に要求されたセクション・開始済みのステップは省略しない。
+        戻り値は縮退ごとの進捗イベント。
+        """
+        if run.deadline is None:
+            return []
+        events = []
+
+        def degrade(level: str, note: str) -> None:
+            self._estimate(run)
+            run.degradations.append(note)
+            metrics.increment(f"pipeline.degraded.{level}")
+            events.append(run.with_eta({"step": "degraded", "status": "running", "message": note}))
+
+        def over_budget() -> bool:
+            return run.estimated_remaining() > run.remaining_budget()
+
+        for level in DEGRADATION_ORDER:
+            if not over_budget():
+                break
+            if level == "depth":
+                # deep → standard → quick と、収まるまで一段ずつ下げる
+                while over_budget() and run.depth.name in LIGHTER_DEPTH:
+                    run.depth = get_depth_profile(LIGHTER_DEPTH[run.depth.name])
+                    degrade(level, f"時間予算のため分析深度を {run.depth.name} に下げました")
+            elif level == "fast_model":
+                if run.context.run(llm_model_tier.get) != "fast":
+                    run.context.run(llm_model_tier.set, "fast")
+                    degrade(level, "時間予算のため高速モデルに切り替えました")
+            elif level in run.planned and level not in run.explicit and level not in run.step_started:
+                run.planned.discard(level)
+                degrade(level, f"時間予算のため{STEP_LABELS[level]}を省略しました")
+        return events
+
+    def estimate_duration(
+        self,
+        brief: BriefInput,
+        sections: Iterable[str] | None = None,
+        depth: AnalysisDepth | None = None,
+        llm: LLMSelection | None = None,
+        **_: Any,
+    ) -> float:
+        """フル分析の所要時間の見積もり（秒）。キューの待ち時間表示などに使う。"""
+        return self.new_run(brief, sections, depth, llm=llm).estimated_total()
+
+    async def _cached(
+        self,
+        step: str,
+        prompt: str,
+        brief: BriefInput | None,
+        depth: DepthProfile,
+        upstream: tuple[Any, ...],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """ステップの結果をステップキャッシュ経由で計算する（キャッシュなしなら compute() のみ）。"""
+        if self.step_cache is None:
+            return await compute()
+        provider, model = self.llm.model_identity()
+        key = (
+            step,
+            brief_key(brief) if brief is not None else "-",
+            depth.name,
+            provider,
+            model,
+            get_prompt_registry().version(prompt),
+            fingerprint(*upstream),
+        )
+        return await self.step_cache.get_or_compute(key, compute)
+
+    @staticmethod
+    def _who_what_key(
+        brief: BriefInput,
+        barriers: BarrierResult | None,
+        pack: ContextPack | None,
+        cache_brief: BriefInput | None,
+    ) -> tuple[BriefInput, tuple[Any, ...]]:
+        """WHO/WHAT のキャッシュのキーにする (ブリーフ, 上流の入力)。
+
+        パイプラインは cache_brief に元のブリーフを渡す。障壁・共有コンテキストは実行ごとに
+        LLM が生成し直すためキーに含めるとヒットしない。パイプラインの中では、それらは同じブリーフ・
+        深度・モデル・プロンプトの版（いずれもキーに含まれる）から作られるため、元のブリーフで引く。
+        ただし PIPELINE_SCOPE で名前空間を分け、障壁・デスクリサーチなしで作った /who・/what の
+        結果をパイプラインが読むことはない（逆も同じ）。
+        """
+        if cache_brief is not None:
+            return cache_brief, (PIPELINE_SCOPE,)
+        return brief, (barriers, *(pack.prefix_blocks() if pack else ()))
+
     # ── 個別ステップ ─────────────────────────────────────────────
 
-    async def analyze_hosoda_3d(self, brief: BriefInput) -> Hosoda3DResult:
+    async def generate_preview(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> StrategyPreview:
+        """戦略スケッチ（1回のLLM呼び出し）。"""
+        return await self.previewer.generate(brief, depth, pack)
+
+    async def run_desk_research(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> DeskResearchResult:
+        """STEP0: デスクリサーチ第1段階（俯瞰マップ）。"""
+        desk_research_input = self._build_desk_research_input(brief, pack)
+        stage1 = await self.desk_researcher.research_stage1(desk_research_input, depth, pack)
+        return DeskResearchResult(category=desk_research_input.category, stage1=stage1)
+
+    async def run_interview_analysis(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> InterviewAnalysisResult:
+        """STEP0: additional_info を定性データとみなしたインタビュー分析。
+
+        context pack があれば、ブリーフと背景情報（= 発話録）は共有プレフィックスで渡すため参照にとどめる。
+        """
+        interview_input = InterviewAnalysisInput(
+            transcript=SHARED_CONTEXT_REF if pack else brief.additional_info or "",
+            research_goal=f"{brief.product_name}の購買障壁・インサイト解明",
+            context="" if pack else f"製品: {brief.product_name}\n概要: {brief.product_description or ''}",
+        )
+        return await self.interview_analyzer.analyze(interview_input, depth, pack)
+
+    async def analyze_hosoda_3d(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> Hosoda3DResult:
         """細田式3Dモデル分析（別視点分析 — 本筋フローに影響しない）。"""
-        return await self.hosoda_3d_analyzer.analyze(brief)
+        return await self.hosoda_3d_analyzer.analyze(brief, depth, pack)
 
-    async def analyze_barriers(self, brief: BriefInput) -> BarrierResult:
-        """STEP 1-4: 障壁分析の完全実行。"""
-        barriers = await self.barrier_analyzer.analyze(brief)
-        causality = await self.causality_analyzer.analyze(barriers)
-        classification = await self.abc_classifier.classify(barriers, causality)
+    async def analyze_barriers(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[BarrierItem], None] | None = None,
+    ) -> BarrierResult:
+        """STEP 1-4: 障壁分析の完全実行（on_item は STEP1 の障壁1件ごとに呼ぶ）。"""
+        depth = get_depth_profile(depth)
+        barriers = await self.barrier_analyzer.analyze(brief, depth, pack, on_item)
+        causality = await self.causality_analyzer.analyze(barriers, depth)
+        classification = await self.abc_classifier.classify(barriers, causality, depth)
         mermaid_diagram = self.mermaid_visualizer.generate(barriers, causality, classification)
         return BarrierResult(
             barriers=barriers,
@@ -145,233 +704,408 @@ class StrategyOrchestrator:
         )
 
     async def analyze_who(
-        self, brief: BriefInput, barriers: BarrierResult | None = None
+        self,
+        brief: BriefInput,
+        barriers: BarrierResult | None = None,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        cache_brief: BriefInput | None = None,
     ) -> WhoAnalysis:
-        return await self.who_analyzer.analyze(brief, barriers)
+        """WHO 分析（cache_brief は _who_what_key を参照）。"""
+        depth = get_depth_profile(depth)
+        key_brief, upstream = self._who_what_key(brief, barriers, pack, cache_brief)
+        return await self._cached(
+            "who", "who", key_brief, depth, upstream,
+            lambda: self.who_analyzer.analyze(brief, barriers, depth, pack),
+        )
 
     async def analyze_what(
-        self, brief: BriefInput, barriers: BarrierResult | None = None
+        self,
+        brief: BriefInput,
+        barriers: BarrierResult | None = None,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        cache_brief: BriefInput | None = None,
     ) -> WhatAnalysis:
-        return await self.what_analyzer.analyze(brief, barriers)
+        """WHAT 分析（cache_brief は _who_what_key を参照）。"""
+        depth = get_depth_profile(depth)
+        key_brief, upstream = self._who_what_key(brief, barriers, pack, cache_brief)
+        return await self._cached(
+            "what", "what", key_brief, depth, upstream,
+            lambda: self.what_analyzer.analyze(brief, barriers, depth, pack),
+        )
+
+    async def generate_big_idea(
+        self,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        brief: BriefInput | None = None,
+    ) -> BigIdea:
+        """BIG IDEA（brief はステップキャッシュのブリーフ単位の無効化に使う）。
 
-    async def generate_big_idea(self, who: WhoAnalysis, what: WhatAnalysis) -> BigIdea:
-        return await self.big_idea_generator.generate(who, what)
+        キャッシュのキーの上流は WHO/WHAT のみ（共有コンテキストのデスクリサーチ等は実行ごとに
+        変わるため含めない）。WHO/WHAT がキャッシュから出た実行では BIG IDEA もヒットする。
+        """
+        depth = get_depth_profile(depth)
+        return await self._cached(
+            "big_idea", "bigidea", brief or (pack.brief if pack else None), depth, (who, what),
+            lambda: self.big_idea_generator.generate(who, what, depth, pack),
+        )
 
     async def generate_copy(
-        self, big_idea: BigIdea, who: WhoAnalysis, what: WhatAnalysis
+        self,
+        big_idea: BigIdea,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[CopyVariation], None] | None = None,
     ) -> CopyOutput:
-        return await self.copy_writer.write(big_idea, who, what)
+        return await self.copy_writer.write(big_idea, who, what, depth, pack, on_item)
 
     async def generate_ad_planning(
-        self, brief: BriefInput, who: WhoAnalysis, what: WhatAnalysis, big_idea: BigIdea
+        self,
+        brief: BriefInput,
+        who: WhoAnalysis,
+        what: WhatAnalysis,
+        big_idea: BigIdea,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[AdPlan], None] | None = None,
     ) -> AdPlanResult:
-        return await self.ad_plan_generator.generate(brief, who, what, big_idea)
+        return await self.ad_plan_generator.generate(brief, who, what, big_idea, depth, pack, on_item)
+
+    # ── ステージ実行 ─────────────────────────────────────────────
+
+    async def _run_stage(
+        self,
+        run: PipelineRun,
+        steps: dict[str, Callable[[], Awaitable[Any]]],
+    ) -> None:
+        """1ステージ分のステップを TaskGroup で並列実行し、結果を run に記録する。
+
+        必須ステップが失敗すると TaskGroup が残りのタスクを即座にキャンセルし、
+        RequiredStepFailed を送出する。任意ステップの失敗は記録のみ。
+        """
+
+        async def run_step(name: str, factory: Callable[[], Awaitable[Any]]) -> None:
+            started = run.step_started[name] = time.monotonic()
+            try:
+                result = run.results[name] = await factory()
+                if self.result_store is not None:
+                    run.result_ids[name] = self.result_store.put(name, result)
+                if run.latency is not None:
+                    latency_stats.record(name, run.latency, time.monotonic() - started)
+            except Exception as e:
+                required = STEP_POLICIES[name] == "required"
+                run.errors.append(
+                    StepError(step=name, required=required, error=str(e) or type(e).__name__)
+                )
+                if required:
+                    raise RequiredStepFailed(name) from e
+
+        failed_step: str | None = None
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for name, factory in steps.items():
+                    tg.create_task(run_step(name, factory), context=run.context)
+        except* RequiredStepFailed as group:
+            failed_step = group.exceptions[0].step
+
+        if failed_step is not None:
+            for name in steps:
+                if name not in run.results and run.error_for(name) is None:
+                    run.errors.append(
+                        StepError(
+                            step=name,
+                            required=STEP_POLICIES[name] == "required",
+                            error=f"'{failed_step}' の失敗によりキャンセルされました",
+                            cancelled=True,
+                        )
+                    )
+            metrics.increment("pipeline.required_step_failures")
+            raise RequiredStepFailed(failed_step)
+
+    async def _publish_preview(self, run: PipelineRun) -> None:
+        """戦略スケッチを生成して side_events に積む（失敗してもパイプラインは継続）。"""
+        started = time.monotonic()
+        try:
+            preview = await self.generate_preview(run.brief, run.depth, run.pack)
+            if run.latency is not None:
+                latency_stats.record("preview", run.latency, time.monotonic() - started)
+        except Exception as e:
+            metrics.increment("pipeline.preview_failures")
+            run.side_events.put_nowait(
+                {"step": "preview", "status": "error", "message": str(e) or type(e).__name__}
+            )
+        else:
+            run.side_events.put_nowait(
+                {"step": "preview", "status": "complete", "data": RawJSON.of(preview)}
+            )
+
+    async def _keepalive_until_done(
+        self, run: PipelineRun, task: asyncio.Future, message: str
+    ) -> AsyncGenerator[dict, None]:
+        """task の完了を待つ間、side_events を即座に流し、
+        それ以外は KEEPALIVE_INTERVAL 秒ごとに keepalive を送る。"""
+        while True:
+            getter = asyncio.ensure_future(run.side_events.get())
+            try:
+                done, _ = await asyncio.wait(
+                    {task, getter}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                if not getter.done():
+                    getter.cancel()
+            if getter in done:
+                yield getter.result()
+            elif task in done:
+                return
+            else:
+                yield run.with_eta({"step": "keepalive", "status": "running", "message": message})
+
+    def _drain_side_events(self, run: PipelineRun) -> list[dict]:
+        events = []
+        while not run.side_events.empty():
+            events.append(run.side_events.get_nowait())
+        return events
+
+    async def _stage_events(
+        self,
+        run: PipelineRun,
+        steps: dict[str, Callable[[], Awaitable[Any]]],
+        message: str,
+        tasks: list[asyncio.Future],
+    ) -> AsyncGenerator[dict, None]:
+        """ステージを実行し、keepalive とステップ別の完了/エラーイベントを流す。
+
+        必須ステップが失敗した場合は、イベントを流し終えた後に RequiredStepFailed を送出する。
+        """
+        if not steps:
+            return
+        task = asyncio.ensure_future(self._run_stage(run, steps))
+        tasks.append(task)
+        async for update in self._keepalive_until_done(run, task, message):
+            yield update
+        # ステージの終了間際に積まれた item などを、完了イベントより先に流す
+        for update in self._drain_side_events(run):
+            yield update
+
+        for name in steps:
+            event = STEP_EVENT_NAMES.get(name, name)
+            if name in run.results:
+                update = {"step": event, "status": "complete", "data": run.encoded_result(name)}
+                if name in run.result_ids:
+                    update["result_id"] = run.result_ids[name]
+                yield update
+            elif (error := run.error_for(name)) is not None:
+                yield {"step": event, "status": "error", "message": error.error, "data": error.model_dump()}
+        task.result()
 
     # ── フル分析 ─────────────────────────────────────────────────
 
-    async def run_full_analysis(self, brief: BriefInput) -> StrategyResult:
-        """完全な戦略立案プロセスを実行する。
+    async def _execute(self, run: PipelineRun) -> AsyncGenerator[dict, None]:
+        """パイプライン本体。進捗イベントを流しながら run に結果を積み上げる。
 
         STEP0: デスクリサーチ + インタビュー分析（並列）
         → brief を情報で強化
         → 細田式3D（別視点）と障壁分析を並列実行
         → WHO / WHAT → BIG IDEA → コピー / 広告企画
+
+        ジェネレーターが途中で閉じられた場合（クライアント切断など）は、
+        実行中のタスクをすべてキャンセルする。キャンセルは LLM プロバイダーへの
+        HTTP リクエストまで伝播し、残りの LLM 呼び出しは発生しない。
         """
-        # ── STEP0: デスクリサーチ + インタビュー分析（並列）──────
-        desk_research_input = self._build_desk_research_input(brief)
-        run_interview = self._should_run_interview(brief)
-
-        if run_interview:
-            interview_input = InterviewAnalysisInput(
-                transcript=brief.additional_info or "",
-                research_goal=f"{brief.product_name}の購買障壁・インサイト解明",
-                context=f"製品: {brief.product_name}\n概要: {brief.product_description or ''}",
-            )
-            desk_stage1, interview_result = await asyncio.gather(
-                self.desk_researcher.research_stage1(desk_research_input),
-                self.interview_analyzer.analyze(interview_input),
-            )
-        else:
-            desk_stage1 = await self.desk_researcher.research_stage1(desk_research_input)
-            interview_result = None
+        brief = run.brief
+        tasks: list[asyncio.Future] = []
+        run.start_clock()
+        settings = get_settings()
+        if settings.context_pack:
+            run.pack = ContextPack.from_brief(brief, settings.context_pack_max_chars)
 
-        desk_research_result = DeskResearchResult(
-            category=desk_research_input.category,
-            stage1=desk_stage1,
-        )
-        enriched_brief = self._enrich_brief_with_research(brief, desk_research_result, interview_result)
+        try:
+            yield run.with_eta({"step": "start", "message": "分析を開始します...", "depth": run.depth.name})
+            for update in self._fit_budget(run):
+                yield update
 
-        # ── 細田式3D（別視点）と障壁分析を並列実行 ──────────────
-        hosoda_3d, barriers = await asyncio.gather(
-            self.analyze_hosoda_3d(enriched_brief),
-            self.analyze_barriers(enriched_brief),
-        )
+            # ── 戦略スケッチ（パイプラインと並行・完了しだい割り込んで流す）──
+            if run.preview:
+                tasks.append(asyncio.create_task(self._publish_preview(run), context=run.context))
+                yield run.with_eta({"step": "preview", "status": "running", "message": "戦略スケッチ生成中..."})
 
-        # ── 本筋: WHO / WHAT 並列 ────────────────────────────────
-        who, what = await asyncio.gather(
-            self.analyze_who(enriched_brief, barriers),
-            self.analyze_what(enriched_brief, barriers),
-        )
+            # ── STEP0: デスクリサーチ + インタビュー分析（並列）──────
+            step0 = run.plan({"desk_research": lambda: self.run_desk_research(brief, run.depth, run.pack)})
+            if self._should_run_interview(brief):
+                step0 |= run.plan({
+                    "interview_analysis": lambda: self.run_interview_analysis(brief, run.depth, run.pack)
+                })
+            if "desk_research" in step0:
+                yield run.with_eta({"step": "desk_research", "status": "running", "message": "デスクリサーチ（市場構造・競合分析）中..."})
+            if "interview_analysis" in step0:
+                yield run.with_eta({"step": "interview_analysis", "status": "running", "message": "インタビュー・定性データ分析中..."})
 
-        # ── 本筋: BIG IDEA ────────────────────────────────────────
-        big_idea = await self.generate_big_idea(who, what)
+            async for update in self._stage_events(run, step0, "デスクリサーチ・インタビュー分析中...", tasks):
+                yield update
 
-        # ── 本筋: コピー / 広告企画 並列 ─────────────────────────
-        copy_result, ad_planning = await asyncio.gather(
-            self.generate_copy(big_idea, who, what),
-            self.generate_ad_planning(enriched_brief, who, what, big_idea),
-        )
+            desk_research, interview = run.results.get("desk_research"), run.results.get("interview_analysis")
+            if run.pack:
+                run.pack = run.pack.with_findings(desk_research, interview)
+            else:
+                run.enriched_brief = self._enrich_brief_with_research(brief, desk_research, interview)
+            enriched_brief = run.enriched_brief
 
-        return StrategyResult(
-            brief=brief,
-            hosoda_3d=hosoda_3d,
-            barriers=barriers,
-            who=who,
-            what=what,
-            big_idea=big_idea,
-            copywriting=copy_result,
-            ad_planning=ad_planning,
-            desk_research=desk_research_result,
-            interview_analysis=interview_result,
-        )
+            # ── 細田式3D（別視点）と障壁分析を並列起動 ──────────────
+            for update in self._fit_budget(run):
+                yield update
+            stage = run.plan({
+                "hosoda_3d": lambda: self.analyze_hosoda_3d(enriched_brief, run.depth, run.pack),
+                "barriers": lambda: self.analyze_barriers(
+                    enriched_brief, run.depth, run.pack, run.item_sink("barriers")
+                ),
+            })
+            if "hosoda_3d" in stage:
+                yield run.with_eta({"step": "hosoda_3d", "status": "running", "message": "細田式3Dモデル（別視点）分析中..."})
+            if "barriers" in stage:
+                yield run.with_eta({"step": "barriers", "status": "running", "message": "障壁分析中..."})
+            async for update in self._stage_events(run, stage, "障壁・3D分析中...", tasks):
+                yield update
+            barriers = run.results.get("barriers")
 
-    # ── ストリーミング版 ─────────────────────────────────────────
+            # ── WHO / WHAT 並列 ───────────────────────────────────────
+            for update in self._fit_budget(run):
+                yield update
+            stage = run.plan({
+                "who": lambda: self.analyze_who(
+                    enriched_brief, barriers, run.depth, run.pack, cache_brief=brief
+                ),
+                "what": lambda: self.analyze_what(
+                    enriched_brief, barriers, run.depth, run.pack, cache_brief=brief
+                ),
+            })
+            if stage:
+                yield run.with_eta({"step": "who_what", "status": "running", "message": "WHO/WHAT分析中..."})
+            async for update in self._stage_events(run, stage, "WHO/WHAT分析中...", tasks):
+                yield update
+            who, what = run.results.get("who"), run.results.get("what")
+            if run.pack:
+                run.pack = run.pack.with_strategy(who, what)
 
-    async def run_full_analysis_streaming(
-        self, brief: BriefInput
-    ) -> AsyncGenerator[dict, None]:
-        """ストリーミング更新付きで完全な戦略立案を実行する。
+            # ── BIG IDEA ──────────────────────────────────────────────
+            for update in self._fit_budget(run):
+                yield update
+            stage = run.plan({
+                "big_idea": lambda: self.generate_big_idea(who, what, run.depth, run.pack, brief)
+            })
+            if stage:
+                yield run.with_eta({"step": "bigidea", "status": "running", "message": "BIG IDEA生成中..."})
+            async for update in self._stage_events(run, stage, "BIG IDEA生成中...", tasks):
+                yield update
+            big_idea = run.results.get("big_idea")
 
-        各 asyncio.gather() の待機中に keepalive を送り続け、
-        Railway などのプロキシによるタイムアウトを防ぐ。
-        """
-        import asyncio as _asyncio
+            # ── コピー / 広告企画 並列 ────────────────────────────────
+            for update in self._fit_budget(run):
+                yield update
+            stage = run.plan({
+                "copywriting": lambda: self.generate_copy(
+                    big_idea, who, what, run.depth, run.pack, run.item_sink("copywriting")
+                ),
+                "ad_planning": lambda: self.generate_ad_planning(
+                    enriched_brief, who, what, big_idea, run.depth, run.pack, run.item_sink("ad_planning")
+                ),
+            })
+            if stage:
+                yield run.with_eta({"step": "copy", "status": "running", "message": "コピー・広告企画生成中..."})
+            async for update in self._stage_events(run, stage, "コピー・広告企画生成中...", tasks):
+                yield update
+            for update in self._drain_side_events(run):
+                yield update
+        except RequiredStepFailed as e:
+            await self._save_strategy(run, "partial")
+            yield run.complete_event(f"{e} — 完了済みの結果のみ返します", status="partial")
+            return
+        finally:
+            # 途中で閉じられた場合、実行中のタスクをキャンセルする（同期的に行う:
+            # キャンセル済みスコープ内では await できないため）
+            cancelled = 0
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    cancelled += 1
+            if cancelled:
+                metrics.increment("pipeline.tasks_cancelled", cancelled)
 
-        yield {"step": "start", "message": "分析を開始します..."}
+        # ── 完了 ──────────────────────────────────────────────────────
+        await self._save_strategy(run, "complete")
+        yield run.complete_event("分析完了")
 
-        # ── STEP0: デスクリサーチ + インタビュー分析（並列）──────
-        yield {"step": "desk_research", "status": "running", "message": "デスクリサーチ（市場構造・競合分析）中..."}
-        desk_research_input = self._build_desk_research_input(brief)
-        run_interview = self._should_run_interview(brief)
-
-        if run_interview:
-            yield {"step": "interview_analysis", "status": "running", "message": "インタビュー・定性データ分析中..."}
-            interview_input = InterviewAnalysisInput(
-                transcript=brief.additional_info or "",
-                research_goal=f"{brief.product_name}の購買障壁・インサイト解明",
-                context=f"製品: {brief.product_name}\n概要: {brief.product_description or ''}",
-            )
-            step0_task = _asyncio.ensure_future(
-                _asyncio.gather(
-                    self.desk_researcher.research_stage1(desk_research_input),
-                    self.interview_analyzer.analyze(interview_input),
-                )
-            )
-            while not step0_task.done():
-                await _asyncio.sleep(15)
-                if not step0_task.done():
-                    yield {"step": "keepalive", "status": "running", "message": "デスクリサーチ・インタビュー分析中..."}
-            desk_stage1, interview_result = step0_task.result()
-        else:
-            step0_task = _asyncio.ensure_future(
-                self.desk_researcher.research_stage1(desk_research_input)
+    async def _save_strategy(self, run: PipelineRun, status: str) -> None:
+        """StrategyResult を保存して run.strategy_id を付ける（保存に失敗しても結果は返す）。"""
+        if self.strategy_store is None:
+            return
+        run.strategy_id = self.strategy_store.new_id()
+        try:
+            # 圧縮と SQLite への書き込みはイベントループの外で行う
+            await asyncio.to_thread(
+                self.strategy_store.put,
+                run.strategy_id,
+                run.result_json().text,
+                product_name=run.brief.product_name,
+                depth=run.depth.name,
+                status=status,
+                sections=list(run.results),
+                error_count=len(run.errors),
             )
-            while not step0_task.done():
-                await _asyncio.sleep(15)
-                if not step0_task.done():
-                    yield {"step": "keepalive", "status": "running", "message": "デスクリサーチ中..."}
-            desk_stage1 = step0_task.result()
-            interview_result = None
-
-        desk_research_result = DeskResearchResult(
-            category=desk_research_input.category,
-            stage1=desk_stage1,
-        )
-        yield {"step": "desk_research", "status": "complete", "data": desk_research_result.model_dump()}
-        if interview_result:
-            yield {"step": "interview_analysis", "status": "complete", "data": interview_result.model_dump()}
+        except Exception:
+            logger.exception("Failed to save strategy result %s", run.strategy_id)
+            metrics.increment("strategy_store.errors")
+            run.strategy_id = None
 
-        enriched_brief = self._enrich_brief_with_research(brief, desk_research_result, interview_result)
+    async def run_full_analysis(
+        self,
+        brief: BriefInput,
+        sections: Iterable[Section] | None = None,
+        depth: AnalysisDepth | None = None,
+        budget_seconds: float | None = None,
+        llm: LLMSelection | None = None,
+    ) -> StrategyResult:
+        """完全な戦略立案プロセスを実行する。
 
-        # ── 細田式3D（別視点）と障壁分析を並列起動 ──────────────
-        yield {"step": "hosoda_3d", "status": "running", "message": "細田式3Dモデル（別視点）分析中..."}
-        yield {"step": "barriers", "status": "running", "message": "障壁分析中..."}
+        sections を指定すると、その出力と依存ステップのみを計算する。
+        depth 省略時は設定の既定値（DEFAULT_DEPTH）を使う。
+        budget_seconds を指定すると、その時間内に収まるよう縮退しながら実行する。
+        必須ステップが失敗した場合も例外は送出せず、完了済みの結果と
+        StrategyResult.errors を返す。
+        llm を指定すると、そのプロバイダー・モデルで実行する（省略時は呼び出し元のコンテキスト・設定の既定値）。
+        """
+        run = self.new_run(brief, sections, depth, budget_seconds=budget_seconds, llm=llm)
+        async for _ in self._execute(run):
+            pass
+        return run.to_result()
 
-        # keepalive を送りながら並列実行
-        gather_task = _asyncio.ensure_future(
-            _asyncio.gather(
-                self.analyze_hosoda_3d(enriched_brief),
-                self.analyze_barriers(enriched_brief),
-            )
-        )
-        while not gather_task.done():
-            await _asyncio.sleep(15)
-            if not gather_task.done():
-                yield {"step": "keepalive", "status": "running", "message": "障壁・3D分析中..."}
-        hosoda_3d, barriers = gather_task.result()
-
-        yield {"step": "hosoda_3d", "status": "complete", "data": hosoda_3d.model_dump()}
-        yield {"step": "barriers", "status": "complete", "data": barriers.model_dump()}
-
-        # ── WHO / WHAT 並列 ───────────────────────────────────────
-        yield {"step": "who_what", "status": "running", "message": "WHO/WHAT分析中..."}
-
-        who_what_task = _asyncio.ensure_future(
-            _asyncio.gather(
-                self.analyze_who(enriched_brief, barriers),
-                self.analyze_what(enriched_brief, barriers),
-            )
-        )
-        while not who_what_task.done():
-            await _asyncio.sleep(15)
-            if not who_what_task.done():
-                yield {"step": "keepalive", "status": "running", "message": "WHO/WHAT分析中..."}
-        who, what = who_what_task.result()
-
-        yield {"step": "who", "status": "complete", "data": who.model_dump()}
-        yield {"step": "what", "status": "complete", "data": what.model_dump()}
-
-        # ── BIG IDEA ──────────────────────────────────────────────
-        yield {"step": "bigidea", "status": "running", "message": "BIG IDEA生成中..."}
-
-        bigidea_task = _asyncio.ensure_future(self.generate_big_idea(who, what))
-        while not bigidea_task.done():
-            await _asyncio.sleep(15)
-            if not bigidea_task.done():
-                yield {"step": "keepalive", "status": "running", "message": "BIG IDEA生成中..."}
-        big_idea = bigidea_task.result()
-
-        yield {"step": "bigidea", "status": "complete", "data": big_idea.model_dump()}
-
-        # ── コピー / 広告企画 並列 ────────────────────────────────
-        yield {"step": "copy", "status": "running", "message": "コピー・広告企画生成中..."}
-
-        copy_task = _asyncio.ensure_future(
-            _asyncio.gather(
-                self.generate_copy(big_idea, who, what),
-                self.generate_ad_planning(enriched_brief, who, what, big_idea),
-            )
-        )
-        while not copy_task.done():
-            await _asyncio.sleep(15)
-            if not copy_task.done():
-                yield {"step": "keepalive", "status": "running", "message": "コピー・広告企画生成中..."}
-        copy_result, ad_planning = copy_task.result()
-
-        yield {"step": "copy", "status": "complete", "data": copy_result.model_dump()}
-        yield {"step": "ad_planning", "status": "complete", "data": ad_planning.model_dump()}
-
-        # ── 完了 ──────────────────────────────────────────────────
-        result = StrategyResult(
-            brief=brief,
-            hosoda_3d=hosoda_3d,
-            barriers=barriers,
-            who=who,
-            what=what,
-            big_idea=big_idea,
-            copywriting=copy_result,
-            ad_planning=ad_planning,
-            desk_research=desk_research_result,
-            interview_analysis=interview_result,
-        )
-        yield {"step": "complete", "message": "分析完了", "data": result.model_dump()}
+    # ── ストリーミング版 ─────────────────────────────────────────
+
+    async def run_full_analysis_streaming(
+        self,
+        brief: BriefInput,
+        sections: Iterable[Section] | None = None,
+        depth: AnalysisDepth | None = None,
+        preview: bool = True,
+        budget_seconds: float | None = None,
+        items: bool = True,
+        complete: CompleteMode = "full",
+        llm: LLMSelection | None = None,
+    ) -> AsyncGenerator[dict, None]:
+        """ストリーミング更新付きで完全な戦略立案を実行する。
+
+        各ステージの待機中に keepalive を送り続け、
+        Railway などのプロキシによるタイムアウトを防ぐ。
+        preview=True のときは戦略スケッチを先行して流す。
+        items=True のときは障壁・コピー案・広告企画を1件ずつ item イベントで流す。
+        complete="ref" のときは complete イベントにステップの結果を含めず、refs で参照する。
+        イベントの data はエンコード済みの RawJSON（serialization.dumps でエンコードする）。
+        """
+        run = self.new_run(brief, sections, depth, preview, budget_seconds, items, complete, llm)
+        async for update in self._execute(run):
+            yield update
@@ -0,0 +1,69 @@
+"""Strategy Preview - 戦略スケッチ（速報）.
+
+フル分析は最初の実質的な結果が出るまで数分かかるため、ブリーフだけを入力に
+1回のLLM呼び出しで WHO / WHAT / BIG IDEA / 見出しコピーの骨子を先に生成する。
+フル分析の各ステップが完了するにつれて、このスケッチは置き換えられる。
+"""
+
+from app.models.schemas import BriefInput, StrategyPreview
+from app.services.llm import LLMService
+from .context_pack import ContextPack
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
+
+
+class StrategyPreviewer:
+    """Generates a condensed strategy sketch from the brief alone."""
+
+    def __init__(self, llm_service: LLMService):
+        self.llm = llm_service
+        self.prompts = get_prompt_registry()
+
+    def _load_system_prompt(self) -> str:
+        """Load the system prompt template."""
+        return self.prompts.text("preview")
+
+    def _build_user_prompt(self, brief: BriefInput, pack: ContextPack | None = None) -> str:
+        """Build user prompt from brief (with a context pack, the brief is in the shared prefix)."""
+        if pack:
+            return "上記のブリーフから、戦略の骨子をスケッチしてください。"
+        return f"""## ブリーフ情報
+
+**製品・サービス名**: {brief.product_name}
+
+**製品・サービス概要**:
+{brief.product_description or "未指定"}
+
+**ターゲット市場**:
+{brief.target_market or "未指定"}
+
+**現状・課題**:
+{brief.current_situation or "未指定"}
+
+**達成目標**:
+{brief.objectives or "未指定"}
+
+**競合情報**:
+{brief.competitors or "未指定"}
+
+**その他の情報（抜粋）**:
+{(brief.additional_info or "なし")[:1500]}
+
+上記のブリーフから、戦略の骨子をスケッチしてください。"""
+
+    async def generate(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+    ) -> StrategyPreview:
+        """Generate a strategy sketch (one LLM call, small token budget)."""
+        depth = get_depth_profile(depth)
+        result = await self.llm.generate_json(
+            system_prompt=self._load_system_prompt(),
+            user_prompt=self._build_user_prompt(brief, pack),
+            temperature=0.7,
+            max_tokens=depth.max_tokens(2048),
+            context_blocks=pack.prefix_blocks() if pack else (),
+        )
+        return StrategyPreview(**result)
@@ -0,0 +1,148 @@
+"""Prompt registry — プロンプトテンプレートを起動時に一度だけ読み込み・コンパイルする.
+
+- prompts/*.txt を読み込み、差し込み位置（{product_name} など）で分割した
+  PromptTemplate として保持する。render() はテンプレート全体を1回走査するだけで済む
+- 登録簿は不変のスナップショット。ホットリロード（PROMPT_HOT_RELOAD）が有効な場合は、
+  ファイルの更新時刻が変わったときだけ新しいスナップショットを作って差し替える
+  （実行中の分析が参照しているテンプレートは途中で変わらない）
+- 各テンプレートは内容の SHA-256 から作るバージョンを持ち、キャッシュのキーに使える
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+# 差し込み位置。JSON の例示に含まれる {"key": ...} とは衝突しない
+_PLACEHOLDER = re.compile(r"\{([a-z_]+)\}")
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """コンパイル済みのプロンプトテンプレート."""
+
+    name: str
+    text: str
+    version: str
+    mtime_ns: int
+    # 固定文字列と差し込み名が交互に並ぶ（偶数番目が固定文字列）
+    parts: tuple[str, ...]
+
+    @classmethod
+    def load(cls, path: Path) -> "PromptTemplate":
+        text = path.read_text(encoding="utf-8")
+        return cls(
+            name=path.stem,
+            text=text,
+            version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:12],
+            mtime_ns=path.stat().st_mtime_ns,
+            parts=tuple(_PLACEHOLDER.split(text)),
+        )
+
+    @property
+    def placeholders(self) -> frozenset[str]:
+        return frozenset(self.parts[1::2])
+
+    def render(self, **values: str) -> str:
+        """差し込み位置を values で置き換える（values にない差し込み位置はそのまま残す）。"""
+        out = []
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                out.append(part)
+            elif part in values:
+                out.append(values[part])
+            else:
+                out.append(f"{{{part}}}")
+        return "".join(out)
+
+
+class PromptRegistry:
+    """プロンプトテンプレートの登録簿（不変のスナップショットを差し替える方式）。"""
+
+    def __init__(
+        self,
+        directory: Path = PROMPTS_DIR,
+        hot_reload: bool = False,
+        check_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.hot_reload = hot_reload
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._templates: Mapping[str, PromptTemplate] = self._load_all()
+        self._checked_at = time.monotonic()
+
+    def get(self, name: str) -> PromptTemplate:
+        if self.hot_reload:
+            self._reload_if_changed()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"プロンプト '{name}' が見つかりません（{self.directory}）") from None
+
+    def text(self, name: str) -> str:
+        return self.get(name).text
+
+    def version(self, *names: str) -> str:
+        """テンプレートのバージョン（複数指定時は連結したもの）。キャッシュのキー用。"""
+        return "+".join(self.get(name).version for name in names)
+
+    def versions(self) -> dict[str, str]:
+        if self.hot_reload:
+            self._reload_if_changed()
+        return {name: t.version for name, t in sorted(self._templates.items())}
+
+    def reload(self) -> bool:
+        """更新されたファイルがあれば読み込み直す。差し替えた場合は True。"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            current = self._templates
+            paths = {path.stem: path for path in self.directory.glob("*.txt")}
+            if paths.keys() == current.keys() and all(
+                path.stat().st_mtime_ns == current[name].mtime_ns for name, path in paths.items()
+            ):
+                return False
+            templates = {
+                name: current[name]
+                if name in current and path.stat().st_mtime_ns == current[name].mtime_ns
+                else PromptTemplate.load(path)
+                for name, path in paths.items()
+            }
+            changed = sorted(
+                name for name, t in templates.items()
+                if name not in current or current[name].version != t.version
+            )
+            self._templates = MappingProxyType(templates)
+        if changed:
+            logger.info("Reloaded prompts: %s", ", ".join(changed))
+        return True
+
+    # ── 内部 ─────────────────────────────────────────────────────
+
+    def _load_all(self) -> Mapping[str, PromptTemplate]:
+        return MappingProxyType({
+            path.stem: PromptTemplate.load(path) for path in sorted(self.directory.glob("*.txt"))
+        })
+
+    def _reload_if_changed(self) -> None:
+        # ファイルの stat は check_interval 秒に1回まで
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+
+
+@lru_cache
+def get_prompt_registry() -> PromptRegistry:
+    """Get cached prompt registry instance."""
+    return PromptRegistry(hot_reload=get_settings().prompt_hot_reload)
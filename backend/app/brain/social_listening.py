@@ -1,7 +1,5 @@
 """Vol.7 ソーシャルリスニング分析."""
 
-from pathlib import Path
-
 from app.models.schemas import (
     SocialListeningInput,
     SocialListeningResult,
@@ -9,6 +7,7 @@ from app.models.schemas import (
     SocialInsightCategory,
 )
 from app.services.llm import LLMService
+from .prompt_registry import get_prompt_registry
 
 
 class SocialListeningAnalyzer:
@@ -16,7 +15,7 @@ class SocialListeningAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "social_listening.txt"
+        self.prompts = get_prompt_registry()
 
     def _build_user_prompt(self, input: SocialListeningInput) -> str:
         prompt = f"""## 対象ブランド・カテゴリ
@@ -40,7 +39,7 @@ class SocialListeningAnalyzer:
 
     async def analyze(self, input: SocialListeningInput) -> SocialListeningResult:
         """SNS投稿データを分析する."""
-        system_prompt = self.prompt_path.read_text(encoding="utf-8")
+        system_prompt = self.prompts.text("social_listening")
         user_prompt = self._build_user_prompt(input)
 
         result = await self.llm.generate_json(
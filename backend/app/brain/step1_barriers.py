@@ -1,9 +1,12 @@
 """STEP 1: Barrier Analysis - 使わない理由分析."""
 
-from pathlib import Path
+from typing import Callable
 
-from app.models.schemas import BarrierAnalysis, BriefInput
+from app.models.schemas import BarrierAnalysis, BarrierItem, BriefInput
 from app.services.llm import LLMService
+from .context_pack import ContextPack, render_brief_block, render_full_block
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class BarrierAnalyzer:
@@ -11,48 +14,44 @@ class BarrierAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "barriers.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
-
-    def _build_user_prompt(self, brief: BriefInput) -> str:
-        """Build user prompt from brief."""
-        return f"""## ブリーフ情報
-
-**製品・サービス名**: {brief.product_name}
-
-**製品・サービス概要**:
-{brief.product_description}
-
-**ターゲット市場**:
-{brief.target_market or "未指定"}
-
-**現状・課題**:
-{brief.current_situation or "未指定"}
-
-**達成目標**:
-{brief.objectives or "未指定"}
-
-**競合情報**:
-{brief.competitors or "未指定"}
-
-**その他の情報**:
-{brief.additional_info or "なし"}
-
-上記に基づいて、この製品・サービスを使わない理由を30項目抽出してください。"""
+        return self.prompts.text("barriers")
+
+    def _build_user_prompt(
+        self, brief: BriefInput, depth: DepthProfile, pack: ContextPack | None = None
+    ) -> str:
+        """Build user prompt from brief (with a context pack, the brief is in the shared prefix)."""
+        block = "" if pack else render_full_block(render_brief_block(brief), brief.additional_info) + "\n"
+        return f"""{block}上記に基づいて、この製品・サービスを使わない理由を{depth.barrier_count}項目抽出してください。""" + depth.directive(
+            f"障壁は{depth.barrier_count}項目（各レイヤーから最低{max(1, depth.barrier_count // 6)}項目）。"
+        )
 
-    async def analyze(self, brief: BriefInput) -> BarrierAnalysis:
-        """Analyze barriers for the given brief."""
+    async def analyze(
+        self,
+        brief: BriefInput,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
+        on_item: Callable[[BarrierItem], None] | None = None,
+    ) -> BarrierAnalysis:
+        """Analyze barriers for the given brief.
+
+        on_item を指定すると、障壁が1件生成されるたびに呼ぶ（応答をストリーミングで受け取る）。
+        """
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(brief)
+        user_prompt = self._build_user_prompt(brief, depth, pack)
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.7,
-            max_tokens=4096,
+            max_tokens=depth.max_tokens(4096),
+            context_blocks=pack.prefix_blocks() if pack else (),
+            item_key="barriers",
+            on_item=(lambda item: on_item(BarrierItem(**item))) if on_item else None,
         )
 
         try:
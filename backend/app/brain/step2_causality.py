@@ -1,9 +1,9 @@
 """STEP 2: Causality Analysis - 因果関係整理."""
 
-from pathlib import Path
-
 from app.models.schemas import BarrierAnalysis, CausalityResult
 from app.services.llm import LLMService
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class CausalityAnalyzer:
@@ -11,13 +11,13 @@ class CausalityAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "causality.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("causality")
 
-    def _build_user_prompt(self, barriers: BarrierAnalysis) -> str:
+    def _build_user_prompt(self, barriers: BarrierAnalysis, depth: DepthProfile) -> str:
         """Build user prompt from barriers."""
         barrier_list = "\n".join(
             f"- ID {b.id}: [{b.category}] {b.barrier}"
@@ -27,18 +27,23 @@ class CausalityAnalyzer:
 
 {barrier_list}
 
-上記の障壁間の因果関係を50個程度整理し、つながりが多い重要な障壁を特定してください。"""
+上記の障壁間の因果関係を{depth.causal_relation_count}個程度整理し、つながりが多い重要な障壁を特定してください。""" + depth.directive(
+            f"因果関係は{depth.causal_relation_count}個程度、クラスターは2〜3個。"
+        )
 
-    async def analyze(self, barriers: BarrierAnalysis) -> CausalityResult:
+    async def analyze(
+        self, barriers: BarrierAnalysis, depth: DepthProfile | None = None
+    ) -> CausalityResult:
         """Analyze causal relationships between barriers."""
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(barriers)
+        user_prompt = self._build_user_prompt(barriers, depth)
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.7,
-            max_tokens=4096,
+            max_tokens=depth.max_tokens(4096),
         )
 
         try:
@@ -1,9 +1,9 @@
 """STEP 3: ABC Classification - ABC分類."""
 
-from pathlib import Path
-
 from app.models.schemas import BarrierAnalysis, CausalityResult, ABCClassification
 from app.services.llm import LLMService
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class ABCClassifier:
@@ -11,14 +11,14 @@ class ABCClassifier:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "classify.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("classify")
 
     def _build_user_prompt(
-        self, barriers: BarrierAnalysis, causality: CausalityResult
+        self, barriers: BarrierAnalysis, causality: CausalityResult, depth: DepthProfile
     ) -> str:
         """Build user prompt from barriers and causality."""
         barrier_list = "\n".join(
@@ -34,20 +34,26 @@ class ABCClassifier:
 ## 重要な障壁（つながりが多いもの）
 ID: {key_barriers}
 
-上記の障壁をABC分類し、それぞれの解決アプローチを提案してください。"""
+上記の障壁をABC分類し、それぞれの解決アプローチを提案してください。""" + depth.directive(
+            f"各分類に最低{depth.abc_min_per_class}項目。"
+        )
 
     async def classify(
-        self, barriers: BarrierAnalysis, causality: CausalityResult
+        self,
+        barriers: BarrierAnalysis,
+        causality: CausalityResult,
+        depth: DepthProfile | None = None,
     ) -> ABCClassification:
         """Classify barriers into A, B, C categories."""
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(barriers, causality)
+        user_prompt = self._build_user_prompt(barriers, causality, depth)
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.7,
-            max_tokens=4096,
+            max_tokens=depth.max_tokens(4096),
         )
 
         try:
@@ -1,7 +1,5 @@
 """WHY/WHO/WHAT/HOW 戦略合成モジュール."""
 
-from pathlib import Path
-
 from app.models.schemas import (
     StrategySynthesisInput,
     StrategySynthesisResult,
@@ -11,6 +9,7 @@ from app.models.schemas import (
     HowFrame,
 )
 from app.services.llm import LLMService
+from .prompt_registry import get_prompt_registry
 
 
 class StrategySynthesizer:
@@ -18,13 +17,11 @@ class StrategySynthesizer:
 
     def __init__(self, llm: LLMService):
         self.llm = llm
-        self._system_prompt = (
-            Path(__file__).parent / "prompts" / "strategy_synthesis.txt"
-        ).read_text(encoding="utf-8")
+        self.prompts = get_prompt_registry()
 
     async def synthesize(self, input: StrategySynthesisInput) -> StrategySynthesisResult:
         user_prompt = self._build_prompt(input)
-        raw = await self.llm.generate_json(self._system_prompt, user_prompt)
+        raw = await self.llm.generate_json(self.prompts.text("strategy_synthesis"), user_prompt)
         return self._map(raw, input.product_name)
 
     def _build_prompt(self, input: StrategySynthesisInput) -> str:
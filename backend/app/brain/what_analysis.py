@@ -1,9 +1,10 @@
 """WHAT Analysis - 市場環境とブランド価値分析."""
 
-from pathlib import Path
-
 from app.models.schemas import BriefInput, BarrierResult, WhatAnalysis
 from app.services.llm import LLMService
+from .context_pack import ContextPack, render_brief_block
+from .depth import DepthProfile, get_depth_profile
+from .prompt_registry import get_prompt_registry
 
 
 class WhatAnalyzer:
@@ -11,35 +12,21 @@ class WhatAnalyzer:
 
     def __init__(self, llm_service: LLMService):
         self.llm = llm_service
-        self.prompt_path = Path(__file__).parent / "prompts" / "what.txt"
+        self.prompts = get_prompt_registry()
 
     def _load_system_prompt(self) -> str:
         """Load the system prompt template."""
-        return self.prompt_path.read_text(encoding="utf-8")
+        return self.prompts.text("what")
 
     def _build_user_prompt(
-        self, brief: BriefInput, barriers: BarrierResult | None = None
+        self,
+        brief: BriefInput,
+        barriers: BarrierResult | None = None,
+        pack: ContextPack | None = None,
     ) -> str:
         """Build user prompt from brief and barriers."""
-        prompt = f"""## ブリーフ情報
-
-**製品・サービス名**: {brief.product_name}
-
-**製品・サービス概要**:
-{brief.product_description}
-
-**ターゲット市場**:
-{brief.target_market or "未指定"}
-
-**現状・課題**:
-{brief.current_situation or "未指定"}
-
-**達成目標**:
-{brief.objectives or "未指定"}
-
-**競合情報**:
-{brief.competitors or "未指定"}
-"""
+        # context pack があればブリーフは共有プレフィックス側にある
+        prompt = "" if pack else render_brief_block(brief)
 
         if barriers:
             # Add ABC classification insights
@@ -57,20 +44,26 @@ class WhatAnalyzer:
                 prompt += f"- {item.barrier}: {item.solution_approach}\n"
 
         prompt += "\n上記に基づいて、WHAT分析を行ってください。"
-        return prompt
+        return prompt.lstrip()
 
     async def analyze(
-        self, brief: BriefInput, barriers: BarrierResult | None = None
+        self,
+        brief: BriefInput,
+        barriers: BarrierResult | None = None,
+        depth: DepthProfile | None = None,
+        pack: ContextPack | None = None,
     ) -> WhatAnalysis:
         """Analyze market environment and brand value."""
+        depth = get_depth_profile(depth)
         system_prompt = self._load_system_prompt()
-        user_prompt = self._build_user_prompt(brief, barriers)
+        user_prompt = self._build_user_prompt(brief, barriers, pack) + depth.directive()
 
         result = await self.llm.generate_json(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             temperature=0.7,
-            max_tokens=8192,
+            max_tokens=depth.max_tokens(8192),
+            context_blocks=pack.prefix_blocks() if pack else (),
         )
 
         try:
@@ -0,0 +1,439 @@
+"""Command-line interface — Web サーバーを介さずにオーケストレーターを直接動かす.
+
+使い方:
+  python -m app.cli run briefs.jsonl                     # 結果は briefs.results.jsonl に追記
+  python -m app.cli run briefs.csv -o out.jsonl -c 8 --depth quick
+  python -m app.cli run briefs.jsonl --sections who --sections big_idea
+  python -m app.cli cache-bench briefs.jsonl --limit 5         # 共有プレフィックスの検証とキャッシュ率
+  python -m app.cli run briefs.jsonl --provider anthropic --model claude-haiku-4-5
+  python -m app.cli extract-bench --generate 12 --pages 40 -w 4  # PDF/DOCX/XLSX 読み取りの比較
+
+- 入力は JSONL（1行1ブリーフ）または CSV（1行目は BriefInput のフィールド名）
+- 結果は1ブリーフ完了するごとに出力 JSONL へ追記・fsync する（チェックポイント）
+- 同じ出力ファイルで再実行すると、完了済みのブリーフを飛ばして続きから再開する
+  （失敗・必須ステップが失敗して部分的な結果に終わった（partial）ブリーフは --retry-failed で再実行。
+  同じ index の行が複数ある場合は後の行が有効）
+- 失敗・partial のブリーフが1件でもあれば終了コードは 1
+- 進捗とスループットは stderr に、終了時にサマリーを出す
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+from pathlib import Path
+from typing import Iterator, get_args
+
+from app.brain.batch import BatchItem, iter_csv_briefs, iter_jsonl_briefs, run_batch
+from app.brain.orchestrator import StrategyOrchestrator
+from app.config import get_settings
+from app.models.schemas import AnalysisDepth, BriefInput, Section
+from app.services.file_processor import FileProcessor, extract_text
+from app.services.llm import LLMProvider, get_llm_service, llm_selection
+
+
+# ── 入出力 ───────────────────────────────────────────────────────
+
+def _iter_briefs(path: Path) -> Iterator[BriefInput | ValueError]:
+    if path.suffix.lower() == ".csv":
+        with path.open("rb") as f:
+            yield from iter_csv_briefs(f)
+    else:
+        with path.open(encoding="utf-8") as f:
+            yield from iter_jsonl_briefs(f)
+
+
+def _count_briefs(path: Path) -> int:
+    if path.suffix.lower() == ".csv":
+        # 引用符で囲んだセルは改行を含みうるため、行数ではなく CSV のレコードを数える
+        return sum(1 for _ in _iter_briefs(path))
+    with path.open("rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _load_checkpoint(path: Path, retry_failed: bool) -> set[int]:
+    """出力 JSONL から、再実行不要な（完了済みの）index を集める。
+
+    クラッシュで途中まで書かれた最終行は無視し、追記前に改行で閉じる。
+    """
+    done: set[int] = set()
+    if not path.exists():
+        return done
+    with path.open("rb+") as f:
+        for raw in f:
+            try:
+                line = json.loads(raw)
+            except ValueError:
+                continue
+            if line.get("status") == "complete" or not retry_failed:
+                done.add(line["index"])
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    return done
+
+
+class _Progress:
+    """進捗・スループットの表示（stderr）。"""
+
+    def __init__(self, total: int, resumed: int, concurrency: int):
+        self.total = total
+        self.resumed = resumed
+        self.concurrency = concurrency
+        self.completed = 0
+        self.partial = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.input_tokens = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.completed + self.partial + self.failed
+
+    def update(self, item: BatchItem) -> None:
+        if item.status == "complete":
+            self.completed += 1
+        elif item.status == "partial":
+            self.partial += 1
+        else:
+            self.failed += 1
+        self.busy_seconds += item.elapsed
+        if item.result is not None and item.result.usage is not None:
+            self.input_tokens += item.result.usage.input_tokens
+
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed else 0.0
+        remaining = self.total - self.resumed - self.processed
+        eta = f"{remaining / rate:.0f}s" if rate else "-"
+        mark = {"complete": "ok", "partial": "partial"}.get(item.status, "NG")
+        if item.error is not None:
+            detail = f"  {item.error}"
+        elif item.result is not None and item.result.errors:
+            detail = "  " + "; ".join(f"{e.step}: {e.error}" for e in item.result.errors if e.required)
+        else:
+            detail = ""
+        print(
+            f"[{self.resumed + self.processed}/{self.total}] {mark} #{item.index} "
+            f"{item.product_name} ({item.elapsed:.1f}s)  "
+            f"{rate * 60:.1f} briefs/min  ETA {eta}{detail}",
+            file=sys.stderr,
+        )
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed * 60 if elapsed else 0.0
+        mean = self.busy_seconds / self.processed if self.processed else 0.0
+        # 入力トークンは結果のある分析（完了・部分的）で合計している
+        with_result = self.completed + self.partial
+        tokens = self.input_tokens / with_result if with_result else 0.0
+        return (
+            f"完了 {self.completed} / 部分的 {self.partial} / 失敗 {self.failed} / 再開で省略 {self.resumed} "
+            f"(全 {self.total} 件)\n"
+            f"経過 {elapsed:.1f}s  スループット {rate:.2f} briefs/min  "
+            f"1件あたり平均 {mean:.1f}s・入力 {tokens:,.0f} tokens  同時実行 {self.concurrency}"
+        )
+
+
+def _add_llm_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--provider", choices=get_args(LLMProvider), help="LLM プロバイダー（既定: LLM_PROVIDER）")
+    parser.add_argument("--model", help="モデル（既定: プロバイダーの設定済みモデル）")
+
+
+# ── run ──────────────────────────────────────────────────────────
+
+async def _run(args: argparse.Namespace) -> int:
+    settings = get_settings()
+    output: Path = args.output or args.input.with_suffix(".results.jsonl")
+    concurrency = args.concurrency or settings.batch_concurrency
+    llm_concurrency = args.llm_concurrency or settings.batch_llm_concurrency
+
+    skip = set() if args.no_resume else _load_checkpoint(output, args.retry_failed)
+    progress = _Progress(_count_briefs(args.input), len(skip), concurrency)
+    if skip:
+        print(f"{output} から再開: {len(skip)} 件は完了済み", file=sys.stderr)
+
+    mode = "w" if args.no_resume else "a"
+    with output.open(mode, encoding="utf-8") as out:
+        async for item in run_batch(
+            StrategyOrchestrator(),
+            _iter_briefs(args.input),
+            concurrency=concurrency,
+            llm_concurrency=llm_concurrency,
+            sections=args.sections,
+            depth=args.depth,
+            skip=skip,
+        ):
+            out.write(item.to_ndjson())
+            out.flush()
+            os.fsync(out.fileno())
+            progress.update(item)
+
+    print(progress.summary(), file=sys.stderr)
+    return 1 if progress.failed or progress.partial else 0
+
+
+def _add_run_parser(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser("run", help="ブリーフ一覧（JSONL / CSV）を一括分析する")
+    parser.add_argument("input", type=Path, help="ブリーフの JSONL または CSV")
+    parser.add_argument(
+        "-o", "--output", type=Path, help="結果の JSONL（既定: <input>.results.jsonl）"
+    )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, help="同時に実行するブリーフ数（既定: BATCH_CONCURRENCY）"
+    )
+    parser.add_argument(
+        "--llm-concurrency", type=int, help="全体で共有する LLM 同時呼び出し数（既定: BATCH_LLM_CONCURRENCY）"
+    )
+    parser.add_argument("--depth", choices=get_args(AnalysisDepth), help="分析深度（既定: DEFAULT_DEPTH）")
+    parser.add_argument(
+        "--sections", action="append", choices=get_args(Section), help="計算するセクション（複数指定可）"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="再開時に失敗・partial のブリーフも再実行する"
+    )
+    parser.add_argument("--no-resume", action="store_true", help="出力を上書きして最初から実行する")
+    _add_llm_arguments(parser)
+    parser.set_defaults(handler=_run)
+
+
+# ── cache-bench ──────────────────────────────────────────────────
+
+async def _cache_bench(args: argparse.Namespace) -> int:
+    """各ブリーフを実際に分析し、全ステップのプロンプト先頭（共有コンテキスト）が同一か検証し、
+    プロバイダーのキャッシュから読んだ入力トークンの比率を測る。先頭が揃わない実行があれば 1 を返す。
+    """
+    settings = get_settings()
+    if not settings.context_pack:
+        print("CONTEXT_PACK=false では共有プレフィックスを使いません", file=sys.stderr)
+        return 2
+
+    input_tokens = cached_tokens = mismatched = failed = 0
+    async for item in run_batch(
+        StrategyOrchestrator(),
+        islice(_iter_briefs(args.input), args.limit),
+        concurrency=args.concurrency,
+        llm_concurrency=args.concurrency * 4,
+        sections=args.sections,
+        depth=args.depth,
+    ):
+        usage = item.result.usage if item.result else None
+        if usage is None:
+            failed += 1
+            print(f"#{item.index} {item.product_name}: 失敗  {item.error}", file=sys.stderr)
+            continue
+        input_tokens += usage.input_tokens
+        cached_tokens += usage.cached_input_tokens
+        shared = usage.prefix_variants == 1
+        mismatched += not shared
+        ratio = usage.cached_input_tokens / usage.input_tokens if usage.input_tokens else 0.0
+        print(
+            f"#{item.index} {item.product_name}: {usage.calls} calls  入力 {usage.input_tokens:,} tokens  "
+            f"キャッシュ {usage.cached_input_tokens:,} ({ratio:.0%})  "
+            f"共有プレフィックス {'OK' if shared else f'NG（{usage.prefix_variants}種類）'}",
+            file=sys.stderr,
+        )
+
+    ratio = cached_tokens / input_tokens if input_tokens else 0.0
+    print(
+        f"入力 {input_tokens:,} tokens のうちキャッシュ {cached_tokens:,} ({ratio:.1%})  "
+        f"プレフィックス不一致 {mismatched} 件 / 失敗 {failed} 件  "
+        f"[{'/'.join(get_llm_service().model_identity())}]",
+        file=sys.stderr,
+    )
+    return 1 if mismatched else 0
+
+
+def _add_cache_bench_parser(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "cache-bench", help="共有プレフィックスの同一性とプロンプトキャッシュの効き具合を測る"
+    )
+    parser.add_argument("input", type=Path, help="ブリーフの JSONL または CSV")
+    parser.add_argument("--limit", type=int, default=3, help="分析するブリーフ数（既定: 3）")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="同時に実行するブリーフ数（既定: 1）")
+    parser.add_argument("--depth", choices=get_args(AnalysisDepth), help="分析深度（既定: DEFAULT_DEPTH）")
+    parser.add_argument(
+        "--sections", action="append", choices=get_args(Section), help="計算するセクション（複数指定可）"
+    )
+    _add_llm_arguments(parser)
+    parser.set_defaults(handler=_cache_bench)
+
+
+# ── extract-bench ────────────────────────────────────────────────
+
+def _synthetic_pdf(pages: int, lines: int = 45) -> bytes:
+    """テキストだけの PDF（Helvetica・1ページ lines 行）を組み立てる。"""
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # ページツリー（ページを作ってから埋める）
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        text = " ".join(
+            f"(Page {page} line {line}: market structure, competitors and customer insight notes) '"
+            for line in range(lines)
+        )
+        stream = f"BT /F1 9 Tf 12 TL 36 806 Td {text} ET".encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n%b\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842]"
+            b" /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(len(objects))
+    refs = " ".join(f"{kid} 0 R" for kid in kids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [%b] /Count %d >>" % (refs, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%b\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _generate_corpus(directory: Path, count: int, pages: int) -> list[Path]:
+    """PDF / DOCX / XLSX を順に count 件作る（pages はページ数・段落数・行数の目安）。"""
+    from docx import Document
+    from openpyxl import Workbook
+
+    paths = []
+    for index, kind in zip(range(count), cycle(("pdf", "docx", "xlsx"))):
+        path = directory / f"corpus-{index:03d}.{kind}"
+        if kind == "pdf":
+            path.write_bytes(_synthetic_pdf(pages))
+        elif kind == "docx":
+            doc = Document()
+            for paragraph in range(pages * 20):
+                doc.add_paragraph(f"段落 {paragraph}: 市場構造・競合・顧客インサイトに関する調査メモ。" * 3)
+            table = doc.add_table(rows=pages, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = "売上 / シェア / 認知率 / 購入意向"
+            doc.save(path)
+        else:
+            workbook = Workbook()
+            sheet = workbook.active
+            for row in range(pages * 100):
+                sheet.append([row, f"製品{row % 37}", row * 1.5, "関東" if row % 2 else "関西", None, "購入意向あり"])
+            workbook.save(path)
+        paths.append(path)
+    return paths
+
+
+class _LoopLag:
+    """イベントループの停止時間（10ms ごとのタイマーの遅れの最大値）を測る。"""
+
+    INTERVAL = 0.01
+
+    def __init__(self) -> None:
+        self.max_lag = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _tick(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.INTERVAL)
+            self.max_lag = max(self.max_lag, time.perf_counter() - started - self.INTERVAL)
+
+    def __enter__(self) -> "_LoopLag":
+        self._task = asyncio.create_task(self._tick())
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+async def _extract_bench(args: argparse.Namespace) -> int:
+    """従来の方法（イベントループ上で1件ずつ）とワーカープロセスでの並列読み取りを比べる。
+    抽出結果の文字数が食い違えば 1 を返す。
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        paths: list[Path] = args.files or _generate_corpus(Path(scratch), args.generate, args.pages)
+        corpus = [(path.name, path, None) for path in paths]
+        size = sum(path.stat().st_size for path in paths)
+        kinds = sorted({path.suffix.lower() for path in paths})
+        print(f"コーパス: {len(paths)} ファイル（{', '.join(kinds)}）合計 {size / 1024 / 1024:.1f}MB", file=sys.stderr)
+
+        # 従来: イベントループ上で同期的に1件ずつ
+        with _LoopLag() as lag:
+            started = time.perf_counter()
+            inline = []
+            for _, path, _ in corpus:
+                file_type = FileProcessor.SUPPORTED_EXTENSIONS.get(path.suffix.lower(), "unknown")
+                inline.append(len(extract_text(file_type, path)))
+                await asyncio.sleep(0)
+            inline_seconds = time.perf_counter() - started
+        inline_lag = lag.max_lag
+
+        # ワーカープロセスで並列（ワーカーの起動は測定に含めない）
+        processor = FileProcessor(workers=args.workers, use_cache=False)
+        processor.start()
+        await processor.process_files([("warmup.txt", b"warmup", None)] * max(processor.workers, 1))
+        try:
+            with _LoopLag() as lag:
+                started = time.perf_counter()
+                pooled = [item["char_count"] for item in await processor.process_files(corpus)]
+                pooled_seconds = time.perf_counter() - started
+        finally:
+            await processor.shutdown()
+
+    mismatched = sum(a != b for a, b in zip(inline, pooled))
+    for label, seconds, max_lag in (
+        ("イベントループ上で逐次（従来）", inline_seconds, inline_lag),
+        (f"ワーカープロセス {processor.workers} 並列", pooled_seconds, lag.max_lag),
+    ):
+        print(
+            f"{label}: {seconds:.2f}s  {len(corpus) / seconds:.1f} files/s  "
+            f"イベントループの最大停止 {max_lag * 1000:.0f}ms",
+            file=sys.stderr,
+        )
+    print(
+        f"速度比 {inline_seconds / pooled_seconds:.2f}x  抽出結果の不一致 {mismatched} 件", file=sys.stderr
+    )
+    return 1 if mismatched else 0
+
+
+def _add_extract_bench_parser(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "extract-bench", help="添付ファイルの読み取り（イベントループ上の逐次 vs ワーカープロセス）を測る"
+    )
+    parser.add_argument("files", nargs="*", type=Path, help="測るファイル（省略時は --generate で生成）")
+    parser.add_argument("--generate", type=int, default=12, help="生成する PDF/DOCX/XLSX の件数（既定: 12）")
+    parser.add_argument("--pages", type=int, default=40, help="生成するファイルの大きさ（ページ数の目安、既定: 40）")
+    parser.add_argument("-w", "--workers", type=int, help="ワーカープロセス数（既定: FILE_WORKERS）")
+    parser.set_defaults(handler=_extract_bench, provider=None, model=None)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Strategy Brain CLI")
+    parser.add_argument("-v", "--verbose", action="store_true", help="ログを INFO レベルで出力する")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    _add_run_parser(subparsers)
+    _add_cache_bench_parser(subparsers)
+    _add_extract_bench_parser(subparsers)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if args.provider or args.model:
+        # asyncio.run のタスクはこのコンテキストを引き継ぐ
+        try:
+            llm_selection.set(get_llm_service().select(args.provider, args.model))
+        except ValueError as e:
+            parser.error(str(e))
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,8 +19,10 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     anthropic_api_key: str = ""
 
-    # LLM Provider Selection
+    # LLM Provider Selection — 既定値。リクエストごとに X-LLM-Provider / X-LLM-Model ヘッダーで切り替えられる
     llm_provider: Literal["openai", "anthropic", "vertex"] = "openai"
+    # X-LLM-Model で指定できる追加のモデル（カンマ区切り。各プロバイダーの既定・高速モデルは常に指定できる）
+    llm_allowed_models: str = ""
 
     # Model Settings
     openai_model: str = "gpt-4o"
@@ -29,6 +31,14 @@ class Settings(BaseSettings):
     vertex_region: str = "us-east5"
     gcp_project_id: str = ""
 
+    # 高速モデル — 時間予算（budget_seconds）が厳しいときの縮退先
+    openai_fast_model: str = "gpt-4o-mini"
+    anthropic_fast_model: str = "claude-haiku-4-5"
+    vertex_fast_model: str = "claude-haiku-4-5@20251001"
+
+    # 分析深度の既定値: "quick" / "standard" / "deep"（deep は従来どおりの出力量）
+    default_depth: Literal["quick", "standard", "deep"] = "deep"
+
     # Secret Manager — True にすると GCP Secret Manager からキーを取得
     use_secret_manager: bool = False
 
@@ -36,6 +46,76 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8001
     debug: bool = True
+    # ジョブ・Idempotency-Key・受け付け枠・キャッシュはプロセス内のため、同じアプリの2つ目のワーカーを起動時に警告する
+    single_worker_check: bool = True
+
+    # Background Jobs — HTTP接続から切り離したフル分析の実行
+    job_workers: int = 2
+    job_event_buffer: int = 200
+    job_max_runs: int = 100
+    job_ttl_seconds: int = 3600
+
+    # Batch (/api/analyze/batch) — 同時実行ブリーフ数と、バッチ全体で共有する LLM 同時呼び出し数
+    batch_concurrency: int = 4
+    batch_llm_concurrency: int = 8
+
+    # Admission control — 同時実行枠と待ち行列の上限。予測待ち時間が上限を超えると 429 で断る（slots=0 で無制限）
+    admission_pipeline_slots: int = 4
+    admission_pipeline_queue: int = 8
+    admission_pipeline_max_wait_seconds: float = 600
+    admission_step_slots: int = 16
+    admission_step_queue: int = 32
+    admission_step_max_wait_seconds: float = 60
+    # 一括実行（/api/analyze/batch*）はバッチ単位。1バッチが BATCH_CONCURRENCY 件のパイプラインを使う
+    admission_batch_slots: int = 1
+    admission_batch_queue: int = 2
+    admission_batch_max_wait_seconds: float = 1800
+
+    # Idempotency-Key — 同じキーの再送を既存の Run に合流させる
+    idempotency_max_keys: int = 1000
+    idempotency_ttl_seconds: int = 3600
+
+    # Result store — ステップの結果を ID で参照させる（RESULT_STORE_PATH を指定すると SQLite にも保存）
+    result_store_max_items: int = 1000
+    result_store_ttl_seconds: int = 3600
+    result_store_path: str = ""
+
+    # File extraction — PDF・Word・Excel の読み取りはワーカープロセスで並列に行う（0 ならスレッド）。1ファイルのタイムアウト（秒）
+    file_workers: int = 2
+    file_extract_timeout_seconds: float = 60
+    # アプリの終了時にワーカーの終了を待つ秒数（過ぎたら読み取り中のワーカーを終了させる）
+    file_shutdown_timeout_seconds: float = 10
+
+    # File cache — 添付ファイルの抽出結果・要約を内容の SHA-256 で共有する（パスが空ならメモリ上のみ。
+    # 既定は空: 起動したディレクトリにデータベースを作らない）
+    file_cache: bool = True
+    file_cache_max_items: int = 200
+    file_cache_ttl_seconds: int = 7 * 24 * 3600
+    file_cache_path: str = ""
+    file_cache_max_disk_bytes: int = 512 * 1024 * 1024
+
+    # Uploads — 添付ファイルは Starlette が受信時に書き出したファイルから抽出する。上限を超えると 413
+    upload_max_file_bytes: int = 20 * 1024 * 1024
+    upload_max_request_bytes: int = 50 * 1024 * 1024
+    upload_max_files: int = 10
+
+    # Strategy store — 完了した StrategyResult を gzip 圧縮して SQLite に保存する（パスが空ならメモリ上のみ）。
+    # 既定は空: 起動したディレクトリにデータベースを作らない。永続化するならデータ用のディレクトリを指定する
+    strategy_store_path: str = ""
+    strategy_store_max_items: int = 10000
+    strategy_store_compress_level: int = 6
+
+    # Step cache — ブリーフをキーに WHO/WHAT/BIG IDEA の結果をルート間で共有する
+    step_cache: bool = True
+    step_cache_max_items: int = 500
+    step_cache_ttl_seconds: int = 3600
+
+    # Context pack — 各ステップが共有する圧縮済みコンテキスト（背景情報の文字数上限）
+    context_pack: bool = True
+    context_pack_max_chars: int = 4000
+
+    # プロンプト — True にすると prompts/*.txt の更新を検知して読み込み直す（開発用）
+    prompt_hot_reload: bool = False
 
     # ── Secret Manager フォールバック ──────────────────────────
     def get_openai_key(self) -> str:
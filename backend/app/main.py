@@ -2,27 +2,65 @@
 
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.api.routes import router
+from app.api.routes import get_orchestrator, router
+from app.brain.prompt_registry import get_prompt_registry
 from app.config import get_settings
+from app.services.file_cache import get_file_cache
+from app.services.file_processor import file_processor
+from app.services.jobs import get_run_registry
+from app.services.results import get_result_store
+from app.services.single_worker import SingleWorkerLock
+from app.services.strategies import get_strategy_store
+from app.services.uploads import UploadLimitMiddleware
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動時にプロンプト・オーケストレーター・ファイル読み取りのワーカーを用意し、終了時にジョブを止める。"""
+    # ジョブ・Idempotency-Key・受け付け枠などはプロセス内にあるため、同じアプリの別のワーカーがあれば警告する
+    worker_lock = SingleWorkerLock()
+    if settings.single_worker_check:
+        worker_lock.acquire()
+    prompts = get_prompt_registry()
+    get_orchestrator()
+    file_processor.start()
+    logger.info("Loaded %d prompts (hot reload: %s)", len(prompts.versions()), prompts.hot_reload)
+    yield
+    await get_run_registry().shutdown()
+    await file_processor.shutdown()
+    get_file_cache().close()
+    get_file_cache.cache_clear()
+    get_orchestrator.cache_clear()
+    get_result_store().close()
+    get_result_store.cache_clear()
+    get_strategy_store().close()
+    get_strategy_store.cache_clear()
+    worker_lock.release()
+
+
 app = FastAPI(
     title="Strategy Brain API",
     description="次世代戦略プランニング・ツール API",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# 上限を超えるアップロードはマルチパートを解析する前に断る
+app.add_middleware(UploadLimitMiddleware, routes=["analyze_with_files", "analyze_files"])
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +72,8 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ブラウザから読めるようにする応答ヘッダー（結果 ID・Run ID・429 の再試行までの秒数・ETag）
+    expose_headers=["X-Result-Id", "X-Run-Id", "Idempotent-Replayed", "Retry-After", "ETag"],
 )
 
 
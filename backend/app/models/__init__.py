@@ -1,6 +1,7 @@
 """Models package."""
 
 from .schemas import (
+    AnalysisDepth,
     BriefInput,
     BarrierItem,
     BarrierAnalysis,
@@ -19,10 +20,15 @@ from .schemas import (
     BigIdea,
     CopyVariation,
     CopyOutput,
+    Section,
+    StepError,
+    LLMUsage,
+    StrategyPreview,
     StrategyResult,
 )
 
 __all__ = [
+    "AnalysisDepth",
     "BriefInput",
     "BarrierItem",
     "BarrierAnalysis",
@@ -41,5 +47,9 @@ __all__ = [
     "BigIdea",
     "CopyVariation",
     "CopyOutput",
+    "Section",
+    "StepError",
+    "LLMUsage",
+    "StrategyPreview",
     "StrategyResult",
 ]
@@ -327,19 +327,86 @@ class AdPlanResult(LLMBaseModel):
     recommendation_reason: str = Field(description="推奨理由")
 
 
+class StrategyPreview(LLMBaseModel):
+    """フル分析完了前に示す戦略スケッチ（1回のLLM呼び出しで生成）."""
+
+    who: str = Field(default="", description="コアターゲットの一言像")
+    insight: str = Field(default="", description="ターゲットの本音・葛藤")
+    what: str = Field(default="", description="ブランドが約束すべき価値")
+    big_idea: str = Field(default="", description="BIG IDEAの仮説")
+    headline_copies: list[str] = Field(default=[], description="見出しコピー案")
+
+
+# 分析深度（件数・max_tokens・任意ステージをまとめて切り替える）
+AnalysisDepth = Literal["quick", "standard", "deep"]
+
+# StrategyResult のうち個別にリクエストできる出力セクション
+Section = Literal[
+    "desk_research",
+    "interview_analysis",
+    "hosoda_3d",
+    "barriers",
+    "who",
+    "what",
+    "big_idea",
+    "copywriting",
+    "ad_planning",
+]
+
+# ストリーミングの complete イベントの形式
+# full: StrategyResult 全体 / ref: ステップの結果を除き、送信済みのイベント名で参照する
+CompleteMode = Literal["full", "ref"]
+
+
+class StepError(BaseModel):
+    """パイプラインのステップ別エラー."""
+
+    step: str = Field(description="ステップ名（StrategyResult のフィールド名）")
+    required: bool = Field(description="必須ステップか（必須ステップの失敗で以降は打ち切り）")
+    error: str = Field(description="エラー内容")
+    cancelled: bool = Field(default=False, description="他ステップの失敗によりキャンセルされた")
+
+
+class LLMUsage(BaseModel):
+    """1回の分析での LLM のトークン使用量."""
+
+    calls: int = Field(description="LLM 呼び出し回数")
+    input_tokens: int = Field(description="入力トークン数の合計（キャッシュから読んだ分を含む）")
+    cached_input_tokens: int = Field(default=0, description="プロバイダーのプレフィックスキャッシュから読んだ入力トークン数")
+    output_tokens: int = Field(description="出力トークン数の合計")
+    prefix_variants: int = Field(
+        default=0, description="共有コンテキストの先頭ブロックの種類数（1 なら全ステップで先頭が同一）"
+    )
+
+
 class StrategyResult(BaseModel):
-    """Complete strategy result."""
+    """Complete strategy result.
+
+    必須ステップが失敗した場合は、完了済みのフィールドのみが埋まり errors に詳細が入る。
+    sections を指定した実行では、計算しなかったフィールドはレスポンスから省かれ skipped に列挙される。
+    """
 
     brief: BriefInput
+    depth: AnalysisDepth | None = Field(default=None, description="分析深度")
     hosoda_3d: Hosoda3DResult | None = Field(default=None, description="細田式3Dモデル分析")
-    barriers: BarrierResult
-    who: WhoAnalysis
-    what: WhatAnalysis
-    big_idea: BigIdea
-    copywriting: CopyOutput
+    barriers: BarrierResult | None = None
+    who: WhoAnalysis | None = None
+    what: WhatAnalysis | None = None
+    big_idea: BigIdea | None = None
+    copywriting: CopyOutput | None = None
     ad_planning: AdPlanResult | None = Field(default=None, description="広告企画6案")
     desk_research: "DeskResearchResult | None" = Field(default=None, description="デスクリサーチ結果")
     interview_analysis: "InterviewAnalysisResult | None" = Field(default=None, description="インタビュー分析結果")
+    errors: list[StepError] = Field(default=[], description="ステップ別のエラー")
+    skipped: list[Section] = Field(default=[], description="リクエストされず（または時間予算のため）計算を省略したセクション")
+    degradations: list[str] = Field(default=[], description="時間予算に収めるために行った縮退")
+    usage: LLMUsage | None = Field(default=None, description="LLM のトークン使用量")
+    result_ids: dict[str, str] = Field(
+        default={}, description="ステップ別の結果 ID（個別エンドポイントで who_id などとして参照できる）"
+    )
+    strategy_id: str | None = Field(
+        default=None, description="保存した結果の ID（GET /api/strategies/{id} で取り直せる）"
+    )
 
 
 # ── Vol.5 企画評価（スタンドアロン）────────────────────────────────
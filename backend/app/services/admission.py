@@ -0,0 +1,225 @@
+"""Admission control — 同時実行枠と待ち行列で、過負荷時は 429 で断る.
+
+/api/analyze* は同時リクエスト数に上限がなく、負荷が高いとすべてのリクエストが
+一緒に遅くなり、プロキシのタイムアウトで全滅していた。
+
+- プール（フルパイプライン / 単発ステップ / 一括実行）ごとに同時実行枠と待ち行列の上限を持つ。
+  一括実行は1リクエストで BATCH_CONCURRENCY 件のパイプラインを回すため、バッチ単位で数える
+- 受け付け時に、実行中のリクエストの残り時間と前に並んでいるリクエストの見積もりから
+  待ち時間を予測し、上限（max_wait_seconds）を超える・待ち行列が満杯なら
+  AdmissionRejected（ルートで 429 + Retry-After）で断る
+- 見積もりは呼び出し側が渡す（フルパイプラインは latency_stats の実績から
+  estimate_duration で求める）。渡されない場合はプールの実績の移動平均を使う
+- 受け付けは同期的に行い（enter）、枠の取得は Ticket を await したとき。
+  ストリーミングや切り離した Run では、受け付けと実行の場所が分かれるため
+"""
+
+import asyncio
+import heapq
+import math
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any
+
+from app.config import get_settings
+from .metrics import metrics
+
+# 実績の移動平均の重み
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """予測待ち時間が上限を超える、または待ち行列が満杯。"""
+
+    def __init__(self, pool: str, retry_after: int, reason: str):
+        super().__init__(f"混雑しています（{pool}: {reason}）。{retry_after}秒後に再試行してください")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """受け付け済みのリクエスト。await（または async with）で実行枠を得る。"""
+
+    def __init__(self, pool: "AdmissionPool | None", estimate: float):
+        self.pool = pool
+        self.estimate = estimate
+        self.started: float | None = None
+        self.released = False
+        # 受け付け時の予測待ち時間（秒）
+        self.wait_seconds = 0.0
+        self._granted: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def granted(self) -> bool:
+        return self._granted.done()
+
+    async def wait(self) -> None:
+        """実行枠が空くまで待つ（キャンセルされた場合は受け付けを取り消す）。"""
+        try:
+            await self._granted
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        """実行枠・待ち行列から外れる（何度呼んでもよい）。"""
+        if self.released:
+            return
+        self.released = True
+        if self.pool is not None:
+            self.pool._release(self)
+
+    def _grant(self) -> None:
+        self.started = time.monotonic()
+        if not self._granted.done():
+            self._granted.set_result(None)
+
+    async def __aenter__(self) -> "Ticket":
+        await self.wait()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class AdmissionPool:
+    """同時実行枠と、上限付きの待ち行列（FIFO）。slots が 0 以下なら制限しない。"""
+
+    def __init__(
+        self,
+        name: str,
+        slots: int,
+        max_queue: int,
+        max_wait_seconds: float,
+        default_seconds: float,
+    ):
+        self.name = name
+        self.slots = slots
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        # 見積もりが渡されないときの所要時間（実績の移動平均で更新する）
+        self.mean_seconds = default_seconds
+        self._active: set[Ticket] = set()
+        self._waiting: deque[Ticket] = deque()
+
+    def enter(self, estimate: float | None = None) -> Ticket:
+        """受け付けるか断る（同期）。受け付けた場合は空きがあれば即座に枠を割り当てる。"""
+        ticket = Ticket(self if self.slots > 0 else None, estimate or self.mean_seconds)
+        if self.slots <= 0:
+            ticket._grant()
+            return ticket
+
+        if len(self._active) < self.slots and not self._waiting:
+            self._active.add(ticket)
+            ticket._grant()
+            metrics.increment(f"admission.{self.name}.admitted")
+            return ticket
+
+        wait, next_free = self._predict(time.monotonic())
+        reason = None
+        if len(self._waiting) >= self.max_queue:
+            reason = f"待ち行列が満杯（{len(self._waiting)}件）"
+        elif wait > self.max_wait_seconds:
+            reason = f"予測待ち時間 {wait:.0f}秒"
+        if reason is not None:
+            metrics.increment(f"admission.{self.name}.rejected")
+            retry_after = math.ceil(max(wait - self.max_wait_seconds, next_free, 1.0))
+            raise AdmissionRejected(self.name, retry_after, reason)
+
+        ticket.wait_seconds = wait
+        self._waiting.append(ticket)
+        metrics.increment(f"admission.{self.name}.queued")
+        return ticket
+
+    def predicted_wait(self) -> float:
+        """今受け付けたリクエストが実行枠を得るまでの予測秒数。"""
+        if len(self._active) < self.slots and not self._waiting:
+            return 0.0
+        return self._predict(time.monotonic())[0]
+
+    def _predict(self, now: float) -> tuple[float, float]:
+        """(予測待ち時間, 最初に枠が空くまでの秒数)。
+
+        実行中の残り時間（見積もりを超過したものも少しは残るとみなす）から各枠が空く時刻を求め、
+        待ち行列の先頭から順に最も早く空く枠へ割り当てていく。
+        """
+        free = [
+            max(t.estimate - (now - (t.started or now)), t.estimate * 0.1) for t in self._active
+        ]
+        free += [0.0] * max(self.slots - len(free), 0)
+        heapq.heapify(free)
+        next_free = free[0]
+        for ticket in self._waiting:
+            heapq.heappush(free, heapq.heappop(free) + ticket.estimate)
+        return free[0], next_free
+
+    def _release(self, ticket: Ticket) -> None:
+        if ticket in self._active:
+            self._active.discard(ticket)
+            if ticket.started is not None:
+                elapsed = time.monotonic() - ticket.started
+                self.mean_seconds += _EWMA_ALPHA * (elapsed - self.mean_seconds)
+        else:
+            try:
+                self._waiting.remove(ticket)
+            except ValueError:
+                pass
+        while self._waiting and len(self._active) < self.slots:
+            waiter = self._waiting.popleft()
+            self._active.add(waiter)
+            waiter._grant()
+            metrics.increment(f"admission.{self.name}.admitted")
+
+    def snapshot(self) -> dict:
+        return {
+            "slots": self.slots,
+            "active": len(self._active),
+            "waiting": len(self._waiting),
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait_seconds,
+            "predicted_wait_seconds": round(self.predicted_wait(), 1) if self.slots > 0 else 0.0,
+            "mean_seconds": round(self.mean_seconds, 1),
+        }
+
+
+class AdmissionController:
+    """プールの登録簿（pipeline: フル分析 / step: 単発ステップのエンドポイント / batch: 一括実行）。"""
+
+    def __init__(self, pools: dict[str, AdmissionPool]):
+        self.pools = pools
+
+    def pool(self, name: str) -> AdmissionPool:
+        return self.pools[name]
+
+    def snapshot(self) -> dict[str, dict]:
+        return {name: pool.snapshot() for name, pool in self.pools.items()}
+
+
+@lru_cache
+def get_admission() -> AdmissionController:
+    """Get cached admission controller instance."""
+    settings = get_settings()
+    return AdmissionController({
+        "pipeline": AdmissionPool(
+            "pipeline",
+            slots=settings.admission_pipeline_slots,
+            max_queue=settings.admission_pipeline_queue,
+            max_wait_seconds=settings.admission_pipeline_max_wait_seconds,
+            default_seconds=300.0,
+        ),
+        "step": AdmissionPool(
+            "step",
+            slots=settings.admission_step_slots,
+            max_queue=settings.admission_step_queue,
+            max_wait_seconds=settings.admission_step_max_wait_seconds,
+            default_seconds=60.0,
+        ),
+        "batch": AdmissionPool(
+            "batch",
+            slots=settings.admission_batch_slots,
+            max_queue=settings.admission_batch_queue,
+            max_wait_seconds=settings.admission_batch_max_wait_seconds,
+            default_seconds=1800.0,
+        ),
+    })
@@ -0,0 +1,72 @@
+"""Bounded in-process cache with TTL and LRU eviction."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """件数上限（LRU）と有効期限（TTL）付きのキャッシュ（プロセス内・スレッドセーフ）。
+
+    get / set のたびに期限切れのエントリを破棄する。件数上限を超えた場合は、
+    最も長く参照されていないエントリから破棄する。
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl_seconds: float = 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            self._purge()
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def keys(self) -> list[K]:
+        """期限内のキーの一覧（スナップショット）。"""
+        with self._lock:
+            self._purge()
+            return list(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge()
+            return len(self._data)
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at < now]
+        for k in expired:
+            del self._data[k]
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
@@ -0,0 +1,132 @@
+"""File cache — 添付ファイルの抽出結果と要約を、内容の SHA-256 をキーに共有する.
+
+同じ RFP 資料や調査レポートが、ブリーフやメンバーをまたいで何度もアップロードされ、
+そのたびに FileProcessor が読み取り直し、summarize_files が LLM を呼び直していた。
+
+- キーはファイルの中身の SHA-256（ファイル名は含めない）。抽出結果は (内容, 形式, 抽出器の版)、
+  要約は (添付ファイルの内容の組, プロバイダー・モデル, 要約プロンプトのハッシュ) をキーにする
+- メモリ（件数上限・TTL）の下に SQLite のディスク層（FILE_CACHE_PATH）を置き、再起動後も使う。
+  ディスク層は TTL と合計サイズの上限（FILE_CACHE_MAX_DISK_BYTES）を超えた分を、
+  最後に使われたのが古い順に消す
+- 同じファイルの同時アップロードは、計算中の結果を待って共有する（StepCache と同じ仕組み）
+- 失敗（例外）は保持しない
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from app.config import get_settings
+from .metrics import metrics
+from .step_cache import StepCache, StepKey
+
+
+class FileCache:
+    """抽出結果・要約のキャッシュ（メモリ + 任意で SQLite）。値は JSON にできるもの。"""
+
+    def __init__(
+        self,
+        max_items: int = 200,
+        ttl_seconds: float = 7 * 24 * 3600,
+        path: str = "",
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = StepCache(max_items, ttl_seconds, enabled=enabled, name="file_cache")
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path and enabled:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS file_cache ("
+                " key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL,"
+                " accessed_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS file_cache_accessed_at ON file_cache (accessed_at)")
+
+    async def get_or_compute(self, key: StepKey, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """メモリ → ディスク → compute() の順に探し、計算した結果は両方に保持する。"""
+        if self._db is None:
+            return await self._memory.get_or_compute(key, compute)
+
+        async def load() -> Any:
+            cached = await asyncio.to_thread(self._disk_get, key)
+            if cached is not None:
+                metrics.increment(f"file_cache.disk_hits.{key[0]}")
+                return cached
+            value = await compute()
+            await asyncio.to_thread(self._disk_put, key, value)
+            return value
+
+        return await self._memory.get_or_compute(key, load)
+
+    # ── ディスク層 ───────────────────────────────────────────────
+
+    @staticmethod
+    def _disk_key(key: StepKey) -> str:
+        return "\0".join(key)
+
+    def _disk_get(self, key: StepKey) -> Any:
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT data FROM file_cache WHERE key = ? AND expires_at >= ?", (self._disk_key(key), now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE file_cache SET accessed_at = ? WHERE key = ?", (now, self._disk_key(key))
+            )
+        return json.loads(zlib.decompress(row[0]))
+
+    def _disk_put(self, key: StepKey, value: Any) -> None:
+        data = zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO file_cache (key, data, size, accessed_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self._disk_key(key), data, len(data), now, now + self.ttl_seconds),
+            )
+            self._db.execute("DELETE FROM file_cache WHERE expires_at < ?", (now,))
+            # 合計サイズの上限を超えた分を、最後に使われたのが古い順に消す
+            evicted = self._db.execute(
+                "DELETE FROM file_cache WHERE key IN ("
+                " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total"
+                " FROM file_cache) WHERE total > ?)",
+                (self.max_disk_bytes,),
+            ).rowcount
+        if evicted:
+            metrics.increment("file_cache.evicted", evicted)
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+@lru_cache
+def get_file_cache() -> FileCache:
+    """Get cached file cache instance."""
+    settings = get_settings()
+    return FileCache(
+        max_items=settings.file_cache_max_items,
+        ttl_seconds=settings.file_cache_ttl_seconds,
+        path=settings.file_cache_path,
+        max_disk_bytes=settings.file_cache_max_disk_bytes,
+        enabled=settings.file_cache,
+    )
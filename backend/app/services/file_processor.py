@@ -1,9 +1,105 @@
-"""File processing service for extracting text from various file types."""
+"""File processing service for extracting text from various file types.
 
+PDF・Word・Excel・文字コード判定の読み取り（pypdf・python-docx・openpyxl・chardet）は同期的で重く、
+イベントループ上で動かすと他のリクエスト（SSE の keepalive を含む）が止まっていた。
+
+- 読み取りはワーカープロセスのプール（FILE_WORKERS。0 ならスレッド）で行う。ワーカーはパーサーを
+  import 済みの forkserver から fork する（使えない環境では spawn + 起動時に import）
+- process_files() は複数のファイルを並列に読み取る
+- 1ファイルの読み取りが FILE_EXTRACT_TIMEOUT_SECONDS を超えると、その結果はエラー表示にし、
+  止まったワーカーを止めるためプールを作り直す（巻き添えになった他の読み取りは1回だけやり直す）
+- タイムアウトはワーカーで実行が始まってから数える（プール全体の同時実行数をワーカー数に揃える）
+- 内容は bytes か、ディスク上のスプールのパスで渡す（大きなファイルをプロセス間でコピーしない）
+- 抽出結果とファイルごとの要約は、内容の SHA-256 をキーに FileCache（app.services.file_cache）で
+  共有する。既知のファイルは読み取りも LLM の呼び出しも行わない
+- 読み取りの失敗は例外（ExtractionError）のままキャッシュの外へ出し、エラー表示の文字列には
+  キャッシュを引いた後で変える。失敗した抽出結果も、その要約もキャッシュしない
+"""
+
+import asyncio
+import hashlib
 import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import BinaryIO, Iterable
+
+from chardet import UniversalDetector
+
+from app.config import get_settings
+from .file_cache import FileCache, get_file_cache
+from .metrics import metrics
+
+# 文字コード判定に読むバイト数の上限（判定が確定すればそこで止める）
+_DETECT_CHUNK = 64 * 1024
+_DETECT_MAX_BYTES = 1024 * 1024
+
+# 抽出処理を変えたら上げる（キャッシュ済みの古い抽出結果を使わない）
+EXTRACTOR_VERSION = "1"
+
+# 要約で LLM に渡す1ファイルあたりの文字数
+_SUMMARY_MAX_CHARS = 10000
+
+_SUMMARY_SYSTEM_PROMPT = """あなたはマーケティング戦略の専門家です。
+添付されたファイルの内容を分析し、戦略プランニングに必要な情報を抽出してください。
+
+以下の観点で情報を整理してください：
+1. 製品・サービスの特徴
+2. ターゲット顧客情報
+3. 市場・競合情報
+4. 現状の課題
+5. 目標・KPI
+6. その他の重要な情報
+
+簡潔かつ構造的にまとめてください。"""
+
+_SUMMARY_USER_PROMPT = """以下のファイル内容を分析し、戦略プランニングに必要な情報を抽出してください：
+
+{text}"""
+
+# 要約のキャッシュキーに含める、プロンプトのハッシュ（プロンプトを変えると自然に無効になる）
+_SUMMARY_PROMPT_KEY = hashlib.sha256(
+    (_SUMMARY_SYSTEM_PROMPT + _SUMMARY_USER_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+
+_PARSER_MODULES = ["docx", "openpyxl", "pypdf", "app.services.file_processor"]
+
+# 形式別の読み取りエラーの表示名
+_ERROR_LABELS = {"pdf": "PDF", "docx": "Word", "excel": "Excel"}
 
-import chardet
+
+class ExtractionError(Exception):
+    """形式別の読み取りに失敗した（ワーカーから返すため、表示用のメッセージだけを持つ）。"""
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """forkserver（使えなければ spawn）。
+
+    forkserver はパーサーを import 済みのサーバープロセスから fork するため、
+    タイムアウトでプールを作り直してもワーカーはすぐに起動する。
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(_PARSER_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _preload_parsers() -> None:
+    """ワーカープロセスの初期化: パーサーを import しておき、最初のファイルで待たせない。"""
+    import docx  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pypdf  # noqa: F401
+
+
+def extract_text(file_type: str, source: bytes | Path) -> str:
+    """ファイルの種類に応じてテキストを取り出す（ワーカープロセス・スレッドで動く同期関数）。"""
+    if isinstance(source, Path):
+        with source.open("rb") as stream:
+            return FileProcessor.extract(file_type, stream)
+    return FileProcessor.extract(file_type, io.BytesIO(source))
 
 
 class FileProcessor:
@@ -21,83 +117,247 @@ class FileProcessor:
         ".xls": "excel",
     }
 
-    async def process_file(self, filename: str, content: bytes) -> dict:
-        """Process a file and extract its text content."""
+    def __init__(self, workers: int | None = None, use_cache: bool = True) -> None:
+        # ワーカー数（None なら FILE_WORKERS）
+        self._workers = workers
+        # False なら FileCache を使わない（ベンチマーク用）
+        self.use_cache = use_cache
+        self._pool: ProcessPoolExecutor | None = None
+        # プール全体の同時実行数（イベントループごとに作る）
+        self._slots: asyncio.Semaphore | None = None
+        self._slots_loop: asyncio.AbstractEventLoop | None = None
+
+    async def process_file(self, filename: str, content: bytes | Path, sha256: str | None = None) -> dict:
+        """Process a file and extract its text content.
+
+        content はバイト列か、ディスク上のファイル（アップロードのスプール）のパス。
+        sha256 は内容のハッシュ（省略時はここで計算する）。同じ内容の抽出結果はキャッシュから返す。
+        """
         ext = Path(filename).suffix.lower()
         file_type = self.SUPPORTED_EXTENSIONS.get(ext, "unknown")
+        timeout = get_settings().file_extract_timeout_seconds
+        digest = sha256 or _sha256(content)
+        cache = self._cache()
 
-        if file_type == "text":
-            text = self._extract_text(content)
-        elif file_type == "pdf":
-            text = self._extract_pdf(content)
-        elif file_type == "docx":
-            text = self._extract_docx(content)
-        elif file_type == "excel":
-            text = self._extract_excel(content)
+        async def extract() -> str:
+            return await self._extract_off_loop(file_type, content, timeout)
+
+        try:
+            if cache is None:
+                text = await extract()
+            else:
+                text = await cache.get_or_compute(("extract", digest, file_type, EXTRACTOR_VERSION), extract)
+        except TimeoutError:
+            metrics.increment("files.extract_timeouts")
+            text, error = f"[読み取りタイムアウト: {timeout:.0f}秒以内に読み取れませんでした]", True
+        except ExtractionError as e:
+            metrics.increment("files.extract_errors")
+            text, error = str(e), True
+        except Exception as e:
+            metrics.increment("files.extract_errors")
+            text, error = f"[ファイル読み取りエラー: {str(e)}]", True
         else:
-            # Try to extract as text anyway
-            text = self._extract_text(content)
+            error = False
+        metrics.increment(f"files.extracted.{file_type}")
 
         return {
             "filename": filename,
             "file_type": file_type,
             "text": text,
             "char_count": len(text),
+            "sha256": digest,
+            # True なら text はエラー表示（要約をキャッシュしない）
+            "error": error,
         }
 
-    def _extract_text(self, content: bytes) -> str:
+    async def process_files(self, files: Iterable[tuple[str, bytes | Path, str | None]]) -> list[dict]:
+        """複数のファイル（ファイル名・内容・SHA-256）を並列に読み取る（結果は渡した順）。"""
+        return list(await asyncio.gather(*(self.process_file(*file) for file in files)))
+
+    def _cache(self) -> FileCache | None:
+        return get_file_cache() if self.use_cache else None
+
+    # ── ワーカー ─────────────────────────────────────────────────
+
+    @property
+    def workers(self) -> int:
+        return get_settings().file_workers if self._workers is None else self._workers
+
+    def start(self) -> None:
+        """プールを作り、ワーカーを先に起動しておく（FILE_WORKERS=0 なら何もしない）。"""
+        pool = self._executor()
+        if pool is not None:
+            for _ in range(self.workers):
+                pool.submit(_preload_parsers)
+
+    async def shutdown(self, timeout: float | None = None) -> None:
+        """ワーカーを止める（アプリの終了時）。
+
+        終了はスレッドで待ち（イベントループを止めない）、timeout 秒（None なら
+        FILE_SHUTDOWN_TIMEOUT_SECONDS）を過ぎても終わらないワーカーは終了させる。
+        """
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        if timeout is None:
+            timeout = get_settings().file_shutdown_timeout_seconds
+        try:
+            await asyncio.wait_for(
+                asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True), timeout
+            )
+        except TimeoutError:
+            # 読み取り中のまま止まったワーカーは、タイムアウト時と同じく直接終了させる
+            metrics.increment("files.shutdown_timeouts")
+            self._recycle(pool)
+
+    def _executor(self) -> ProcessPoolExecutor | None:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # イベントループのスレッドを抱えたまま fork しない
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_mp_context(),
+                initializer=_preload_parsers,
+            )
+        return self._pool
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(max(self.workers, 1))
+            self._slots_loop = loop
+        return self._slots
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        """止まったワーカーごとプールを捨てる（次の読み取りで作り直す）。"""
+        if self._pool is pool:
+            self._pool = None
+            metrics.increment("files.pool_recycled")
+        # 実行中のタスクは shutdown では止まらないため、ワーカーを直接終了させる
+        # （同じプールで実行中の他の読み取りは BrokenProcessPool になり、新しいプールでやり直す）
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False)
+
+    async def _extract_off_loop(self, file_type: str, source: bytes | Path, timeout: float) -> str:
+        async with self._semaphore():
+            pool = self._executor()
+            if pool is None:
+                return await asyncio.wait_for(asyncio.to_thread(extract_text, file_type, source), timeout)
+            try:
+                return await self._submit(pool, file_type, source, timeout)
+            except BrokenProcessPool:
+                # 他の読み取りのタイムアウトでプールが作り直された（またはワーカーが落ちた）。1回だけやり直す
+                self._recycle(pool)
+                return await self._submit(self._executor(), file_type, source, timeout)
+
+    async def _submit(
+        self, pool: ProcessPoolExecutor, file_type: str, source: bytes | Path, timeout: float
+    ) -> str:
+        future = asyncio.get_running_loop().run_in_executor(pool, extract_text, file_type, source)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except TimeoutError:
+            self._recycle(pool)
+            raise
+
+    # ── 形式別の読み取り（同期）────────────────────────────────────
+
+    @classmethod
+    def extract(cls, file_type: str, stream: BinaryIO) -> str:
+        """形式別に読み取る（PDF・Word・Excel の失敗は ExtractionError を送出する）。"""
+        if file_type == "text":
+            return cls._extract_text(stream)
+        extractor = {
+            "pdf": cls._extract_pdf,
+            "docx": cls._extract_docx,
+            "excel": cls._extract_excel,
+        }.get(file_type)
+        if extractor is None:
+            # Try to extract as text anyway
+            return cls._extract_text(stream)
+        try:
+            return extractor(stream)
+        except Exception as e:
+            # パーサーの例外は pickle できるとは限らないため、メッセージだけにして返す
+            raise ExtractionError(f"[{_ERROR_LABELS[file_type]}読み取りエラー: {str(e)}]") from None
+
+    @classmethod
+    def _extract_text(cls, stream: BinaryIO) -> str:
         """Extract text from plain text files with encoding detection."""
+        start = stream.tell()
         try:
-            # Detect encoding
-            detected = chardet.detect(content)
-            encoding = detected.get("encoding", "utf-8") or "utf-8"
-            return content.decode(encoding)
+            # Detect encoding（先頭から判定が確定するまでのチャンクだけを読む）
+            encoding = cls._detect_encoding(stream) or "utf-8"
+            stream.seek(start)
+            return cls._decode(stream, encoding, "strict")
         except Exception:
             # Fallback to utf-8 with error handling
-            return content.decode("utf-8", errors="ignore")
+            stream.seek(start)
+            return cls._decode(stream, "utf-8", "ignore")
 
-    def _extract_pdf(self, content: bytes) -> str:
-        """Extract text from PDF files."""
+    @staticmethod
+    def _detect_encoding(stream: BinaryIO) -> str | None:
+        detector = UniversalDetector()
+        read = 0
+        while read < _DETECT_MAX_BYTES and (chunk := stream.read(_DETECT_CHUNK)):
+            read += len(chunk)
+            detector.feed(chunk)
+            if detector.done:
+                break
+        return detector.close().get("encoding")
+
+    @staticmethod
+    def _decode(stream: BinaryIO, encoding: str, errors: str) -> str:
+        """ストリームを逐次デコードする（バイト列全体のコピーを作らない）。"""
+        wrapper = io.TextIOWrapper(stream, encoding=encoding, errors=errors, newline="")
         try:
-            from pypdf import PdfReader
-
-            reader = PdfReader(io.BytesIO(content))
-            texts = []
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:
-                    texts.append(text)
-            return "\n\n".join(texts)
-        except Exception as e:
-            return f"[PDF読み取りエラー: {str(e)}]"
+            return wrapper.read()
+        finally:
+            # 閉じるとスプールまで閉じてしまうため切り離す
+            wrapper.detach()
+
+    @staticmethod
+    def _extract_pdf(stream: BinaryIO) -> str:
+        """Extract text from PDF files."""
+        from pypdf import PdfReader
 
-    def _extract_docx(self, content: bytes) -> str:
+        reader = PdfReader(stream)
+        texts = []
+        for page in reader.pages:
+            text = page.extract_text()
+            if text:
+                texts.append(text)
+        return "\n\n".join(texts)
+
+    @staticmethod
+    def _extract_docx(stream: BinaryIO) -> str:
         """Extract text from Word documents."""
-        try:
-            from docx import Document
-
-            doc = Document(io.BytesIO(content))
-            texts = []
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    texts.append(para.text)
-            # Also extract from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    row_texts = [cell.text.strip() for cell in row.cells if cell.text.strip()]
-                    if row_texts:
-                        texts.append(" | ".join(row_texts))
-            return "\n".join(texts)
-        except Exception as e:
-            return f"[Word読み取りエラー: {str(e)}]"
+        from docx import Document
+
+        doc = Document(stream)
+        texts = []
+        for para in doc.paragraphs:
+            if para.text.strip():
+                texts.append(para.text)
+        # Also extract from tables
+        for table in doc.tables:
+            for row in table.rows:
+                row_texts = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                if row_texts:
+                    texts.append(" | ".join(row_texts))
+        return "\n".join(texts)
 
-    def _extract_excel(self, content: bytes) -> str:
+    @staticmethod
+    def _extract_excel(stream: BinaryIO) -> str:
         """Extract text from Excel files."""
-        try:
-            from openpyxl import load_workbook
+        from openpyxl import load_workbook
 
-            wb = load_workbook(io.BytesIO(content), data_only=True)
-            texts = []
+        # read_only: シートの XML を行ごとに読み、ブック全体をメモリに展開しない
+        wb = load_workbook(stream, read_only=True, data_only=True)
+        texts = []
+        try:
             for sheet_name in wb.sheetnames:
                 sheet = wb[sheet_name]
                 texts.append(f"## シート: {sheet_name}")
@@ -105,12 +365,15 @@ class FileProcessor:
                     row_texts = [str(cell) for cell in row if cell is not None]
                     if row_texts:
                         texts.append(" | ".join(row_texts))
-            return "\n".join(texts)
-        except Exception as e:
-            return f"[Excel読み取りエラー: {str(e)}]"
+        finally:
+            wb.close()
+        return "\n".join(texts)
 
     async def summarize_files(self, files_data: list[dict], llm_service) -> str:
-        """Use LLM to summarize multiple files into a coherent brief."""
+        """Use LLM to summarize multiple files into a coherent brief.
+
+        添付ファイルをまとめて1回で要約し、ファイルの中身の SHA-256（並べ替えた組）とモデルでキャッシュする。
+        """
         if not files_data:
             return ""
 
@@ -120,39 +383,43 @@ class FileProcessor:
             combined_text += f"\n\n--- ファイル: {file_data['filename']} ---\n"
             # Truncate very long files
             text = file_data["text"]
-            if len(text) > 10000:
-                text = text[:10000] + "\n...[以下省略]..."
+            if len(text) > _SUMMARY_MAX_CHARS:
+                text = text[:_SUMMARY_MAX_CHARS] + "\n...[以下省略]..."
             combined_text += text
 
-        # Use LLM to analyze and extract key information
-        system_prompt = """あなたはマーケティング戦略の専門家です。
-添付されたファイルの内容を分析し、戦略プランニングに必要な情報を抽出してください。
-
-以下の観点で情報を整理してください：
-1. 製品・サービスの特徴
-2. ターゲット顧客情報
-3. 市場・競合情報
-4. 現状の課題
-5. 目標・KPI
-6. その他の重要な情報
-
-簡潔かつ構造的にまとめてください。"""
-
-        user_prompt = f"""以下のファイル内容を分析し、戦略プランニングに必要な情報を抽出してください：
-
-{combined_text}"""
-
-        try:
-            summary = await llm_service.generate(
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
+        async def summarize() -> str:
+            return await llm_service.generate(
+                system_prompt=_SUMMARY_SYSTEM_PROMPT,
+                user_prompt=_SUMMARY_USER_PROMPT.format(text=combined_text),
                 temperature=0.5,
                 max_tokens=2000,
             )
-            return summary
+
+        cache = self._cache()
+        digests = [file_data.get("sha256") for file_data in files_data]
+        try:
+            # エラー表示を含む要約はキャッシュしない（読み取りが直れば次は本来の内容を要約する）
+            if (
+                cache is None
+                or None in digests
+                or any(file_data.get("error") for file_data in files_data)
+            ):
+                return await summarize()
+            provider, model = llm_service.model_identity()
+            # ファイルの順序・名前は見出しにしか使わないため、キーは中身の組だけにする
+            return await cache.get_or_compute(
+                ("summary", *sorted(digests), provider, model, _SUMMARY_PROMPT_KEY), summarize
+            )
         except Exception as e:
             return f"[ファイル分析エラー: {str(e)}]"
 
 
+def _sha256(content: bytes | Path) -> str:
+    if isinstance(content, Path):
+        with content.open("rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    return hashlib.sha256(content).hexdigest()
+
+
 # Singleton instance
 file_processor = FileProcessor()
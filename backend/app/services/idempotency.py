@@ -0,0 +1,57 @@
+"""Idempotency-Key handling for expensive analyze endpoints.
+
+同じ Idempotency-Key・同じリクエスト内容の再送（プロキシのタイムアウトや
+フロントエンドの再試行）を、新しいフル分析ではなく既存の Run に合流させる。
+キー → (リクエストの指紋, run_id) の対応は件数上限と TTL 付きで保持する。
+"""
+
+import hashlib
+from functools import lru_cache
+
+from app.config import get_settings
+from .cache import TTLCache
+
+
+class IdempotencyConflict(Exception):
+    """同じ Idempotency-Key が異なるリクエスト内容で再利用された。"""
+
+
+class IdempotencyStore:
+    """Idempotency-Key と Run の対応表。"""
+
+    def __init__(self, max_keys: int = 1000, ttl_seconds: float = 3600):
+        self._keys: TTLCache[str, tuple[str, str]] = TTLCache(max_keys, ttl_seconds)
+
+    @staticmethod
+    def fingerprint(scope: str, *parts: str | bytes) -> str:
+        """エンドポイントとリクエスト内容から指紋を作る。"""
+        digest = hashlib.sha256(scope.encode())
+        for part in parts:
+            digest.update(b"\0")
+            digest.update(part.encode() if isinstance(part, str) else part)
+        return digest.hexdigest()
+
+    def lookup(self, key: str, fingerprint: str) -> str | None:
+        """キーに対応する run_id を返す。内容が異なる再利用は IdempotencyConflict。"""
+        entry = self._keys.get(key)
+        if entry is None:
+            return None
+        stored_fingerprint, run_id = entry
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyConflict(
+                "Idempotency-Key was already used with a different request"
+            )
+        return run_id
+
+    def remember(self, key: str, fingerprint: str, run_id: str) -> None:
+        self._keys.set(key, (fingerprint, run_id))
+
+
+@lru_cache
+def get_idempotency_store() -> IdempotencyStore:
+    """Get cached idempotency store instance."""
+    settings = get_settings()
+    return IdempotencyStore(
+        max_keys=settings.idempotency_max_keys,
+        ttl_seconds=settings.idempotency_ttl_seconds,
+    )
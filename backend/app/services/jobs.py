@@ -0,0 +1,358 @@
+"""Background job execution — run registry and in-process worker pool.
+
+フル分析をHTTP接続から切り離して実行する。
+
+- POST で作成された Run はキューに積まれ、ワーカープールが順に実行する。受け付け制御の実行枠
+  （admission）を渡すと、ワーカーはその枠を得てから実行する
+- 各 Run はオーケストレーターのストリーミング更新をイベントとして記録する
+  （Run ごとに上限付きのリングバッファ）
+- SSE 購読側は Last-Event-ID 以降のイベントをバッファから再送した上で、
+  新しいイベントを待ち受ける。ブラウザのタブが閉じても Run は継続する
+- start() はキューを通さず即座に実行する Run を作る（Idempotency-Key 付きの
+  /analyze 系リクエストが、接続の切断・再試行をまたいで同じ Run に合流するために使う）。
+  受け付け制御の実行枠（admission）を渡すと、Run の実行中はそれを保持する
+- 結果はオーケストレーターがエンコードした RawJSON のまま保持し、イベント・スナップショットに
+  埋め込む（再エンコードしない）
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import AbstractAsyncContextManager, nullcontext
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal
+
+from app.config import get_settings
+from app.models.schemas import BriefInput
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+RunStatus = Literal["queued", "running", "complete", "failed"]
+
+# バッファに残さないイベント（再送しても意味がない）
+_TRANSIENT_STEPS = {"keepalive"}
+
+
+@dataclass(frozen=True)
+class RunEvent:
+    """Run が発行したイベント（SSE の id / event / data に対応）。"""
+
+    id: int
+    event: str
+    data: str
+
+    def to_sse(self) -> dict:
+        return {"id": str(self.id), "event": self.event, "data": self.data}
+
+
+class AnalysisRun:
+    """1回分のフル分析ジョブ。"""
+
+    def __init__(
+        self,
+        brief: BriefInput | None,
+        buffer_size: int,
+        options: dict[str, Any] | None = None,
+        prepare: Callable[[], Awaitable[BriefInput]] | None = None,
+        admission: AbstractAsyncContextManager | None = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.brief = brief
+        self.options = options or {}
+        # brief の組み立て自体が重い場合（添付ファイルの解析など）は、Run の中で行う
+        self.prepare = prepare
+        # 実行中に保持する受け付け制御の実行枠（枠が空くまで queued のまま待つ）
+        self.admission = admission
+        self.status: RunStatus = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.results: dict[str, Any] = {}
+        self.result: Any = None
+        self.error: str | None = None
+        self.last_message = ""
+        # 所要時間の見積もり（秒）と、直近の進捗イベントの ETA
+        self.estimated_seconds = 0.0
+        self.last_eta: dict | None = None
+        # キューを通さずに start() で開始した Run か
+        self.detached = False
+
+        self._events: deque[RunEvent] = deque(maxlen=buffer_size)
+        self._last_event_id = 0
+        self._changed = asyncio.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("complete", "failed")
+
+    # ── イベント発行 ─────────────────────────────────────────────
+
+    async def publish(self, update: dict) -> None:
+        """オーケストレーターの更新を記録し、購読者に通知する。"""
+        step = update.get("step", "update")
+        if "eta" in update:
+            self.last_eta = update["eta"]
+        if step in _TRANSIENT_STEPS:
+            return
+
+        if update.get("message"):
+            self.last_message = update["message"]
+        if step == "complete":
+            self.result = update.get("data")
+        elif update.get("status") == "complete" and "data" in update:
+            self.results[step] = update["data"]
+
+        await self._append(step, update)
+
+    async def finish(self, error: str | None = None) -> None:
+        """Run を終了状態にする。"""
+        self.finished_at = time.time()
+        if error is not None:
+            self.status = "failed"
+            self.error = error
+            await self._append("error", {"step": "error", "error": error})
+        else:
+            self.status = "complete"
+            async with self._changed:
+                self._changed.notify_all()
+
+    def remaining_seconds(self) -> float:
+        """残り時間の見積もり（実行中は直近の ETA、待機中は全体の見積もり）。"""
+        if self.done:
+            return 0.0
+        if self.status == "running" and self.last_eta is not None:
+            return max(self.last_eta["estimated_completion"] - time.time(), 0.0)
+        return self.estimated_seconds
+
+    async def wait(self) -> None:
+        """Run の終了を待つ。"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.done)
+
+    async def _append(self, event: str, payload: dict) -> None:
+        async with self._changed:
+            self._last_event_id += 1
+            self._events.append(
+                RunEvent(
+                    id=self._last_event_id,
+                    event=event,
+                    data=dumps(payload),
+                )
+            )
+            self._changed.notify_all()
+
+    # ── 購読 ─────────────────────────────────────────────────────
+
+    async def subscribe(self, last_event_id: int = 0) -> AsyncIterator[RunEvent]:
+        """last_event_id より後のイベントを再送し、Run 終了まで新着を流す。
+
+        要求されたイベントが既にバッファから押し出されている場合は、
+        取りこぼしの代わりに現在のスナップショットを最初に送る。
+        """
+        cursor = last_event_id
+        oldest = self._events[0].id if self._events else self._last_event_id + 1
+        if cursor + 1 < oldest:
+            yield RunEvent(
+                id=oldest - 1,
+                event="snapshot",
+                data=dumps({"step": "snapshot", "data": self.snapshot()}),
+            )
+            cursor = oldest - 1
+
+        while True:
+            async with self._changed:
+                pending = [e for e in self._events if e.id > cursor]
+                if not pending:
+                    if self.done:
+                        return
+                    await self._changed.wait()
+                    continue
+            for event in pending:
+                cursor = event.id
+                yield event
+
+    def snapshot(self) -> dict:
+        """ステータスと途中結果（results・result は RawJSON を含む。dumps でエンコードする）。"""
+        return {
+            "run_id": self.id,
+            "status": self.status,
+            "message": self.last_message,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "last_event_id": self._last_event_id,
+            "eta": self.last_eta,
+            "results": self.results,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class RunRegistry:
+    """Run の登録簿とワーカープール。
+
+    ワーカーは最初の submit 時にイベントループ上で起動する。
+    終了した Run は TTL 経過後、または保持上限を超えた古いものから破棄する。
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        buffer_size: int = 200,
+        max_runs: int = 100,
+        ttl_seconds: float = 3600,
+    ):
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.max_runs = max_runs
+        self.ttl_seconds = ttl_seconds
+
+        self._runs: OrderedDict[str, AnalysisRun] = OrderedDict()
+        self._queue: asyncio.Queue[tuple[AnalysisRun, Any]] | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+        self._detached_tasks: set[asyncio.Task] = set()
+
+    def submit(
+        self,
+        brief: BriefInput,
+        orchestrator: Any,
+        admission: AbstractAsyncContextManager | None = None,
+        **options: Any,
+    ) -> AnalysisRun:
+        """Run を作成してキューに積む。options は run_full_analysis_streaming に渡す。
+
+        admission を渡すと、ワーカーはその実行枠を得てから実行し、終了まで保持する。
+        """
+        self._evict()
+        self._ensure_workers()
+
+        run = AnalysisRun(brief, self.buffer_size, options, admission=admission)
+        run.estimated_seconds = orchestrator.estimate_duration(brief, **options)
+        self._runs[run.id] = run
+        assert self._queue is not None
+        self._queue.put_nowait((run, orchestrator))
+        return run
+
+    def start(
+        self,
+        brief: BriefInput | None,
+        orchestrator: Any,
+        prepare: Callable[[], Awaitable[BriefInput]] | None = None,
+        admission: AbstractAsyncContextManager | None = None,
+        **options: Any,
+    ) -> AnalysisRun:
+        """キューを通さずに Run を即座に開始する（ワーカー数の制限を受けない）。
+
+        brief が None の場合は、実行開始時に prepare() で組み立てる。
+        admission を渡すと、その実行枠を得てから実行し、終了まで保持する。
+        """
+        self._evict()
+        run = AnalysisRun(brief, self.buffer_size, options, prepare=prepare, admission=admission)
+        run.detached = True
+        if brief is not None:
+            run.estimated_seconds = orchestrator.estimate_duration(brief, **options)
+        self._runs[run.id] = run
+        task = asyncio.create_task(self._execute(run, orchestrator))
+        self._detached_tasks.add(task)
+        task.add_done_callback(self._detached_tasks.discard)
+        return run
+
+    def get(self, run_id: str) -> AnalysisRun | None:
+        return self._runs.get(run_id)
+
+    def queue_position(self, run: AnalysisRun) -> int:
+        """待機中の Run の前に並んでいる件数（実行中・終了済みは 0）。"""
+        if run.status != "queued":
+            return 0
+        queued = [r for r in self._runs.values() if r.status == "queued" and not r.detached]
+        return queued.index(run) if run in queued else 0
+
+    def estimated_wait(self, run: AnalysisRun) -> float:
+        """待機中の Run が実行を開始するまでの見積もり秒数。
+
+        ワーカーで実行中の Run の残り時間と、前に並んでいる Run の見積もりの合計を
+        ワーカー数で割った概算。
+        """
+        if run.status != "queued":
+            return 0.0
+        queued = [r for r in self._runs.values() if r.status == "queued" and not r.detached]
+        ahead = queued[: queued.index(run)]
+        running = [r for r in self._runs.values() if r.status == "running" and not r.detached]
+        work = sum(r.remaining_seconds() for r in running) + sum(r.estimated_seconds for r in ahead)
+        return work / max(self.workers, 1)
+
+    async def shutdown(self) -> None:
+        tasks = [*self._worker_tasks, *self._detached_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker_tasks.clear()
+        self._detached_tasks.clear()
+        self._queue = None
+
+    # ── 内部 ─────────────────────────────────────────────────────
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [t for t in self._worker_tasks if not t.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            run, orchestrator = await self._queue.get()
+            try:
+                await self._execute(run, orchestrator)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, run: AnalysisRun, orchestrator: Any) -> None:
+        try:
+            async with run.admission or nullcontext():
+                run.status = "running"
+                run.started_at = time.time()
+                if run.prepare is not None:
+                    await run.publish({"step": "prepare", "status": "running", "message": "入力を準備中..."})
+                    run.brief = await run.prepare()
+                async for update in orchestrator.run_full_analysis_streaming(run.brief, **run.options):
+                    await run.publish(update)
+        except asyncio.CancelledError:
+            await run.finish(error="ジョブがキャンセルされました")
+            raise
+        except Exception as e:
+            logger.exception("Run %s failed", run.id)
+            await run.finish(error=str(e))
+        else:
+            await run.finish()
+
+    def _evict(self) -> None:
+        now = time.time()
+        expired = [
+            run_id
+            for run_id, run in self._runs.items()
+            if run.done and run.finished_at and now - run.finished_at > self.ttl_seconds
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+        finished = [run_id for run_id, run in self._runs.items() if run.done]
+        while len(self._runs) >= self.max_runs and finished:
+            del self._runs[finished.pop(0)]
+
+
+@lru_cache
+def get_run_registry() -> RunRegistry:
+    """Get cached run registry instance."""
+    settings = get_settings()
+    return RunRegistry(
+        workers=settings.job_workers,
+        buffer_size=settings.job_event_buffer,
+        max_runs=settings.job_max_runs,
+        ttl_seconds=settings.job_ttl_seconds,
+    )
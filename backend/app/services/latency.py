@@ -0,0 +1,102 @@
+"""Rolling per-step latency statistics for ETA estimates.
+
+ステップごとの所要時間を (プロバイダー, モデル, 分析深度, 入力サイズ) 別に
+直近 WINDOW 件まで保持し、中央値を見積もりとして返す。
+該当する実績がない場合は条件を緩めて探し、それでもなければ既定値（事前分布）を使う。
+見積もりは進捗イベントの ETA・ジョブの待ち時間表示・受け付け制御で共有する。
+"""
+
+import statistics
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+
+from app.models.schemas import BriefInput
+
+# 直近何件の実績から見積もるか
+WINDOW = 50
+
+# 実績がないときの既定値（deep・中程度の入力での目安、秒）
+DEFAULT_STEP_SECONDS: dict[str, float] = {
+    "desk_research": 60.0,
+    "interview_analysis": 60.0,
+    "hosoda_3d": 45.0,
+    "barriers": 150.0,  # 障壁・因果・ABC の3呼び出しが直列
+    "who": 60.0,
+    "what": 60.0,
+    "big_idea": 45.0,
+    "copywriting": 60.0,
+    "ad_planning": 75.0,
+    "preview": 15.0,
+}
+
+# 入力サイズの区分（ブリーフ全体の文字数）
+_SIZE_BUCKETS = ((2_000, "s"), (8_000, "m"), (32_000, "l"))
+
+
+def size_bucket(brief: BriefInput) -> str:
+    """ブリーフの文字数を大まかな区分に丸める。"""
+    size = sum(len(v) for v in brief.model_dump().values() if isinstance(v, str))
+    for limit, name in _SIZE_BUCKETS:
+        if size < limit:
+            return name
+    return "xl"
+
+
+@dataclass(frozen=True)
+class LatencyContext:
+    """見積もりの条件（プロバイダー・モデル・分析深度・入力サイズ区分）。"""
+
+    provider: str
+    model: str
+    depth: str
+    size: str
+    # 実績がないときに既定値へ掛ける係数（分析深度の max_tokens 比率など）
+    prior_scale: float = 1.0
+
+
+class LatencyStats:
+    """ステップ別の所要時間の移動統計（プロセス内・スレッドセーフ）。"""
+
+    def __init__(self, window: int = WINDOW):
+        self._lock = threading.Lock()
+        self._samples: defaultdict[tuple, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    @staticmethod
+    def _keys(step: str, ctx: LatencyContext) -> list[tuple]:
+        # 具体的な条件から順に緩めていく
+        return [
+            (step, ctx.provider, ctx.model, ctx.depth, ctx.size),
+            (step, ctx.provider, ctx.model, ctx.depth),
+            (step, ctx.provider, ctx.model),
+        ]
+
+    def record(self, step: str, ctx: LatencyContext, seconds: float) -> None:
+        with self._lock:
+            for key in self._keys(step, ctx):
+                self._samples[key].append(seconds)
+
+    def estimate(self, step: str, ctx: LatencyContext) -> float:
+        """ステップの所要時間の見積もり（秒）。"""
+        with self._lock:
+            for key in self._keys(step, ctx):
+                samples = self._samples.get(key)
+                if samples:
+                    return statistics.median(samples)
+        return DEFAULT_STEP_SECONDS.get(step, 60.0) * ctx.prior_scale
+
+    def snapshot(self) -> dict[str, dict]:
+        """最も具体的な条件ごとの件数と中央値。"""
+        with self._lock:
+            return {
+                "/".join(key): {
+                    "count": len(samples),
+                    "median_seconds": round(statistics.median(samples), 2),
+                }
+                for key, samples in sorted(self._samples.items())
+                if len(key) == 5 and samples
+            }
+
+
+# Singleton instance
+latency_stats = LatencyStats()
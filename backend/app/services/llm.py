@@ -1,14 +1,169 @@
 """LLM Service supporting OpenAI, Anthropic, and Vertex AI."""
 
+import asyncio
+import hashlib
 import json
 import re
+import time
+from contextlib import aclosing, asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Literal, Sequence
 
-from anthropic import AsyncAnthropic, AnthropicVertex
+from anthropic import AsyncAnthropic, AsyncAnthropicVertex
 from openai import AsyncOpenAI
 
 from app.config import get_settings
+from app.services.metrics import metrics
+
+
+# LLM 呼び出し単位の同時実行枠。バッチ実行などで複数のパイプラインが共有する。
+# Semaphore の待ち行列は FIFO なので、共有したパイプライン間で呼び出しが公平に交互に流れる。
+# None（既定）なら制限しない
+llm_call_slots: ContextVar[asyncio.Semaphore | None] = ContextVar("llm_call_slots", default=None)
+
+
+# 呼び出しの締め切り（time.monotonic() 基準）。時間予算付きの分析で、残り時間を
+# 各呼び出しのタイムアウトとして使う。None（既定）なら締め切りなし
+llm_deadline: ContextVar[float | None] = ContextVar("llm_deadline", default=None)
+
+# モデルの階層。"fast" のときは各プロバイダーの高速モデルを使う（時間予算が厳しい場合の縮退）
+ModelTier = Literal["default", "fast"]
+llm_model_tier: ContextVar[ModelTier] = ContextVar("llm_model_tier", default="default")
+
+LLMProvider = Literal["openai", "anthropic", "vertex"]
+
+
+@dataclass(frozen=True)
+class LLMSelection:
+    """リクエスト単位のプロバイダー・モデルの指定（None の項目は設定の既定値）。"""
+
+    provider: LLMProvider | None = None
+    model: str | None = None
+
+
+# リクエスト単位のプロバイダー・モデル。プロセス全体の設定（LLM_PROVIDER）を書き換えずに
+# リクエストごとに切り替えるため、複数ワーカーでも各リクエストの指定がそのまま効く。
+# None（既定）なら設定の既定値
+llm_selection: ContextVar[LLMSelection | None] = ContextVar("llm_selection", default=None)
+
+
+@dataclass
+class TokenUsage:
+    """LLM 呼び出しのトークン使用量の累計（プロバイダーの usage から集計）。"""
+
+    calls: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    # 共有コンテキストの先頭ブロックのハッシュ（1種類なら全呼び出しで先頭が同一）
+    prefixes: set[str] = field(default_factory=set)
+
+    def add(self, input_tokens: int, cached_input_tokens: int, output_tokens: int) -> None:
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.cached_input_tokens += cached_input_tokens
+        self.output_tokens += output_tokens
+
+
+# トークン使用量の集計先。パイプラインの実行ごとに設定し、1回の実行の入力トークン数を測る。
+# None（既定）なら集計しない（プロセス全体の累計は metrics に入る）
+llm_usage: ContextVar[TokenUsage | None] = ContextVar("llm_usage", default=None)
+
+
+def _record_usage(usage: Any) -> None:
+    """レスポンスの usage を集計する。
+
+    入力トークン数はキャッシュから読んだ分も含めた合計にそろえる
+    （OpenAI の prompt_tokens は含む、Anthropic の input_tokens は含まない）。
+    """
+    if usage is None:
+        return
+    if hasattr(usage, "prompt_tokens"):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        input_tokens = usage.prompt_tokens or 0
+        output_tokens = usage.completion_tokens or 0
+    else:
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        input_tokens = (usage.input_tokens or 0) + cached + written
+        output_tokens = usage.output_tokens or 0
+    metrics.increment("llm.input_tokens", input_tokens)
+    metrics.increment("llm.cached_input_tokens", cached)
+    metrics.increment("llm.output_tokens", output_tokens)
+    meter = llm_usage.get()
+    if meter is not None:
+        meter.add(input_tokens, cached, output_tokens)
+
+
+def _prefix_key(context_blocks: Sequence[str]) -> str:
+    """共有コンテキストの先頭ブロックのハッシュ（キャッシュのルーティングと検証用）。"""
+    key = hashlib.sha256(context_blocks[0].encode("utf-8")).hexdigest()[:16]
+    meter = llm_usage.get()
+    if meter is not None:
+        meter.prefixes.add(key)
+    return key
+
+
+def _anthropic_system(system_prompt: str, context_blocks: Sequence[str]) -> str | list[dict]:
+    """共有コンテキストを system の先頭に置き、各ブロックの末尾にキャッシュのブレークポイントを付ける。"""
+    if not context_blocks:
+        return system_prompt
+    return [
+        *(
+            {"type": "text", "text": block, "cache_control": {"type": "ephemeral"}}
+            for block in context_blocks
+        ),
+        {"type": "text", "text": system_prompt},
+    ]
+
+
+def _openai_messages(
+    system_prompt: str, user_prompt: str, context_blocks: Sequence[str]
+) -> list[dict]:
+    """共有コンテキストを先頭の system メッセージにする（OpenAI は先頭一致で自動キャッシュ）。"""
+    messages = [{"role": "system", "content": block} for block in context_blocks]
+    messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": user_prompt})
+    return messages
+
+
+class DeadlineExceeded(TimeoutError):
+    """分析の時間予算を使い切った。"""
+
+    def __init__(self):
+        super().__init__("分析の時間予算を超過しました")
+
+
+def remaining_time() -> float | None:
+    """締め切りまでの残り秒数（締め切りなしなら None、超過していれば DeadlineExceeded）。"""
+    deadline = llm_deadline.get()
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    return remaining
+
+
+@asynccontextmanager
+async def _call_slot() -> AsyncIterator[None]:
+    """同時実行枠を確保し、締め切りまでの残り時間をタイムアウトにして呼び出す。"""
+    slots = llm_call_slots.get()
+    if slots is not None:
+        await slots.acquire()
+    try:
+        async with asyncio.timeout(remaining_time()):
+            yield
+    except TimeoutError as e:
+        if llm_deadline.get() is None or isinstance(e, DeadlineExceeded):
+            raise
+        raise DeadlineExceeded() from e
+    finally:
+        if slots is not None:
+            slots.release()
 
 
 def _extract_json(text: str) -> dict[str, Any]:
@@ -118,6 +273,87 @@ def _try_parse_json(candidate: str) -> dict[str, Any] | None:
     return None
 
 
+# ストリーミング中に JSON 配列の要素（オブジェクト）が1件そろうたびに呼ばれるコールバック
+ItemCallback = Callable[[dict[str, Any]], None]
+
+
+class _ArrayItemParser:
+    """受信途中の JSON から、トップレベルの key 配列の要素を1件ずつ取り出す。
+
+    文字単位の状態機械で、受信したテキストを一度だけ走査する。要素のオブジェクトが
+    閉じた時点でパースし、パースできない要素は飛ばす（最終結果は全文のパースで得る）。
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # 走査中の文字列（トップレベルのキー候補）と配列要素の開始位置（_buffer 上）
+        self._string_start: int | None = None
+        self._item_start: int | None = None
+        self._last_string: str | None = None
+        self._awaiting_array = False
+        self._in_array = False
+
+    def feed(self, chunk: str) -> list[dict[str, Any]]:
+        """受信した断片を加え、新たに閉じた要素を返す。"""
+        buf = self._buffer = self._buffer + chunk
+        items: list[dict[str, Any]] = []
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_start is not None:
+                        self._last_string = buf[self._string_start + 1 : i]
+                        self._string_start = None
+                continue
+            if ch.isspace():
+                continue
+            if ch == ":":
+                self._awaiting_array = self._depth == 1 and self._last_string == self.key
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._awaiting_array and self._depth == 2:
+                    self._in_array = True
+                elif ch == "{" and self._in_array and self._depth == 3:
+                    self._item_start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._item_start is not None and self._depth == 2:
+                    item = _try_parse_json(buf[self._item_start : i + 1])
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item_start = None
+                elif ch == "]" and self._in_array and self._depth == 1:
+                    self._in_array = False
+            self._awaiting_array = False
+
+        # 走査済みで不要になった部分を捨てる（途中の要素・キーは残す）
+        keep = min(
+            (p for p in (self._item_start, self._string_start) if p is not None), default=len(buf)
+        )
+        self._buffer = buf[keep:]
+        self._pos = len(self._buffer)
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._string_start is not None:
+            self._string_start -= keep
+        return items
+
+
 class LLMService:
     """Unified LLM service supporting OpenAI, Anthropic, and Vertex AI."""
 
@@ -125,7 +361,7 @@ class LLMService:
         self.settings = get_settings()
         self._openai_client: AsyncOpenAI | None = None
         self._anthropic_client: AsyncAnthropic | None = None
-        self._vertex_client: AnthropicVertex | None = None
+        self._vertex_client: AsyncAnthropicVertex | None = None
 
     @property
     def openai_client(self) -> AsyncOpenAI:
@@ -140,14 +376,69 @@ class LLMService:
         return self._anthropic_client
 
     @property
-    def vertex_client(self) -> AnthropicVertex:
+    def vertex_client(self) -> AsyncAnthropicVertex:
         if self._vertex_client is None:
-            self._vertex_client = AnthropicVertex(
+            self._vertex_client = AsyncAnthropicVertex(
                 project_id=self.settings.gcp_project_id,
                 region=self.settings.vertex_region,
             )
         return self._vertex_client
 
+    def _provider(self, provider: str | None = None) -> str:
+        """呼び出しのプロバイダー（引数 → リクエストの指定 → 設定の既定値の順）。"""
+        if provider:
+            return provider
+        selection = llm_selection.get()
+        if selection is not None and selection.provider:
+            return selection.provider
+        return self.settings.llm_provider
+
+    def _model(self, provider: str) -> str:
+        """プロバイダーのモデル名（モデル階層が "fast" なら高速モデル、リクエストの指定があればそれ）。"""
+        fast = llm_model_tier.get() == "fast"
+        selection = llm_selection.get()
+        if not fast and selection is not None and selection.model and self._provider() == provider:
+            return selection.model
+        return {
+            "openai": self.settings.openai_fast_model if fast else self.settings.openai_model,
+            "anthropic": self.settings.anthropic_fast_model if fast else self.settings.anthropic_model,
+            "vertex": self.settings.vertex_fast_model if fast else self.settings.vertex_model,
+        }.get(provider, "")
+
+    @staticmethod
+    def _openai_cache_options(context_blocks: Sequence[str]) -> dict[str, Any]:
+        """同じ共有コンテキストの呼び出しを同じキャッシュに寄せる prompt_cache_key。"""
+        if not context_blocks:
+            return {}
+        return {"prompt_cache_key": _prefix_key(context_blocks)}
+
+    def model_identity(self, provider: str | None = None) -> tuple[str, str]:
+        """(プロバイダー, モデル名) — レイテンシ統計などのキーに使う。"""
+        provider = self._provider(provider)
+        return provider, self._model(provider)
+
+    def allowed_models(self, provider: str) -> list[str]:
+        """リクエストで指定できるモデル（設定済みの既定・高速モデル + LLM_ALLOWED_MODELS）。"""
+        configured = {
+            "openai": (self.settings.openai_model, self.settings.openai_fast_model),
+            "anthropic": (self.settings.anthropic_model, self.settings.anthropic_fast_model),
+            "vertex": (self.settings.vertex_model, self.settings.vertex_fast_model),
+        }.get(provider, ())
+        extra = [m.strip() for m in self.settings.llm_allowed_models.split(",") if m.strip()]
+        return list(dict.fromkeys([*configured, *extra]))
+
+    def select(self, provider: LLMProvider | None = None, model: str | None = None) -> LLMSelection:
+        """リクエストの指定を検証して LLMSelection にする（指定できないモデルは ValueError）。"""
+        if model:
+            resolved = provider or self.settings.llm_provider
+            allowed = self.allowed_models(resolved)
+            if model not in allowed:
+                raise ValueError(
+                    f"Model '{model}' is not allowed for provider '{resolved}' "
+                    f"(allowed: {', '.join(allowed)})"
+                )
+        return LLMSelection(provider=provider, model=model or None)
+
     async def generate(
         self,
         system_prompt: str,
@@ -155,24 +446,30 @@ class LLMService:
         provider: str | None = None,
         temperature: float = 0.7,
         max_tokens: int = 4096,
+        context_blocks: Sequence[str] = (),
     ) -> str:
-        """Generate text using the configured LLM provider."""
-        provider = provider or self.settings.llm_provider
-
-        if provider == "openai":
-            return await self._generate_openai(
-                system_prompt, user_prompt, temperature, max_tokens
-            )
-        elif provider == "anthropic":
-            return await self._generate_anthropic(
-                system_prompt, user_prompt, temperature, max_tokens
-            )
-        elif provider == "vertex":
-            return await self._generate_vertex(
-                system_prompt, user_prompt, temperature, max_tokens
-            )
-        else:
-            raise ValueError(f"Unknown LLM provider: {provider}")
+        """Generate text using the configured LLM provider.
+
+        context_blocks は実行内の全ステップで共有するコンテキスト（ブリーフ・調査結果など）。
+        プロバイダーのプレフィックスキャッシュが効くよう、system_prompt より前に置く。
+        """
+        provider = self._provider(provider)
+
+        async with _call_slot():
+            if provider == "openai":
+                return await self._generate_openai(
+                    system_prompt, user_prompt, temperature, max_tokens, context_blocks
+                )
+            elif provider == "anthropic":
+                return await self._generate_anthropic(
+                    system_prompt, user_prompt, temperature, max_tokens, context_blocks
+                )
+            elif provider == "vertex":
+                return await self._generate_vertex(
+                    system_prompt, user_prompt, temperature, max_tokens, context_blocks
+                )
+            else:
+                raise ValueError(f"Unknown LLM provider: {provider}")
 
     async def _generate_openai(
         self,
@@ -180,17 +477,17 @@ class LLMService:
         user_prompt: str,
         temperature: float,
         max_tokens: int,
+        context_blocks: Sequence[str] = (),
     ) -> str:
         """Generate using OpenAI (async)."""
         response = await self.openai_client.chat.completions.create(
-            model=self.settings.openai_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            model=self._model("openai"),
+            messages=_openai_messages(system_prompt, user_prompt, context_blocks),
             temperature=temperature,
             max_tokens=max_tokens,
+            **self._openai_cache_options(context_blocks),
         )
+        _record_usage(response.usage)
         return response.choices[0].message.content or ""
 
     async def _generate_anthropic(
@@ -199,15 +496,19 @@ class LLMService:
         user_prompt: str,
         temperature: float,
         max_tokens: int,
+        context_blocks: Sequence[str] = (),
     ) -> str:
         """Generate using Anthropic Claude (async)."""
+        if context_blocks:
+            _prefix_key(context_blocks)
         response = await self.anthropic_client.messages.create(
-            model=self.settings.anthropic_model,
+            model=self._model("anthropic"),
             max_tokens=max_tokens,
-            system=system_prompt,
+            system=_anthropic_system(system_prompt, context_blocks),
             messages=[{"role": "user", "content": user_prompt}],
             temperature=temperature,
         )
+        _record_usage(response.usage)
         return response.content[0].text
 
     async def _generate_vertex(
@@ -216,15 +517,21 @@ class LLMService:
         user_prompt: str,
         temperature: float,
         max_tokens: int,
+        context_blocks: Sequence[str] = (),
     ) -> str:
         """Generate using Claude on Vertex AI (GCP Application Default Credentials)."""
-        response = self.vertex_client.messages.create(
-            model=self.settings.vertex_model,
+        if context_blocks:
+            _prefix_key(context_blocks)
+        # 非同期クライアントを使う: 同期呼び出しはイベントループを塞ぎ、
+        # タスクのキャンセルもリクエストに届かない
+        response = await self.vertex_client.messages.create(
+            model=self._model("vertex"),
             max_tokens=max_tokens,
-            system=system_prompt,
+            system=_anthropic_system(system_prompt, context_blocks),
             messages=[{"role": "user", "content": user_prompt}],
             temperature=temperature,
         )
+        _record_usage(response.usage)
         return response.content[0].text
 
     async def generate_json(
@@ -234,9 +541,16 @@ class LLMService:
         provider: str | None = None,
         temperature: float = 0.7,
         max_tokens: int = 4096,
+        context_blocks: Sequence[str] = (),
+        item_key: str | None = None,
+        on_item: ItemCallback | None = None,
     ) -> dict[str, Any]:
-        """Generate and parse JSON response."""
-        provider = provider or self.settings.llm_provider
+        """Generate and parse JSON response.
+
+        on_item を指定すると応答をストリーミングで受け取り、トップレベルの item_key 配列の
+        要素が1件届くたびに on_item を呼ぶ（戻り値は従来どおり全文をパースした結果）。
+        """
+        provider = self._provider(provider)
 
         json_system = (
             f"{system_prompt}\n\n"
@@ -244,26 +558,119 @@ class LLMService:
             "説明文・前置き・後置きテキスト・マークダウンは含めないでください。"
         )
 
+        if item_key and on_item is not None:
+            return await self._generate_json_streaming(
+                provider, json_system, user_prompt, temperature, max_tokens,
+                context_blocks, item_key, on_item,
+            )
+
         # OpenAI は response_format で確実に JSON を返させる
         if provider == "openai":
-            response = await self.openai_client.chat.completions.create(
-                model=self.settings.openai_model,
-                messages=[
-                    {"role": "system", "content": json_system},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                response_format={"type": "json_object"},
-            )
+            async with _call_slot():
+                response = await self.openai_client.chat.completions.create(
+                    model=self._model("openai"),
+                    messages=_openai_messages(json_system, user_prompt, context_blocks),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    response_format={"type": "json_object"},
+                    **self._openai_cache_options(context_blocks),
+                )
+            _record_usage(response.usage)
             content = response.choices[0].message.content or "{}"
             return json.loads(content)
 
         response = await self.generate(
-            json_system, user_prompt, provider, temperature, max_tokens
+            json_system, user_prompt, provider, temperature, max_tokens, context_blocks
         )
         return _extract_json(response)
 
+    async def _generate_json_streaming(
+        self,
+        provider: str,
+        json_system: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        context_blocks: Sequence[str],
+        item_key: str,
+        on_item: ItemCallback,
+    ) -> dict[str, Any]:
+        """generate_json のストリーミング版。
+
+        on_item が ValueError（検証エラーなど）を送出した要素は飛ばす。
+        途中の要素の不備は、全文をパースした最終結果の検証に任せる。
+        """
+        parser = _ArrayItemParser(item_key)
+        chunks: list[str] = []
+        async with _call_slot():
+            stream = self._stream_text(
+                provider, json_system, user_prompt, temperature, max_tokens, context_blocks
+            )
+            async with aclosing(stream):
+                async for text in stream:
+                    chunks.append(text)
+                    for item in parser.feed(text):
+                        try:
+                            on_item(item)
+                        except ValueError:
+                            metrics.increment("llm.stream_items_invalid")
+
+        content = "".join(chunks)
+        if provider == "openai":
+            return json.loads(content or "{}")
+        return _extract_json(content)
+
+    async def _stream_text(
+        self,
+        provider: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        context_blocks: Sequence[str] = (),
+    ) -> AsyncIterator[str]:
+        """応答テキストを受信した断片ごとに流す（usage は受信完了時に集計する）。
+
+        OpenAI は JSON モード（response_format）で呼び出す。
+        """
+        if provider == "openai":
+            stream = await self.openai_client.chat.completions.create(
+                model=self._model("openai"),
+                messages=_openai_messages(system_prompt, user_prompt, context_blocks),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._openai_cache_options(context_blocks),
+            )
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    _record_usage(chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            return
+
+        if provider == "anthropic":
+            client = self.anthropic_client
+        elif provider == "vertex":
+            client = self.vertex_client
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+        if context_blocks:
+            _prefix_key(context_blocks)
+        async with client.messages.stream(
+            model=self._model(provider),
+            max_tokens=max_tokens,
+            system=_anthropic_system(system_prompt, context_blocks),
+            messages=[{"role": "user", "content": user_prompt}],
+            temperature=temperature,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield text
+            message = await stream.get_final_message()
+        _record_usage(message.usage)
+
 
 @lru_cache
 def get_llm_service() -> LLMService:
@@ -0,0 +1,28 @@
+"""Process-local counters for operational metrics."""
+
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """名前付きカウンタの集合（プロセス内・スレッドセーフ）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: defaultdict[str, int] = defaultdict(int)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+
+# Singleton instance
+metrics = Metrics()
@@ -0,0 +1,138 @@
+"""Result store — ステップの結果を ID で参照できるように保持する.
+
+/api/who・/api/what などの個別エンドポイントやフル分析が返したステップの結果に ID を振り、
+後続のリクエスト（/api/bigidea・/api/copy・/api/ad-planning）は結果の JSON を送り返す代わりに
+ID（who_id など）で参照できる。大きなペイロードの往復と再検証がなくなり、
+クライアント側で上流の結果と食い違うこともない。
+
+- メモリ上は件数上限（LRU）と TTL 付きで保持する（モデルのインスタンスのまま）
+- RESULT_STORE_PATH を指定すると SQLite にも書き込み、再起動後やメモリから
+  追い出された後も TTL の間は参照できる（読み出し時にモデルとして検証し直す）
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.models.schemas import (
+    AdPlanResult,
+    BarrierResult,
+    BigIdea,
+    BriefInput,
+    CopyOutput,
+    DeskResearchResult,
+    Hosoda3DResult,
+    InterviewAnalysisResult,
+    WhatAnalysis,
+    WhoAnalysis,
+)
+from .cache import TTLCache
+
+# 保持できる結果の種類（キーは StrategyResult のフィールド名）
+RESULT_KINDS: dict[str, type[BaseModel]] = {
+    "brief": BriefInput,
+    "desk_research": DeskResearchResult,
+    "interview_analysis": InterviewAnalysisResult,
+    "hosoda_3d": Hosoda3DResult,
+    "barriers": BarrierResult,
+    "who": WhoAnalysis,
+    "what": WhatAnalysis,
+    "big_idea": BigIdea,
+    "copywriting": CopyOutput,
+    "ad_planning": AdPlanResult,
+}
+
+
+@dataclass(frozen=True)
+class StoredResult:
+    """保持中の結果（種類とモデルのインスタンス）。"""
+
+    id: str
+    kind: str
+    value: BaseModel
+
+
+class ResultStore:
+    """ステップの結果の保管庫（メモリ + 任意で SQLite）。"""
+
+    def __init__(self, max_items: int = 1000, ttl_seconds: float = 3600, path: str = ""):
+        self.ttl_seconds = ttl_seconds
+        self._memory: TTLCache[str, StoredResult] = TTLCache(max_items, ttl_seconds)
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)")
+
+    def put(self, kind: str, value: BaseModel) -> str:
+        """結果を保持し、ID を返す。"""
+        if kind not in RESULT_KINDS:
+            raise ValueError(f"Unknown result kind: {kind}")
+        result = StoredResult(id=uuid.uuid4().hex, kind=kind, value=value)
+        self._memory.set(result.id, result)
+        if self._db is not None:
+            # time.time() 基準（プロセスをまたいで有効期限を判定する）
+            now = time.time()
+            with self._lock:
+                self._db.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+                self._db.execute(
+                    "INSERT INTO results (id, kind, data, expires_at) VALUES (?, ?, ?, ?)",
+                    (result.id, kind, value.model_dump_json(), now + self.ttl_seconds),
+                )
+        return result.id
+
+    def get(self, result_id: str) -> StoredResult | None:
+        """ID の結果を返す（見つからない・期限切れなら None）。"""
+        result = self._memory.get(result_id)
+        if result is not None or self._db is None:
+            return result
+        with self._lock:
+            row = self._db.execute(
+                "SELECT kind, data FROM results WHERE id = ? AND expires_at >= ?",
+                (result_id, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        kind, data = row
+        model = RESULT_KINDS.get(kind)
+        if model is None:
+            return None
+        result = StoredResult(id=result_id, kind=kind, value=model.model_validate_json(data))
+        self._memory.set(result_id, result)
+        return result
+
+    def snapshot(self, result_id: str) -> dict[str, Any] | None:
+        """API 応答用の dict（id・種類・内容）。"""
+        result = self.get(result_id)
+        if result is None:
+            return None
+        return {"id": result.id, "kind": result.kind, "data": result.value.model_dump(mode="json")}
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
+
+
+@lru_cache
+def get_result_store() -> ResultStore:
+    """Get cached result store instance."""
+    settings = get_settings()
+    return ResultStore(
+        max_items=settings.result_store_max_items,
+        ttl_seconds=settings.result_store_ttl_seconds,
+        path=settings.result_store_path,
+    )
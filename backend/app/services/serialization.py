@@ -0,0 +1,110 @@
+"""Serialization — 結果を一度だけ JSON にして、イベント・応答で使い回す.
+
+ストリーミングではステップの結果を model_dump() で dict にし、ルートが json.dumps で
+もう一度エンコードしていた。さらに最後の complete イベントが StrategyResult 全体を
+作り直してエンコードするため、同じ結果を何度も変換していた。
+
+- RawJSON はエンコード済みの JSON 断片。ステップの結果は Pydantic のネイティブな
+  エンコーダーで一度だけ断片にし、ステップのイベント・complete イベント・ジョブの
+  スナップショットはその断片をそのまま埋め込む
+- dumps() は dict / list の中の RawJSON を埋め込みつつ、残りを pydantic_core でエンコードする
+- RawJSONResponse は dumps() の結果をそのまま返す応答クラス（json.dumps を通さない）
+- packb() は MessagePack（WebSocket のバイナリフレーム）。msgpack は任意の依存で、
+  未インストールなら msgpack_available() が False になり JSON で送る
+"""
+
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # 任意の依存（MessagePack のフレームを使わなければ不要）
+    msgpack = None
+
+
+class RawJSON:
+    """エンコード済みの JSON 断片。"""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @classmethod
+    def of(cls, model: BaseModel, **kwargs: Any) -> "RawJSON":
+        """モデルを一度だけエンコードする（kwargs は model_dump_json の引数）。"""
+        return cls(model.model_dump_json(**kwargs))
+
+    @classmethod
+    def merge(cls, base: "RawJSON", fields: dict[str, "RawJSON"]) -> "RawJSON":
+        """JSON オブジェクトの断片 base に、エンコード済みのフィールドを足す。"""
+        if not fields:
+            return base
+        extra = ",".join(f"{_key(name)}:{value.text}" for name, value in fields.items())
+        body = base.text.rstrip()[:-1].rstrip()
+        separator = "" if body.endswith("{") else ","
+        return cls(f"{body}{separator}{extra}}}")
+
+    def __repr__(self) -> str:
+        return f"RawJSON({self.text[:60]!r})"
+
+
+def _key(name: Any) -> str:
+    return to_json(str(name)).decode("utf-8")
+
+
+def dumps(value: Any) -> str:
+    """JSON 文字列にする（RawJSON は再エンコードせずに埋め込む。非 ASCII はそのまま）。"""
+    if isinstance(value, RawJSON):
+        return value.text
+    if isinstance(value, dict):
+        if not any(isinstance(v, (RawJSON, dict, list, tuple)) for v in value.values()):
+            return to_json(value).decode("utf-8")
+        return "{" + ",".join(f"{_key(k)}:{dumps(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        if not any(isinstance(v, (RawJSON, dict, list, tuple)) for v in value):
+            return to_json(value).decode("utf-8")
+        return "[" + ",".join(dumps(v) for v in value) + "]"
+    return to_json(value).decode("utf-8")
+
+
+def to_python(value: Any) -> Any:
+    """RawJSON を Python の値に戻す（JSON 以外の形式でエンコードする場合に使う）。"""
+    if isinstance(value, RawJSON):
+        return from_json(value.text)
+    if isinstance(value, dict):
+        return {k: to_python(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_python(v) for v in value]
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def packb(value: Any) -> bytes:
+    """MessagePack にする（msgpack が必要。msgpack_available() で確認してから使う）。"""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(to_python(value), use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.unpackb(data, raw=False)
+
+
+class RawJSONResponse(Response):
+    """dumps() でエンコードする JSON 応答（RawJSON をそのまま埋め込む）。"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content).encode("utf-8")
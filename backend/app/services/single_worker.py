@@ -0,0 +1,81 @@
+"""Single worker — 同じアプリの別のワーカーが動いていれば、起動時に警告する.
+
+次の状態はプロセス内にしかなく、ワーカー間で共有されない（PROCESS_LOCAL_STATE）。
+`uvicorn --workers N` で動かすと、GET /api/jobs/{id}・Idempotency-Key の再送・結果 ID の参照は
+別のワーカーに届いた分（およそ (N-1)/N）が見つからず、受け付けの上限は N 倍になる。
+
+- アプリの起動時に、アプリのディレクトリごとのロックファイルの排他ロックを試みる。
+  同じマシンで同じアプリの別のプロセスがすでにロックしていれば、共有されない状態を挙げて警告する
+  （起動は止めない。開発サーバーと pytest を並べて動かす場合などがあるため）
+- ロックはプロセスの終了（異常終了を含む）で OS が外すため、残ったファイルで誤って警告することはない
+- fcntl のない環境（Windows）では確かめない。SINGLE_WORKER_CHECK=false で無効にできる
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import IO
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ワーカーごとに別々に持つ状態（警告・README に挙げる）
+PROCESS_LOCAL_STATE = (
+    "background jobs (GET /api/jobs/{id})",
+    "Idempotency-Key runs",
+    "admission slots and queues",
+    "the pipeline step cache",
+    "the result store when RESULT_STORE_PATH is empty",
+)
+
+
+def default_lock_path() -> Path:
+    """アプリのディレクトリごとのロックファイル（一時ディレクトリ内）。"""
+    app_dir = str(Path(__file__).resolve().parents[1])
+    digest = hashlib.sha256(app_dir.encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"strategy-brain-{digest}.lock"
+
+
+class SingleWorkerLock:
+    """プロセス間の排他ロック（acquire はロックできなかった場合に False を返す）。"""
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_lock_path()
+        self._file: IO[str] | None = None
+
+    def acquire(self) -> bool:
+        if fcntl is None or self._file is not None:
+            return True
+        lock_file = self.path.open("a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.seek(0)
+            holder = lock_file.read().strip() or "?"
+            lock_file.close()
+            logger.warning(
+                "Another worker (pid %s) is already serving this app. These are process-local and "
+                "not shared between workers: %s. Run a single worker per instance (no --workers).",
+                holder,
+                ", ".join(PROCESS_LOCAL_STATE),
+            )
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self) -> None:
+        if self._file is not None:
+            # ファイルは消さない（開いた直後の別のプロセスと、別々のファイルをロックし合わないように）
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
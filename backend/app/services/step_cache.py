@@ -0,0 +1,143 @@
+"""Step cache — ブリーフをキーにしたステップ結果の共有キャッシュ.
+
+/api/bigidea・/api/copy・/api/ad-planning は WHO/WHAT（と BIG IDEA）を渡されないと
+それぞれ計算し直していた。ステップの結果を (ステップ, 正規化したブリーフのハッシュ,
+分析深度, プロバイダー・モデル, プロンプトのバージョン, 上流の入力) をキーに保持し、
+ルートとオーケストレーターで共有する。
+
+- 同じキーの計算が実行中なら、その完了を待って結果を共有する（同時に開いたタブでも1回）
+- プロンプトの更新・モデルの切り替えはキーが変わるため自然に無効になる
+- ブリーフ単位・全体の明示的な無効化は invalidate() で行う
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.models.schemas import BriefInput
+from .cache import TTLCache
+from .metrics import metrics
+
+T = TypeVar("T")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def brief_key(brief: BriefInput) -> str:
+    """ブリーフの正規化ハッシュ（全角・半角や空白の違いは同じブリーフとみなす）。"""
+    fields = {
+        name: _normalize(value) if isinstance(value, str) else value
+        for name, value in brief.model_dump().items()
+    }
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def fingerprint(*parts: BaseModel | str | None) -> str:
+    """上流の入力（WHO/WHAT の結果・共有コンテキストなど）のハッシュ。"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(b"\0")
+        if isinstance(part, BaseModel):
+            digest.update(part.model_dump_json().encode("utf-8"))
+        elif part is not None:
+            digest.update(part.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+# キー: (ステップ, brief_key, その他の条件...)
+StepKey = tuple[str, ...]
+
+
+class StepCache:
+    """ステップ結果のキャッシュ（件数上限・TTL 付き、同じキーの同時計算は1回にまとめる）。"""
+
+    def __init__(
+        self, max_items: int = 500, ttl_seconds: float = 3600, enabled: bool = True, name: str = "step_cache"
+    ):
+        self.enabled = enabled
+        # メトリクスの接頭辞（同じ仕組みを使う他のキャッシュと区別する）
+        self.name = name
+        self._results: TTLCache[StepKey, Any] = TTLCache(max_items, ttl_seconds)
+        self._inflight: dict[StepKey, asyncio.Future] = {}
+
+    async def get_or_compute(self, key: StepKey, compute: Callable[[], Awaitable[T]]) -> T:
+        """キャッシュにあれば返し、なければ compute() の結果を保持して返す。"""
+        if not self.enabled:
+            return await compute()
+        while True:
+            cached = self._results.get(key)
+            if cached is not None:
+                metrics.increment(f"{self.name}.hits.{key[0]}")
+                return cached
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                result = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # 計算していた側がキャンセルされた場合は、こちらで計算し直す
+                task = asyncio.current_task()
+                if not pending.cancelled() or (task is not None and task.cancelling()):
+                    raise
+                continue
+            metrics.increment(f"{self.name}.shared.{key[0]}")
+            return result
+
+        metrics.increment(f"{self.name}.misses.{key[0]}")
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 待っている側がいなくても「未取得の例外」の警告を出さない
+            future.exception()
+            raise
+        else:
+            self._results.set(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, brief: BriefInput | None = None, step: str | None = None) -> int:
+        """ブリーフ（省略時はすべて）・ステップ（省略時はすべて）の結果を破棄し、件数を返す。"""
+        key = brief_key(brief) if brief is not None else None
+        removed = 0
+        for cached_key in self._results.keys():
+            if (key is None or cached_key[1] == key) and (step is None or cached_key[0] == step):
+                if self._results.pop(cached_key) is not None:
+                    removed += 1
+        metrics.increment(f"{self.name}.invalidated", removed)
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+@lru_cache
+def get_step_cache() -> StepCache:
+    """Get cached step cache instance."""
+    settings = get_settings()
+    return StepCache(
+        max_items=settings.step_cache_max_items,
+        ttl_seconds=settings.step_cache_ttl_seconds,
+        enabled=settings.step_cache,
+    )
@@ -0,0 +1,282 @@
+"""Strategy store — 完了した StrategyResult を保存し、ID で何度でも取り出せるようにする.
+
+フル分析の結果は HTTP 応答にしか存在せず、フロントエンドが保持し続けるか、
+取り直すにはパイプラインをもう一度実行するしかなかった。
+
+- 完了（partial を含む）した実行の StrategyResult を SQLite に保存する。本体は gzip で
+  圧縮した JSON、一覧・絞り込み用のメタデータ（製品名・分析深度・状態・セクション・サイズ）は列
+- ETag は非圧縮の JSON の SHA-256。一覧・メタデータの取得と If-None-Match の判定では
+  本体を読み出さない
+- 応答の圧縮は保存済みの gzip をそのまま返す（再圧縮しない）。gzip を受け付けない
+  クライアントには brotli（任意の依存）または非圧縮で返す
+- fields を指定すると、トップレベルのフィールドだけを切り出して返す
+- 件数上限（STRATEGY_STORE_MAX_ITEMS）を超えると古いものから消す
+"""
+
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Literal
+
+from pydantic_core import from_json, to_json
+
+from app.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # 任意の依存（gzip を受け付けないクライアントにも圧縮して返す場合のみ）
+    brotli = None
+
+ContentEncoding = Literal["gzip", "br", "identity"]
+
+_COLUMNS = (
+    "id, created_at, product_name, depth, status, sections, error_count, size, stored_size, etag"
+)
+
+
+@dataclass(frozen=True)
+class StrategyMeta:
+    """保存済みの結果のメタデータ（本体を読まずに一覧・条件付き GET に使う）。"""
+
+    id: str
+    created_at: float
+    product_name: str
+    depth: str | None
+    status: str
+    sections: list[str]
+    error_count: int
+    size: int
+    stored_size: int
+    etag: str
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "StrategyMeta":
+        values = list(row)
+        values[5] = json.loads(values[5])
+        return cls(*values)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class StrategyStore:
+    """StrategyResult の保管庫（SQLite。本体は gzip 圧縮した JSON）。"""
+
+    def __init__(self, path: str = "", max_items: int = 10000, compress_level: int = 6):
+        self.max_items = max_items
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        # パスが空ならプロセス内だけで保持する（再起動で消える）
+        self._db: sqlite3.Connection | None = sqlite3.connect(
+            path or ":memory:", check_same_thread=False, isolation_level=None
+        )
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS strategies ("
+            " id TEXT PRIMARY KEY, created_at REAL NOT NULL, product_name TEXT NOT NULL,"
+            " depth TEXT, status TEXT NOT NULL, sections TEXT NOT NULL, error_count INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, stored_size INTEGER NOT NULL, etag TEXT NOT NULL, data BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS strategies_created_at ON strategies (created_at)")
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def put(
+        self,
+        strategy_id: str,
+        data: str | bytes,
+        *,
+        product_name: str,
+        depth: str | None,
+        status: str,
+        sections: Iterable[str],
+        error_count: int = 0,
+    ) -> StrategyMeta:
+        """StrategyResult の JSON を圧縮して保存する（圧縮を含むため、ルートからはスレッドで呼ぶ）。"""
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        # mtime=0: 同じ内容なら同じバイト列になる
+        blob = gzip.compress(raw, compresslevel=self.compress_level, mtime=0)
+        meta = StrategyMeta(
+            id=strategy_id,
+            created_at=time.time(),
+            product_name=product_name,
+            depth=depth,
+            status=status,
+            sections=list(sections),
+            error_count=error_count,
+            size=len(raw),
+            stored_size=len(blob),
+            etag=hashlib.sha256(raw).hexdigest()[:32],
+        )
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                f"INSERT OR REPLACE INTO strategies ({_COLUMNS}, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    meta.id, meta.created_at, meta.product_name, meta.depth, meta.status,
+                    json.dumps(meta.sections), meta.error_count, meta.size, meta.stored_size,
+                    meta.etag, blob,
+                ),
+            )
+            if self.max_items > 0:
+                db.execute(
+                    "DELETE FROM strategies WHERE id IN ("
+                    " SELECT id FROM strategies ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_items,),
+                )
+        return meta
+
+    def meta(self, strategy_id: str) -> StrategyMeta | None:
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {_COLUMNS} FROM strategies WHERE id = ?", (strategy_id,)
+            ).fetchone()
+        return StrategyMeta.from_row(row) if row is not None else None
+
+    def blob(self, strategy_id: str) -> bytes | None:
+        """保存済みの gzip 圧縮された JSON。"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT data FROM strategies WHERE id = ?", (strategy_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def recent(
+        self, limit: int = 50, before: float | None = None, product_name: str | None = None
+    ) -> list[StrategyMeta]:
+        """新しい順のメタデータ（before より前・製品名の部分一致で絞り込める）。"""
+        query = f"SELECT {_COLUMNS} FROM strategies WHERE 1 = 1"
+        params: list[Any] = []
+        if before is not None:
+            query += " AND created_at < ?"
+            params.append(before)
+        if product_name:
+            query += " AND instr(product_name, ?) > 0"
+            params.append(product_name)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection().execute(query, params).fetchall()
+        return [StrategyMeta.from_row(row) for row in rows]
+
+    def version(self) -> str:
+        """保存内容の版（追加・削除で変わる）。一覧の ETag に使う。"""
+        with self._lock:
+            count, latest = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(MAX(created_at), 0) FROM strategies"
+            ).fetchone()
+        return f"{count}-{latest:.6f}"
+
+    def delete(self, strategy_id: str) -> bool:
+        with self._lock:
+            cursor = self._connection().execute("DELETE FROM strategies WHERE id = ?", (strategy_id,))
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise RuntimeError("Strategy store is closed")
+        return self._db
+
+
+# ── 応答の組み立て ────────────────────────────────────────────────
+
+def fields_etag(etag: str, fields: Iterable[str] | None) -> str:
+    """フィールドを切り出した応答の ETag（切り出し方ごとに変える）。"""
+    if not fields:
+        return etag
+    selector = ",".join(sorted(set(fields)))
+    return f"{etag}-{hashlib.sha256(selector.encode('utf-8')).hexdigest()[:8]}"
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match が ETag に一致するか（弱い比較。* とカンマ区切りの列挙に対応）。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
+
+
+def select_fields(raw: bytes, fields: Iterable[str]) -> bytes:
+    """JSON オブジェクトのトップレベルから fields だけを残す（存在しないフィールドは無視）。"""
+    document = from_json(raw)
+    return to_json({name: document[name] for name in dict.fromkeys(fields) if name in document})
+
+
+def negotiate_encoding(accept_encoding: str | None) -> ContentEncoding:
+    """Accept-Encoding から応答の圧縮形式を選ぶ。
+
+    保存済みの gzip をそのまま返せるため、受け付けるなら gzip を優先する。
+    """
+    accepted: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    def ok(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if ok("gzip"):
+        return "gzip"
+    if brotli is not None and ok("br"):
+        return "br"
+    return "identity"
+
+
+def render_body(
+    blob: bytes, fields: Iterable[str] | None, encoding: ContentEncoding, compress_level: int = 6
+) -> bytes:
+    """保存済みの gzip から応答の本体を作る（fields なしの gzip は保存済みのバイト列をそのまま返す）。"""
+    if not fields and encoding == "gzip":
+        return blob
+    raw = gzip.decompress(blob)
+    if fields:
+        raw = select_fields(raw, fields)
+    if encoding == "gzip":
+        return gzip.compress(raw, compresslevel=compress_level, mtime=0)
+    if encoding == "br":
+        return brotli.compress(raw, quality=5)
+    return raw
+
+
+def listing_etag(version: str, *params: Any) -> str:
+    """一覧の ETag（保存内容の版と絞り込み条件から作る）。"""
+    payload = "|".join([version, *map(str, params)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+@lru_cache
+def get_strategy_store() -> StrategyStore:
+    """Get cached strategy store instance."""
+    settings = get_settings()
+    return StrategyStore(
+        path=settings.strategy_store_path,
+        max_items=settings.strategy_store_max_items,
+        compress_level=settings.strategy_store_compress_level,
+    )
@@ -0,0 +1,210 @@
+"""Uploads — 添付ファイルのサイズ上限を課し、Starlette が受信時に書き出したファイルをそのまま抽出に渡す.
+
+/api/analyze/with-files・/api/files/analyze は UploadFile を await file.read() で丸ごと
+読み込み、抽出中はその bytes（とライブラリ内部のコピー）をすべてメモリに抱えていた。
+
+- Starlette はマルチパートの各ファイルを受信しながら SpooledTemporaryFile（1MB まではメモリ、
+  超えると一時ディレクトリのファイル）に書き出している。ここでは別のファイルに書き写さず、
+  チャンク単位で読みながら SHA-256（Idempotency-Key の指紋に使う）とサイズだけを確かめる
+- ファイルごと（UPLOAD_MAX_FILE_BYTES）・リクエスト全体（UPLOAD_MAX_REQUEST_BYTES）・ファイル数
+  （UPLOAD_MAX_FILES）の上限を超えた時点で打ち切り、UploadTooLarge（ルートで 413）にする
+- 抽出（FileProcessor のワーカープロセス）には、ディスク上のファイルは /proc のパスで渡す
+  （プロセス間で内容をコピーしない。/proc のない環境ではメモリに読み込んで渡す）
+- Content-Length が上限を超えるリクエストは、マルチパートの解析（Starlette による一時ファイルへの
+  書き出し）より前に UploadLimitMiddleware が 413 で断る。Content-Length のないリクエストは受信した
+  バイト数を数えて、上限を超えた時点で断る。対象はルート名から求めたパスと完全一致で判定する
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterable
+
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from .metrics import metrics
+
+# UploadFile から一度に読むバイト数
+CHUNK_SIZE = 256 * 1024
+# Content-Length の判定で、ファイル以外のフォーム項目・マルチパートの区切りに見込む分
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """ファイル・リクエスト全体のサイズ、またはファイル数が上限を超えた。"""
+
+    def __init__(self, message: str, limit: int):
+        super().__init__(message)
+        self.limit = limit
+
+
+@dataclass
+class SpooledUpload:
+    """上限を確かめたアップロード（file は Starlette が書き出した SpooledTemporaryFile）。"""
+
+    filename: str
+    file: IO[bytes]
+    size: int = 0
+    sha256: str = ""
+
+    @property
+    def on_disk(self) -> bool:
+        """メモリの上限を超えてディスクに書き出されているか。"""
+        # fileno() はメモリ上のファイルをディスクに移してしまうため、SpooledTemporaryFile の状態を見る
+        return getattr(self.file, "_rolled", False)
+
+    def source(self) -> bytes | Path:
+        """抽出に渡す内容（メモリ上なら bytes、ディスク上なら別プロセスからも開けるパス）。"""
+        if self.on_disk:
+            # 一時ファイルは名前がない（作成直後に削除される）ため、開いている記述子を /proc 経由で渡す
+            path = Path(f"/proc/{os.getpid()}/fd/{self.file.fileno()}")
+            if path.exists():
+                return path
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        # Starlette もリクエストの終わりに閉じるが、一時ファイルは抽出が済んだ時点で手放す
+        self.file.close()
+
+
+async def spool_uploads(files: Iterable[UploadFile]) -> list[SpooledUpload]:
+    """ファイル名のあるアップロードの上限を確かめ、SHA-256 を計算する（超えたら受け取り済みも閉じる）。"""
+    settings = get_settings()
+    uploads: list[SpooledUpload] = []
+    total = 0
+    try:
+        for upload_file in files:
+            if not upload_file.filename:
+                continue
+            if len(uploads) >= settings.upload_max_files:
+                raise UploadTooLarge(
+                    f"添付ファイルは {settings.upload_max_files} 件までです", settings.upload_max_files
+                )
+            upload = SpooledUpload(filename=upload_file.filename, file=upload_file.file)
+            uploads.append(upload)
+            digest = hashlib.sha256()
+            # Starlette が数えたサイズがあれば、読む前に断る（読みながらも確かめる）
+            _check_size(upload.filename, upload_file.size or 0, total + (upload_file.size or 0))
+            await upload_file.seek(0)
+            while chunk := await upload_file.read(CHUNK_SIZE):
+                upload.size += len(chunk)
+                total += len(chunk)
+                _check_size(upload.filename, upload.size, total)
+                digest.update(chunk)
+            await upload_file.seek(0)
+            upload.sha256 = digest.hexdigest()
+            metrics.increment("uploads.spilled_to_disk" if upload.on_disk else "uploads.in_memory")
+    except BaseException:
+        close_uploads(uploads)
+        raise
+    metrics.increment("uploads.bytes", total)
+    return uploads
+
+
+def _check_size(filename: str, size: int, total: int) -> None:
+    settings = get_settings()
+    if size > settings.upload_max_file_bytes:
+        raise UploadTooLarge(
+            f"{filename} が上限（{_megabytes(settings.upload_max_file_bytes)}）を超えています",
+            settings.upload_max_file_bytes,
+        )
+    if total > settings.upload_max_request_bytes:
+        raise UploadTooLarge(
+            f"添付ファイルの合計が上限（{_megabytes(settings.upload_max_request_bytes)}）を超えています",
+            settings.upload_max_request_bytes,
+        )
+
+
+def close_uploads(uploads: Iterable[SpooledUpload]) -> None:
+    for upload in uploads:
+        upload.close()
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.0f}MB"
+
+
+class UploadLimitMiddleware:
+    """上限を超えるアップロードを 413 で断る（ASGI ミドルウェア）。
+
+    Content-Length が上限を超えていれば本文を読む前に断る。Content-Length のない（chunked の）
+    リクエストは受け取った本文のバイト数を数え、上限を超えた時点で 413 を返して受信を打ち切る
+    （アプリには切断として伝わり、Starlette がディスクに書き出し続けることはない）。
+
+    routes はエンドポイントのルート名。パスは最初のリクエストでアプリから求め（ルーターの prefix を含む）、
+    root_path を除いたリクエストのパスと完全一致するものだけを対象にする。
+    """
+
+    def __init__(self, app: ASGIApp, routes: Iterable[str]):
+        self.app = app
+        self.routes = tuple(routes)
+        self._paths: frozenset[str] | None = None
+
+    def _targets(self, scope: Scope) -> frozenset[str]:
+        if self._paths is None:
+            self._paths = frozenset(str(scope["app"].url_path_for(name)) for name in self.routes)
+        return self._paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _route_path(scope) not in self._targets(scope):
+            await self.app(scope, receive, send)
+            return
+
+        limit = get_settings().upload_max_request_bytes + FORM_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            metrics.increment("uploads.rejected")
+            await _too_large(limit)(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    metrics.increment("uploads.rejected")
+                    if not response_started:
+                        await _too_large(limit)(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                # 413 を返した後のアプリの応答（切断による 400 など）は捨てる
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # 受信を打ち切ったことによる例外は、すでに 413 を返しているため送出しない
+            if not rejected:
+                raise
+
+
+def _too_large(limit: int) -> JSONResponse:
+    return JSONResponse({"detail": f"リクエストが上限（{_megabytes(limit)}）を超えています"}, status_code=413)
+
+
+def _route_path(scope: Scope) -> str:
+    """ルーティングに使うパス（リバースプロキシの root_path を除く）。"""
+    path, root_path = scope["path"], scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        return path[len(root_path):] or "/"
+    return path
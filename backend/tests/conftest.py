@@ -0,0 +1,55 @@
+"""テスト共通のフィクスチャ（LLM 呼び出しを記録するだけの偽物に差し替える）."""
+
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+
+# 設定の読み込み前に: ワーカープロセスを起動せず、ディスクにデータベースを作らない
+os.environ.setdefault("FILE_WORKERS", "0")
+os.environ.setdefault("STRATEGY_STORE_PATH", "")
+os.environ.setdefault("FILE_CACHE_PATH", "")
+# 開発サーバー・別の pytest と同じロックファイルを取り合わない
+os.environ.setdefault("SINGLE_WORKER_CHECK", "false")
+
+from app.services.llm import LLMService  # noqa: E402
+
+
+@dataclass
+class FakeLLM:
+    """LLMService.generate / generate_json の呼び出しを記録し、空の応答を返す。"""
+
+    calls: list[dict[str, Any]] = field(default_factory=list)
+    text: str = "summary"
+
+    def prompts(self, fragment: str) -> list[dict[str, Any]]:
+        """システムプロンプトに fragment を含む呼び出し。"""
+        return [call for call in self.calls if fragment in call["system_prompt"]]
+
+
+@pytest.fixture
+def fake_llm(monkeypatch: pytest.MonkeyPatch) -> FakeLLM:
+    fake = FakeLLM()
+
+    async def generate_json(self, system_prompt, user_prompt, *args, **kwargs):
+        fake.calls.append({"system_prompt": system_prompt, "user_prompt": user_prompt, **kwargs})
+        return {}
+
+    async def generate(self, system_prompt, user_prompt, *args, **kwargs):
+        fake.calls.append({"system_prompt": system_prompt, "user_prompt": user_prompt, **kwargs})
+        return fake.text
+
+    monkeypatch.setattr(LLMService, "generate_json", generate_json)
+    monkeypatch.setattr(LLMService, "generate", generate)
+    return fake
+
+
+@pytest.fixture
+def client(fake_llm):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
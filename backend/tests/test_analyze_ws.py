@@ -0,0 +1,40 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.services.admission import get_admission
+
+BRIEF = {"product_name": "テスト製品", "product_description": "テスト用の製品説明"}
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        {"type": "ack", "credit": None},
+        {"type": "ack", "credit": [1]},
+        {"type": "resume"},
+        ["ack"],
+    ],
+)
+def test_malformed_control_message_stops_run(client, message):
+    with client.websocket_connect("/api/analyze/ws") as ws:
+        ws.send_json({"type": "start", "brief": BRIEF, "credit": 1})
+        assert ws.receive_json()["step"] == "ready"
+        assert ws.receive_json()["step"] == "start"
+        ws.send_json(message)
+        event = ws.receive_json()
+        assert event["step"] == "error"
+        assert event["error"].startswith("Invalid message")
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+        assert closed.value.code == 1008
+    assert get_admission().pool("pipeline").snapshot()["active"] == 0
+
+
+def test_non_positive_credit_counts_as_one(client):
+    with client.websocket_connect("/api/analyze/ws") as ws:
+        ws.send_json({"type": "start", "brief": BRIEF, "credit": 1})
+        assert ws.receive_json()["step"] == "ready"
+        assert ws.receive_json()["step"] == "start"
+        ws.send_json({"type": "ack", "credit": -5})
+        assert ws.receive_json()["step"] != "error"
+        ws.send_json({"type": "cancel"})
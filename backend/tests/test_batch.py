@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app import cli
+from app.brain.batch import BatchItem
+from app.brain.who_analysis import WhoAnalyzer
+from app.models.schemas import BriefInput, LLMUsage, StepError, StrategyResult
+
+BRIEFS = [
+    {"product_name": "製品A", "product_description": "説明A"},
+    {"product_name": "製品B", "product_description": "説明B"},
+]
+
+
+@pytest.fixture
+def briefs_path(tmp_path):
+    path = tmp_path / "briefs.jsonl"
+    path.write_text("".join(json.dumps(b, ensure_ascii=False) + "\n" for b in BRIEFS), encoding="utf-8")
+    return path
+
+
+def _statuses(path):
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    return {line["index"]: line["status"] for line in lines}
+
+
+def test_required_step_failure_is_partial_and_retried(fake_llm, monkeypatch, briefs_path):
+    analyze = WhoAnalyzer.analyze
+
+    async def flaky(self, brief, *args, **kwargs):
+        if brief.product_name == "製品B":
+            raise RuntimeError("WHO failed")
+        return await analyze(self, brief, *args, **kwargs)
+
+    monkeypatch.setattr(WhoAnalyzer, "analyze", flaky)
+    output = briefs_path.with_suffix(".results.jsonl")
+
+    assert cli.main(["run", str(briefs_path), "-o", str(output)]) == 1
+    assert _statuses(output) == {0: "complete", 1: "partial"}
+
+    # 再開時: partial は失敗と同様に、--retry-failed でのみ再実行する
+    assert cli._load_checkpoint(output, retry_failed=False) == {0, 1}
+    assert cli._load_checkpoint(output, retry_failed=True) == {0}
+
+    monkeypatch.setattr(WhoAnalyzer, "analyze", analyze)
+    assert cli.main(["run", str(briefs_path), "-o", str(output), "--retry-failed"]) == 0
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[-1])["status"] == "complete"
+
+
+def test_csv_count_ignores_newlines_in_quoted_cells(tmp_path):
+    path = tmp_path / "briefs.csv"
+    path.write_text(
+        'product_name,product_description\n製品A,"1行目\n2行目\n3行目"\n\n製品B,説明B\n', encoding="utf-8"
+    )
+
+    assert cli._count_briefs(path) == 2
+
+
+def test_average_input_tokens_include_partial_runs():
+    progress = cli._Progress(total=2, resumed=0, concurrency=1)
+    brief = BriefInput(product_name="製品A")
+    usage = LLMUsage(calls=1, input_tokens=1000, output_tokens=10)
+    progress.update(BatchItem(0, "製品A", result=StrategyResult(brief=brief, usage=usage)))
+    failed = [StepError(step="who", error="failed", required=True)]
+    partial = StrategyResult(brief=brief, usage=usage, errors=failed)
+    progress.update(BatchItem(1, "製品B", result=partial))
+
+    assert "入力 1,000 tokens" in progress.summary()
@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.admission import get_admission
+
+BRIEFS = [{"product_name": "製品A", "product_description": "説明A"}]
+
+
+@pytest.fixture
+def batch_pool():
+    pool = get_admission().pool("batch")
+    saved = (pool.slots, pool.max_queue)
+    pool.slots, pool.max_queue = 1, 0
+    yield pool
+    pool.slots, pool.max_queue = saved
+
+
+def test_batch_rejected_with_retry_after_when_pool_full(client, batch_pool):
+    async def occupy():
+        return batch_pool.enter()
+
+    ticket = client.portal.call(occupy)
+    try:
+        response = client.post("/api/analyze/batch", json=BRIEFS)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    finally:
+        client.portal.call(_release, ticket)
+
+    response = client.post("/api/analyze/batch", json=BRIEFS)
+    assert response.status_code == 200
+    assert batch_pool.snapshot()["active"] == 0
+
+
+async def _release(ticket):
+    ticket.release()
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.brain.hosoda_3d import Hosoda3DAnalyzer
+from app.brain.orchestrator import StrategyOrchestrator
+from app.brain.prompt_registry import get_prompt_registry
+from app.models.schemas import BriefInput
+
+TRANSCRIPT = "\n".join(
+    f"回答者{i}: 価格が高いと感じて購入をためらった。店頭で比較できる情報が少ない。" for i in range(10)
+)
+
+
+def test_interview_analysis_shares_the_run_prefix(fake_llm):
+    brief = BriefInput(
+        product_name="テスト製品", product_description="テスト用の製品説明", additional_info=TRANSCRIPT
+    )
+
+    result = asyncio.run(StrategyOrchestrator().run_full_analysis(brief, depth="deep"))
+
+    interview = fake_llm.prompts(get_prompt_registry().text("interview_analysis"))
+    desk_research = fake_llm.prompts(get_prompt_registry().text("desk_research"))
+    assert len(interview) == 1 and len(desk_research) == 1
+    assert interview[0]["context_blocks"]
+    assert interview[0]["context_blocks"][0] == desk_research[0]["context_blocks"][0]
+    # 発話録は共有プレフィックス側にあり、ユーザープロンプトで繰り返さない
+    assert TRANSCRIPT not in interview[0]["user_prompt"]
+    assert result.interview_analysis is not None
+
+
+PIPELINE_STEPS = ("desk_research", "interview_analysis", "barriers", "who", "what", "bigidea", "copy", "ad_planning")
+
+
+def test_every_pipeline_step_sends_the_same_prefix(fake_llm):
+    brief = BriefInput(
+        product_name="テスト製品", product_description="テスト用の製品説明", additional_info=TRANSCRIPT
+    )
+
+    asyncio.run(StrategyOrchestrator().run_full_analysis(brief, depth="deep"))
+
+    prefixes = {}
+    # 細田式3D はプロンプト（テンプレート）をユーザー側に置き、システムプロンプトは固定
+    fragments = {step: get_prompt_registry().text(step) for step in PIPELINE_STEPS}
+    fragments["hosoda_3d"] = Hosoda3DAnalyzer.SYSTEM_PROMPT
+    for step, fragment in fragments.items():
+        calls = fake_llm.prompts(fragment)
+        assert calls, f"{step} was not called"
+        for call in calls:
+            assert call["context_blocks"], f"{step} sent no shared prefix"
+            prefixes.setdefault(call["context_blocks"][0], []).append(step)
+    # 共有プレフィックスはバイト単位で1種類（プロバイダー側のプロンプトキャッシュが効く）
+    assert len(prefixes) == 1, prefixes.values()
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.file_cache import FileCache
+from app.services.file_processor import FileProcessor
+from app.services.llm import LLMService
+
+BROKEN_PDF = b"%PDF-1.4 not really a pdf"
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = FileProcessor(workers=0)
+    cache = FileCache()
+    monkeypatch.setattr(processor, "_cache", lambda: cache)
+    return processor
+
+
+def test_extraction_errors_are_not_cached(processor, monkeypatch):
+    calls = []
+    extract = FileProcessor._extract_pdf
+
+    def counted(stream):
+        calls.append(1)
+        return extract(stream)
+
+    monkeypatch.setattr(FileProcessor, "_extract_pdf", staticmethod(counted))
+
+    async def main():
+        return [await processor.process_file("broken.pdf", BROKEN_PDF) for _ in range(2)]
+
+    first, second = asyncio.run(main())
+
+    assert first["error"] and first["text"].startswith("[PDF読み取りエラー")
+    assert second["text"] == first["text"]
+    assert len(calls) == 2
+
+
+def test_error_text_summary_is_not_cached(processor, fake_llm):
+    async def main():
+        files = await processor.process_files([("broken.pdf", BROKEN_PDF, None)])
+        for _ in range(2):
+            await processor.summarize_files(files, LLMService())
+
+    asyncio.run(main())
+
+    assert len(fake_llm.calls) == 2
+
+
+def test_successful_extraction_is_cached(processor, fake_llm):
+    async def main():
+        files = [await processor.process_file("notes.txt", "メモ".encode()) for _ in range(2)]
+        for _ in range(2):
+            await processor.summarize_files(files[:1], LLMService())
+        return files
+
+    files = asyncio.run(main())
+
+    assert not files[0]["error"] and files[0]["text"] == "メモ"
+    assert len(fake_llm.calls) == 1
+
+
+def test_files_are_summarized_in_one_cached_call(processor, fake_llm):
+    async def main():
+        files = await processor.process_files(
+            [("a.txt", "資料A".encode(), None), ("b.txt", "資料B".encode(), None)]
+        )
+        first = await processor.summarize_files(files, LLMService())
+        # 順序が違っても同じ組のファイルなら要約を共有する
+        second = await processor.summarize_files(files[::-1], LLMService())
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert len(fake_llm.calls) == 1
+    assert "--- ファイル: a.txt ---" in fake_llm.calls[0]["user_prompt"]
+    assert "--- ファイル: b.txt ---" in fake_llm.calls[0]["user_prompt"]
+    assert first == second == "summary"
+
+
+def test_worker_process_reports_extraction_error():
+    processor = FileProcessor(workers=1, use_cache=False)
+
+    async def main():
+        try:
+            return await processor.process_file("broken.pdf", BROKEN_PDF)
+        finally:
+            await processor.shutdown()
+
+    result = asyncio.run(main())
+    assert result["error"] and result["text"].startswith("[PDF読み取りエラー")
+
+
+def test_shutdown_terminates_stuck_workers():
+    processor = FileProcessor(workers=1, use_cache=False)
+
+    async def main():
+        pool = processor._executor()
+        pool.submit(time.sleep, 60)
+        # ワーカーが起動して読み取り中（ここでは sleep）になるのを待つ
+        await asyncio.sleep(0.5)
+        processes = list(pool._processes.values())
+        started = time.monotonic()
+        await processor.shutdown(timeout=0.5)
+        return processes, time.monotonic() - started
+
+    processes, elapsed = asyncio.run(main())
+
+    assert elapsed < 5
+    for process in processes:
+        process.join(5)
+        assert not process.is_alive()
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from app.services.admission import get_admission
+
+BRIEF = {"product_name": "製品A", "product_description": "説明A"}
+
+
+@pytest.fixture
+def pipeline_pool():
+    pool = get_admission().pool("pipeline")
+    saved = (pool.slots, pool.max_queue)
+    pool.slots, pool.max_queue = 1, 0
+    yield pool
+    pool.slots, pool.max_queue = saved
+
+
+def test_job_rejected_with_retry_after_when_pipeline_full(client, pipeline_pool):
+    async def occupy():
+        return pipeline_pool.enter()
+
+    ticket = client.portal.call(occupy)
+    try:
+        response = client.post("/api/jobs", json=BRIEF)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+    finally:
+        client.portal.call(_release, ticket)
+
+    response = client.post("/api/jobs", json=BRIEF, params={"depth": "quick"})
+    assert response.status_code == 202
+    # ジョブは実行中だけパイプラインの枠を保持し、終わったら返す
+    run_id = response.json()["run_id"]
+    for _ in range(200):
+        if client.get(f"/api/jobs/{run_id}").json()["status"] in ("complete", "failed"):
+            break
+        time.sleep(0.05)
+    assert client.get(f"/api/jobs/{run_id}").json()["status"] == "complete"
+    assert pipeline_pool.snapshot()["active"] == 0
+
+
+async def _release(ticket):
+    ticket.release()
@@ -0,0 +1,18 @@
+import logging
+
+from app.services.single_worker import SingleWorkerLock
+
+
+def test_second_worker_is_warned_not_refused(tmp_path, caplog):
+    path = tmp_path / "app.lock"
+    first, second = SingleWorkerLock(path), SingleWorkerLock(path)
+    assert first.acquire()
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.services.single_worker"):
+            assert not second.acquire()
+        assert "process-local" in caplog.text and "Idempotency-Key" in caplog.text
+    finally:
+        first.release()
+
+    assert second.acquire()
+    second.release()
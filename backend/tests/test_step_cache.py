@@ -0,0 +1,59 @@
+import asyncio
+
+from app.brain.orchestrator import StrategyOrchestrator
+from app.models.schemas import BriefInput
+from app.services.step_cache import StepCache
+
+BRIEF = BriefInput(product_name="テスト製品", product_description="テスト用の製品説明")
+
+
+def _count_calls(orchestrator: StrategyOrchestrator) -> dict[str, int]:
+    counts = {"who": 0, "what": 0}
+    for name, analyzer in (("who", orchestrator.who_analyzer), ("what", orchestrator.what_analyzer)):
+        analyze = analyzer.analyze
+
+        async def counted(*args, _name=name, _analyze=analyze, **kwargs):
+            counts[_name] += 1
+            return await _analyze(*args, **kwargs)
+
+        analyzer.analyze = counted
+    return counts
+
+
+def test_pipeline_reuses_who_what_for_same_brief(fake_llm):
+    orchestrator = StrategyOrchestrator(step_cache=StepCache())
+    counts = _count_calls(orchestrator)
+    runs = iter(range(100))
+    generate_barriers = orchestrator.analyze_barriers
+
+    # 障壁は実行ごとに LLM が生成し直す（内容が毎回変わる）
+    async def analyze_barriers(*args, **kwargs):
+        result = await generate_barriers(*args, **kwargs)
+        return result.model_copy(update={"mermaid_diagram": f"graph TD; run{next(runs)}"})
+
+    orchestrator.analyze_barriers = analyze_barriers
+
+    async def main():
+        first = await orchestrator.run_full_analysis(BRIEF, depth="quick")
+        second = await orchestrator.run_full_analysis(BRIEF, depth="quick")
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert counts == {"who": 1, "what": 1}
+    assert second.who == first.who and second.what == first.what
+
+
+def test_route_who_does_not_satisfy_pipeline_lookup(fake_llm):
+    orchestrator = StrategyOrchestrator(step_cache=StepCache())
+    counts = _count_calls(orchestrator)
+
+    async def main():
+        # 障壁なしの /who はパイプラインのエントリーにならない（逆も同じ）
+        await orchestrator.analyze_who(BRIEF, depth=None)
+        await orchestrator.run_full_analysis(BRIEF)
+        await orchestrator.analyze_who(BRIEF, depth=None)
+
+    asyncio.run(main())
+
+    assert counts == {"who": 2, "what": 1}
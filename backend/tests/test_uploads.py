@@ -0,0 +1,61 @@
+"""添付ファイル: Starlette のスプールをそのまま抽出に渡し、上限はルートのパスと完全一致で課す."""
+
+from pathlib import Path
+
+from app.config import get_settings
+from app.services.file_processor import FileProcessor
+from app.services.metrics import metrics
+
+
+def test_large_upload_is_extracted_from_starlette_spool(client, monkeypatch):
+    sources = []
+    process_file = FileProcessor.process_file
+
+    async def recording(self, filename, content, sha256=None):
+        sources.append(content)
+        return await process_file(self, filename, content, sha256)
+
+    monkeypatch.setattr(FileProcessor, "process_file", recording)
+    spilled = metrics.get("uploads.spilled_to_disk")
+    body = b"line\n" * (400 * 1024)  # 2MB: Starlette のメモリ上限（1MB）を超えてディスクに移る
+
+    response = client.post("/api/files/analyze", files=[("files", ("notes.txt", body, "text/plain"))])
+
+    assert response.status_code == 200
+    assert response.json()["files"][0]["char_count"] == len(body)
+    # 別の一時ファイルに書き写さず、Starlette の一時ファイルを /proc のパスで渡す
+    assert isinstance(sources[0], Path) and str(sources[0]).startswith("/proc/")
+    assert metrics.get("uploads.spilled_to_disk") == spilled + 1
+
+
+def test_oversized_file_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_max_file_bytes", 1024)
+
+    response = client.post("/api/files/analyze", files=[("files", ("big.txt", b"x" * 2048, "text/plain"))])
+
+    assert response.status_code == 413
+
+
+def test_content_length_limit_matches_exact_route_path(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_max_request_bytes", 0)
+    body = b"x" * (2 * 1024 * 1024)  # FORM_OVERHEAD_BYTES（1MB）を超える
+    headers = {"content-type": "multipart/form-data; boundary=b"}
+
+    assert client.post("/api/files/analyze", content=body, headers=headers).status_code == 413
+    # 末尾が同じだけの別のパスは対象にしない（ルーティングに任せる）
+    assert client.post("/other/api/files/analyze", content=body, headers=headers).status_code == 404
+
+
+def test_chunked_upload_without_content_length_is_cut_off(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_max_request_bytes", 0)
+    def body():
+        # Content-Length なし（chunked）で 64KB ずつ送る
+        for _ in range(64):
+            yield b"x" * (64 * 1024)
+
+    response = client.post(
+        "/api/files/analyze", content=body(), headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+
+    assert response.status_code == 413
+    assert "content-length" not in {k.lower() for k in response.request.headers}
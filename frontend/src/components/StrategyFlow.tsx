@@ -28,7 +28,7 @@ const fadeUp = (delay = 0) => ({
 });
 
 export default function StrategyFlow() {
-  const { step, isLoading, statusMessage, hosoda3d, deskResearch, interviewAnalysis, barriers, who, what, bigIdea, copy, adPlanning, brief, error } = useStrategyStore();
+  const { step, isLoading, statusMessage, preview, streamedItems, hosoda3d, deskResearch, interviewAnalysis, barriers, who, what, bigIdea, copy, adPlanning, brief, error } = useStrategyStore();
   const [synthesis, setSynthesis] = useState<StrategySynthesisResult | null>(null);
   const [synthLoading, setSynthLoading] = useState(false);
   const [synthError, setSynthError] = useState<string | null>(null);
@@ -100,6 +100,67 @@ export default function StrategyFlow() {
             );
           })}
         </div>
+
+        {/* 戦略スケッチ（フル分析の完了で置き換わる速報） */}
+        {preview && (
+          <motion.div {...fadeUp(0.1)} className="mt-20 border-t border-gray-100 pt-10 space-y-5">
+            <p className="text-ink-muted text-xs tracking-widest uppercase text-center">戦略スケッチ（速報）</p>
+            {preview.big_idea && (
+              <p className="text-center font-semibold text-ink text-xl">{safeStr(preview.big_idea)}</p>
+            )}
+            <dl className="grid grid-cols-[auto_1fr] gap-x-6 gap-y-3 text-sm">
+              <dt className="text-ink-faint">WHO</dt>
+              <dd className="text-ink">{safeStr(preview.who)}</dd>
+              <dt className="text-ink-faint">インサイト</dt>
+              <dd className="text-ink">{safeStr(preview.insight)}</dd>
+              <dt className="text-ink-faint">WHAT</dt>
+              <dd className="text-ink">{safeStr(preview.what)}</dd>
+            </dl>
+            {preview.headline_copies.length > 0 && (
+              <ul className="space-y-1 text-center text-ink">
+                {preview.headline_copies.map((c, i) => (
+                  <li key={i}>「{safeStr(c)}」</li>
+                ))}
+              </ul>
+            )}
+          </motion.div>
+        )}
+
+        {/* 生成途中の要素（ステップの完了で確定版に置き換わる） */}
+        {(streamedItems.barriers.length > 0 || streamedItems.copy.length > 0 || streamedItems.ad_planning.length > 0) && (
+          <motion.div {...fadeUp(0.1)} className="mt-16 border-t border-gray-100 pt-10 space-y-8 text-sm">
+            {streamedItems.barriers.length > 0 && (
+              <div>
+                <p className="text-ink-muted text-xs tracking-widest uppercase mb-3">障壁（{streamedItems.barriers.filter(Boolean).length}件）</p>
+                <ul className="space-y-1 text-ink">
+                  {streamedItems.barriers.filter(Boolean).slice(-8).map((b) => (
+                    <li key={b.id}><span className="text-ink-faint mr-2">{safeStr(b.category)}</span>{safeStr(b.barrier)}</li>
+                  ))}
+                </ul>
+              </div>
+            )}
+            {streamedItems.copy.length > 0 && (
+              <div>
+                <p className="text-ink-muted text-xs tracking-widest uppercase mb-3">コピー案</p>
+                <ul className="space-y-1 text-ink">
+                  {streamedItems.copy.filter(Boolean).map((c, i) => (
+                    <li key={i}>「{safeStr(c.headline)}」<span className="text-ink-faint ml-2">{safeStr(c.angle)}</span></li>
+                  ))}
+                </ul>
+              </div>
+            )}
+            {streamedItems.ad_planning.length > 0 && (
+              <div>
+                <p className="text-ink-muted text-xs tracking-widest uppercase mb-3">広告企画</p>
+                <ul className="space-y-1 text-ink">
+                  {streamedItems.ad_planning.filter(Boolean).map((p, i) => (
+                    <li key={i}>{safeStr(p.plan_name)}<span className="text-ink-faint ml-2">{safeStr(p.core_message)}</span></li>
+                  ))}
+                </ul>
+              </div>
+            )}
+          </motion.div>
+        )}
       </motion.div>
     );
   }
@@ -13,8 +13,10 @@ import {
   Hosoda3DResult,
   DeskResearchResult,
   InterviewAnalysisResult,
+  StrategyPreview,
   StrategyResult,
   StreamUpdate,
+  StreamedItems,
 } from "@/lib/api";
 
 type Step = "idle" | "uploading" | "desk_research" | "barriers" | "who_what" | "bigidea" | "copy" | "complete" | "error";
@@ -26,6 +28,8 @@ interface StrategyState {
   error: string | null;
   brief: BriefInput | null;
   files: File[];
+  preview: StrategyPreview | null;
+  streamedItems: StreamedItems;
   hosoda3d: Hosoda3DResult | null;
   deskResearch: DeskResearchResult | null;
   interviewAnalysis: InterviewAnalysisResult | null;
@@ -53,6 +57,8 @@ const initialState = {
   error: null,
   brief: null,
   files: [] as File[],
+  preview: null as StrategyPreview | null,
+  streamedItems: { barriers: [], copy: [], ad_planning: [] } as StreamedItems,
   hosoda3d: null as Hosoda3DResult | null,
   deskResearch: null as DeskResearchResult | null,
   interviewAnalysis: null as InterviewAnalysisResult | null,
@@ -72,6 +78,11 @@ function makeStreamHandler(
   onComplete: () => void,
   onError: (msg: string) => void
 ) {
+  // item イベントはこの分析の間だけ積み上げる
+  const items: StreamedItems = { barriers: [], copy: [], ad_planning: [] };
+  // ステップの完了イベントの結果（complete イベントの refs から参照する）
+  const completed: Record<string, unknown> = {};
+
   return (update: StreamUpdate) => {
     if (update.error) {
       set({
@@ -84,7 +95,28 @@ function makeStreamHandler(
       return;
     }
 
+    if (update.status === "complete" && update.data && update.step !== "complete") {
+      completed[update.step] = update.data;
+    }
+
     switch (update.step) {
+      case "preview":
+        if (update.status === "complete" && update.data) {
+          set({ preview: update.data as StrategyPreview });
+        }
+        break;
+
+      case "item": {
+        const section = (update.section ?? "") as keyof StreamedItems;
+        if (section in items && update.data && update.index !== undefined) {
+          const list: unknown[] = [...items[section]];
+          list[update.index] = update.data;
+          Object.assign(items, { [section]: list });
+          set({ streamedItems: { ...items } });
+        }
+        break;
+      }
+
       case "desk_research":
         if (update.status === "running") {
           set({ step: "desk_research", statusMessage: "デスクリサーチ（市場・競合分析）中..." });
@@ -157,7 +189,10 @@ function makeStreamHandler(
 
       case "complete":
         if (update.data) {
-          const result = update.data as StrategyResult;
+          const result = { ...(update.data as StrategyResult) };
+          for (const [field, event] of Object.entries(update.refs ?? {})) {
+            Object.assign(result, { [field]: completed[event] });
+          }
           set({
             isLoading: false,
             step: "complete",
@@ -165,11 +200,11 @@ function makeStreamHandler(
             hosoda3d: result.hosoda_3d ?? null,
             deskResearch: result.desk_research ?? null,
             interviewAnalysis: result.interview_analysis ?? null,
-            barriers: result.barriers,
-            who: result.who,
-            what: result.what,
-            bigIdea: result.big_idea,
-            copy: result.copywriting,
+            barriers: result.barriers ?? null,
+            who: result.who ?? null,
+            what: result.what ?? null,
+            bigIdea: result.big_idea ?? null,
+            copy: result.copywriting ?? null,
             adPlanning: result.ad_planning ?? null,
             statusMessage: "分析完了",
           });
@@ -203,11 +238,11 @@ export const useStrategyStore = create<StrategyState>((set) => ({
         step: "complete",
         result,
         hosoda3d: result.hosoda_3d ?? null,
-        barriers: result.barriers,
-        who: result.who,
-        what: result.what,
-        bigIdea: result.big_idea,
-        copy: result.copywriting,
+        barriers: result.barriers ?? null,
+        who: result.who ?? null,
+        what: result.what ?? null,
+        bigIdea: result.big_idea ?? null,
+        copy: result.copywriting ?? null,
         adPlanning: result.ad_planning ?? null,
         statusMessage: "分析完了",
       });
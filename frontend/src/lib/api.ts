@@ -185,17 +185,60 @@ export interface Hosoda3DResult {
   design: DesignAnalysis;
 }
 
+export interface StepError {
+  step: string;
+  required: boolean;
+  error: string;
+  cancelled: boolean;
+}
+
+// フル分析完了前に流れる戦略スケッチ（SSE の preview イベント）
+export interface StrategyPreview {
+  who: string;
+  insight: string;
+  what: string;
+  big_idea: string;
+  headline_copies: string[];
+}
+
 export interface StrategyResult {
   brief: BriefInput;
   hosoda_3d?: Hosoda3DResult;
-  barriers: BarrierResult;
-  who: WhoAnalysis;
-  what: WhatAnalysis;
-  big_idea: BigIdea;
-  copywriting: CopyOutput;
+  barriers?: BarrierResult;
+  who?: WhoAnalysis;
+  what?: WhatAnalysis;
+  big_idea?: BigIdea;
+  copywriting?: CopyOutput;
   ad_planning?: AdPlanResult;
   desk_research?: DeskResearchResult;
   interview_analysis?: InterviewAnalysisResult;
+  depth?: "quick" | "standard" | "deep";
+  errors?: StepError[];
+  // ステップ別の結果 ID（/bigidea・/copy などに who_id 等として渡せる）
+  result_ids?: Record<string, string>;
+  // 保存した結果の ID（getStrategy で取り直せる）
+  strategy_id?: string;
+}
+
+// 保存済みの結果のメタデータ（GET /strategies）
+export interface StoredStrategy {
+  id: string;
+  created_at: number;
+  product_name: string;
+  depth: "quick" | "standard" | "deep" | null;
+  status: "complete" | "partial";
+  sections: string[];
+  error_count: number;
+  size: number;
+  stored_size: number;
+  etag: string;
+}
+
+// 保持済みの上流の結果を ID で参照する（結果の JSON を送り返さずに済む）
+export interface UpstreamResultIds {
+  who_id?: string;
+  what_id?: string;
+  big_idea_id?: string;
 }
 
 // ── Vol.5 企画評価 ──────────────────────────────────────────────
@@ -403,10 +446,31 @@ export interface StrategySynthesisResult {
 
 export interface StreamUpdate {
   step: string;
-  status?: "running" | "complete";
+  status?: "running" | "complete" | "error" | "partial";
   message?: string;
   data?: unknown;
   error?: string;
+  // item イベント: どのステップの何件目の要素か
+  section?: string;
+  index?: number;
+  // ステップ完了イベント: 結果 ID
+  result_id?: string;
+  // complete イベント（complete=ref）: 結果のフィールド名 → その結果を運んだイベント名
+  refs?: Record<string, string>;
+}
+
+// ステップの完了前に1件ずつ流れる要素（SSE の item イベント）
+export interface StreamedItems {
+  barriers: BarrierItem[];
+  copy: CopyVariation[];
+  ad_planning: AdPlan[];
+}
+
+// 混雑で受け付けられなかった（429）場合のエラー。Retry-After があれば待ち時間を示す
+function busyError(response: Response): Error {
+  const retryAfter = response.headers.get("Retry-After");
+  const wait = retryAfter ? `${retryAfter}秒ほど待ってから` : "しばらくしてから";
+  return new Error(`サーバーが混雑しています。${wait}もう一度お試しください。`);
 }
 
 class ApiClient {
@@ -431,6 +495,9 @@ class ApiClient {
 
       clearTimeout(timeoutId);
 
+      if (response.status === 429) {
+        throw busyError(response);
+      }
       if (!response.ok) {
         const errorText = await response.text();
         throw new Error(`API error ${response.status}: ${errorText}`);
@@ -452,13 +519,17 @@ class ApiClient {
   ): () => void {
     const controller = new AbortController();
 
-    fetch(`${this.baseUrl}/analyze/stream`, {
+    // 完了イベントでは送信済みのステップ結果を繰り返さない（refs で参照する）
+    fetch(`${this.baseUrl}/analyze/stream?complete=ref`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(brief),
       signal: controller.signal,
     })
       .then(async (response) => {
+        if (response.status === 429) {
+          throw busyError(response);
+        }
         if (!response.ok) {
           throw new Error(`API error: ${response.status}`);
         }
@@ -540,11 +611,11 @@ class ApiClient {
     return response.json();
   }
 
-  async generateBigIdea(brief: BriefInput): Promise<BigIdea> {
+  async generateBigIdea(brief: BriefInput, ids: UpstreamResultIds = {}): Promise<BigIdea> {
     const response = await fetch(`${this.baseUrl}/bigidea`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(brief),
+      body: JSON.stringify({ ...brief, ...ids }),
     });
 
     if (!response.ok) {
@@ -554,11 +625,11 @@ class ApiClient {
     return response.json();
   }
 
-  async generateCopy(brief: BriefInput): Promise<CopyOutput> {
+  async generateCopy(brief: BriefInput, ids: UpstreamResultIds = {}): Promise<CopyOutput> {
     const response = await fetch(`${this.baseUrl}/copy`, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(brief),
+      body: JSON.stringify({ ...brief, ...ids }),
     });
 
     if (!response.ok) {
@@ -690,6 +761,26 @@ class ApiClient {
     if (!response.ok) throw new Error(`API error: ${response.status}`);
     return response.json();
   }
+
+  // 保存済みの結果（fields でトップレベルのフィールドを絞る。ETag の再検証はブラウザの HTTP キャッシュが行う）
+  async getStrategy(id: string, fields: (keyof StrategyResult)[] = []): Promise<StrategyResult> {
+    const query = fields.map((field) => `fields=${encodeURIComponent(field)}`).join("&");
+    const response = await fetch(`${this.baseUrl}/strategies/${id}${query ? `?${query}` : ""}`);
+    if (!response.ok) throw new Error(`API error: ${response.status}`);
+    return response.json();
+  }
+
+  async listStrategies(
+    options: { limit?: number; before?: number; productName?: string } = {}
+  ): Promise<{ items: StoredStrategy[]; next_before: number | null }> {
+    const params = new URLSearchParams();
+    if (options.limit) params.set("limit", String(options.limit));
+    if (options.before !== undefined) params.set("before", String(options.before));
+    if (options.productName) params.set("product_name", options.productName);
+    const response = await fetch(`${this.baseUrl}/strategies?${params}`);
+    if (!response.ok) throw new Error(`API error: ${response.status}`);
+    return response.json();
+  }
 }
 
 export const api = new ApiClient();